@@ -1,33 +1,44 @@
 import streamlit as st
-import pandas as pd
-import firebase_admin
-from firebase_admin import credentials, firestore
-import uuid
+import os
 from datetime import datetime, time as dtime, timedelta
 from zoneinfo import ZoneInfo
-import re
-import io
 
-import qrcode
-import bcrypt
-import streamlit.components.v1 as components
+# pandas, firebase_admin, qrcode y PIL se importan en el flujo que los usa (arranque en frío más corto)
+from drop24.storage import FirestoreBackend, LocalBackend
+from drop24.passwords import hash_password, configure as configure_hashing
+from drop24.auth import AuthService
+from drop24.registration import clean_payload, validate as validate_registration, user_doc, normalize_phone
+from drop24.userio import import_file as import_users, export_users
+from drop24.qrsign import QRSigner
+from drop24.qrrender import make_qr_png_bytes, render_qr, MIME as QR_MIME
+from drop24.revocation import RevocationFeed, revoke_user_tokens
+from drop24.bulk import new_bulk_tokens, iter_render, build_zip, build_sheet_pdf
+from drop24.sweeper import TokenSweeper, start_background as start_sweeper, SWEEP_EVERY_SECONDS
+from drop24.archive import ArchiveReader, TokenArchiver, KEEP_DAYS as ARCHIVE_KEEP_DAYS
+from drop24.helpdesk import help_answer
+from drop24 import metrics
+from drop24.theme import page_head_html
+from drop24.logo import logo_src
+from drop24.markup import (
+    logo_html as logo_markup, closing_html, SIDEBAR_ACTIONS_HTML, WHATSAPP_BUTTON_HTML, HOW_IT_WORKS_HTML,
+    REGISTER_INTRO_HTML, QR_INFO_HTML, CHAT_INTRO_HTML,
+)
+from drop24.repository import (
+    UserStore, TokenStore, LockerLedger, SlotUnavailable, make_token_id,
+)
 
 # =================================================
 # BRANDING / CONFIG (Drop24)
 # =================================================
-# OPCIÓN A (recomendado): sube tu logo local (assets/drop24_logo.png)
+# OPCIÓN A (recomendado): logo local optimizado -> python -m drop24.logo optimize <url o archivo>
 # OPCIÓN B: usa URL en secrets drop24_logo_url
 LOGO_URL = st.secrets.get("drop24_logo_url", "").strip()  # opcional
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 
 ORG_NAME = "DROP24"
 ORG_SUB = "Lavandería inteligente · Registro · QR Agendado · Servicio a domicilio (próximamente)"
 
-# Paleta estilo
-C_TEAL_DARK = "#055671"
-C_TEAL_MID = "#6699A5"
-C_CYAN_LIGHT = "#B4DFE8"
-C_BG = "#F9FAF8"
-C_TEXT_MUTED = "#6A7067"
+# Paleta y CSS: drop24/theme.py
 
 # =================================================
 # STREAMLIT CONFIG
@@ -41,154 +52,39 @@ st.set_page_config(
 MEXICO_TZ = ZoneInfo("America/Mexico_City")
 
 # =================================================
-# CSS (MISMO ESTILO)
+# MÉTRICAS POR RERUN (panel 📈 Rendimiento en Admin)
 # =================================================
-st.markdown(
-    f"""
-    <style>
-    body {{
-        background-color: {C_BG};
-        font-family: "Segoe UI", system-ui, -apple-system, BlinkMacSystemFont, "Roboto", sans-serif;
-        color: #0B1F2A;
-    }}
-
-    .corp-header {{
-        width: 100%;
-        background: linear-gradient(90deg, {C_TEAL_DARK} 0%, {C_TEAL_MID} 55%, {C_CYAN_LIGHT} 100%);
-        color: white;
-        padding: 14px 26px;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        box-shadow: 0 2px 12px rgba(0,0,0,0.18);
-        margin-bottom: 18px;
-        border-radius: 0 0 18px 18px;
-        position: relative;
-        overflow: hidden;
-    }}
-
-    .corp-header::after {{
-        content: "";
-        position: absolute;
-        top: 0;
-        left: -20%;
-        width: 140%;
-        height: 100%;
-        background: radial-gradient(circle at 80% 50%, rgba(255,255,255,0.85) 0%, rgba(180,223,232,0.35) 30%, rgba(5,86,113,0) 70%);
-        opacity: 0.55;
-        transform: skewX(-18deg);
-    }}
-
-    .corp-header-left {{
-        display: flex;
-        align-items: center;
-        gap: 14px;
-        position: relative;
-        z-index: 2;
-        max-width: 75%;
-    }}
-
-    .corp-logo {{
-        height: 44px;
-        width: auto;
-        border-radius: 10px;
-        background: rgba(255,255,255,0.92);
-        padding: 6px 10px;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.18);
-    }}
-
-    .corp-header-title {{
-        font-size: 14px;
-        font-weight: 900;
-        color: #FFFFFF;
-        line-height: 1.15;
-        text-transform: uppercase;
-    }}
-
-    .corp-header-sub {{
-        font-size: 12px;
-        opacity: 0.95;
-        color: #EAF7FB;
-        margin-top: 4px;
-        text-transform: uppercase;
-        letter-spacing: 0.4px;
-    }}
-
-    .corp-header-right {{
-        font-size: 12px;
-        text-align: right;
-        position: relative;
-        z-index: 2;
-        color: #FFFFFF;
-        opacity: 0.98;
-        min-width: 190px;
-    }}
-
-    .big-title {{
-        font-size: 30px;
-        font-weight: 900;
-        text-align: center;
-        margin-bottom: 4px;
-        color: {C_TEAL_DARK};
-    }}
-
-    .subtitle {{
-        font-size: 14px;
-        text-align: center;
-        color: {C_TEXT_MUTED};
-        margin-bottom: 18px;
-    }}
-
-    .card {{
-        background-color: #FFFFFF;
-        border-left: 6px solid {C_TEAL_DARK};
-        border-radius: 16px;
-        padding: 14px 16px;
-        margin: 8px 0;
-        color: #0B1F2A;
-        box-shadow: 0 4px 14px rgba(0,0,0,0.06);
-    }}
-
-    .pill {{
-        display: inline-block;
-        padding: 6px 12px;
-        border-radius: 999px;
-        background-color: #EAF7FB;
-        color: {C_TEAL_DARK};
-        font-size: 12px;
-        margin: 3px;
-        border: 1px solid {C_CYAN_LIGHT};
-        font-weight: 800;
-    }}
-
-    .note {{
-        color: {C_TEXT_MUTED};
-        font-size: 12px;
-    }}
-
-    /* Botones */
-    .stButton > button {{
-        border-radius: 12px !important;
-        border: 1px solid {C_CYAN_LIGHT} !important;
-    }}
-
-    /* Sidebar */
-    section[data-testid="stSidebar"] {{
-        background: #FFFFFF;
-        border-right: 1px solid rgba(0,0,0,0.06);
-    }}
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+# secrets opcionales: metrics_prom_path (textfile de Prometheus), metrics_jsonl_path (un JSON por rerun)
+@st.cache_resource
+def init_metrics():
+    metrics.configure(
+        prom_path=st.secrets.get("metrics_prom_path") or None,
+        jsonl_path=st.secrets.get("metrics_jsonl_path") or None,
+    )
+    return True
+
+init_metrics()
 
+if "_perf_sid" not in st.session_state:
+    import uuid
 
+    st.session_state._perf_sid = uuid.uuid4().hex[:12]
+    st.session_state._perf_session = metrics.RunStats(st.session_state._perf_sid)
+# un rerun cortado por st.rerun()/st.stop() no llegó al final: se cierra aquí
+if st.session_state.get("_perf_run") is not None and not st.session_state._perf_run.finished:
+    st.session_state._perf_session.add(metrics.finish_run(st.session_state._perf_run, interrupted=True))
+perf_run = st.session_state._perf_run = metrics.start_run(
+    st.session_state._perf_sid, st.session_state.get("main_tab") or "",
+)
 
 # =================================================
 # FIREBASE (NO TOCAR)
 # =================================================
 @st.cache_resource
 def init_firebase():
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
     firebase_creds = st.secrets["firebase_credentials"]
     if hasattr(firebase_creds, "to_dict"):
         firebase_creds = firebase_creds.to_dict()
@@ -199,69 +95,102 @@ def init_firebase():
 
     return firestore.client()
 
-db = init_firebase()
-
-# =================================================
-# SECRETS
-# =================================================
-ADMIN_CODE = st.secrets.get("admin_code", "ADMIN")
-
 # =================================================
-# COLLECTIONS
+# STORAGE (Firestore o local)
 # =================================================
-USERS_COL = "drop24_users"
-TOKENS_COL = "drop24_qr_tokens"
+# secrets: storage_backend = "firestore" (default) | "sqlite"
+#          sqlite_path = "drop24.db" (default ":memory:")
+@st.cache_resource
+def init_storage():
+    kind = str(st.secrets.get("storage_backend", "firestore")).strip().lower()
+    if kind in ("sqlite", "local", "memory"):
+        backend = LocalBackend(str(st.secrets.get("sqlite_path", ":memory:")))
+    else:
+        backend = FirestoreBackend(init_firebase())
+    # cuenta lecturas/escrituras por colección (y por rerun) para el panel de rendimiento
+    return metrics.InstrumentedBackend(backend)
 
-# =================================================
-# HELPERS
-# =================================================
-def now_mx():
-    return datetime.now(MEXICO_TZ)
+# Lugares por horario de 1 hora en cada locker
+LOCKER_SLOT_CAPACITY = {"L1": 1, "L2": 1}
 
-def now_mx_str():
-    return now_mx().strftime("%Y-%m-%d %H:%M:%S %Z")
+# "Mis últimos QRs": cuántos trae la consulta (ya ordenada por created_at desc)
+MY_QRS_LIMIT = 20
 
-def normalize_phone(x: str) -> str:
-    return re.sub(r"\D+", "", (x or "").strip())
+# Los stores viven por proceso (no por rerun): así sus caches sirven entre reruns y sesiones
+@st.cache_resource
+def init_stores():
+    backend = init_storage()
+    return (
+        UserStore(backend),
+        TokenStore(backend),
+        LockerLedger(backend, capacity=LOCKER_SLOT_CAPACITY),
+        RevocationFeed(backend),
+    )
 
-def hash_password(pw: str) -> str:
-    salt = bcrypt.gensalt(rounds=12)
-    return bcrypt.hashpw(pw.encode("utf-8"), salt).decode("utf-8")
+user_store, token_store, locker_ledger, revocation_feed = init_stores()
 
-def check_password(pw: str, pw_hash: str) -> bool:
-    try:
-        return bcrypt.checkpw(pw.encode("utf-8"), pw_hash.encode("utf-8"))
-    except Exception:
-        return False
+# Barrido de tokens vencidos/usados: un hilo por proceso, pero solo barre la réplica con el lease
+# (drop24_jobs/token_sweeper); token_sweeper_every = 0 lo apaga (p. ej. si corre por cron).
+# En cada pasada también archiva los cerrados con más de archive_keep_days días (0 = no archiva).
+@st.cache_resource
+def init_sweeper():
+    every = int(st.secrets.get("token_sweeper_every", SWEEP_EVERY_SECONDS))
+    if every <= 0:
+        return None
+    keep_days = int(st.secrets.get("archive_keep_days", ARCHIVE_KEEP_DAYS))
+    archiver = None
+    if keep_days > 0:
+        archiver = TokenArchiver(init_storage(), keep_days=keep_days,
+                                 parquet_dir=st.secrets.get("archive_parquet_dir") or None)
+    sweeper = TokenSweeper(init_storage(), max_writes_per_sec=float(st.secrets.get("token_sweeper_max_writes", 20)),
+                           feed=RevocationFeed(init_storage()), archiver=archiver)
+    return start_sweeper(sweeper, every)
+
+init_sweeper()
 
-def user_ref(username: str):
-    return db.collection(USERS_COL).document(username)
+@st.cache_resource
+def init_archive_reader():
+    return ArchiveReader(init_storage(), parquet_dir=st.secrets.get("archive_parquet_dir") or None)
 
-def token_ref(token_id: str):
-    return db.collection(TOKENS_COL).document(token_id)
+archive_reader = init_archive_reader()
 
-def make_token_id() -> str:
-    return uuid.uuid4().hex[:12].upper()
+# =================================================
+# SECRETS
+# =================================================
+ADMIN_CODE = st.secrets.get("admin_code", "ADMIN")
 
-def make_qr_png_bytes(payload: str) -> bytes:
-    qr = qrcode.QRCode(
-        version=None,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=10,
-        border=2,
+# bcrypt: costo calibrado para ~bcrypt_target_ms (en el pool, sin bloquear el arranque)
+# y tope de hashes simultáneos
+@st.cache_resource
+def init_password_hashing():
+    configure_hashing(
+        max_workers=int(st.secrets.get("bcrypt_workers", 0)) or None,
+        target_ms=float(st.secrets.get("bcrypt_target_ms", 250)),
     )
-    qr.add_data(payload)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    bio = io.BytesIO()
-    img.save(bio, format="PNG")
-    return bio.getvalue()
+    return True
+
+init_password_hashing()
+
+# QR firmado (opcional):
+# [qr_signing]
+# active = "k2026a"
+# keys = { k2026a = "<base64 32 bytes>" }
+QR_SIGNER = QRSigner.from_config(st.secrets.get("qr_signing"))
+
+# =================================================
+# HELPERS
+# =================================================
+def now_mx():
+    return datetime.now(MEXICO_TZ)
 
 def dt_to_str(dt: datetime) -> str:
     return dt.astimezone(MEXICO_TZ).strftime("%Y-%m-%d %H:%M:%S %Z")
 
-def require_fields(data: dict, required: list[str]) -> list[str]:
-    return [k for k in required if not str(data.get(k, "")).strip()]
+def fmt_ts(v) -> str:
+    """created_at/updated_at: timestamp -> texto CDMX; los strings viejos (sin migrar) pasan tal cual."""
+    if isinstance(v, datetime):
+        return dt_to_str(v)
+    return v or ""
 
 def is_admin():
     entered = (st.session_state.get("admin_code_value", "") or "").strip()
@@ -271,43 +200,11 @@ def is_admin():
 # QR SECURITY HELPERS (NUEVO)
 # =================================================
 def get_active_qr_for_user(username: str):
-    """Regresa el token más reciente del usuario que siga activo y vigente (end_ts > now)."""
-    now_dt = now_mx()
-
-    docs = (
-        db.collection(TOKENS_COL)
-        .where("created_by", "==", username)
-        .limit(50)
-        .stream()
-    )
-
-    best = None
-    best_created = ""
-
-    for d in docs:
-        x = d.to_dict() or {}
-
-        if not x.get("active", False):
-            continue
-
-        if x.get("one_time", False) and x.get("used", False):
-            continue
+    """Regresa el puntero al QR activo y vigente del usuario (end_ts > now), o None.
 
-        end_ts = x.get("end_ts")
-        if not end_ts or not isinstance(end_ts, datetime):
-            continue
-
-        # Asegura timezone CDMX si viene naive
-        if end_ts.tzinfo is None:
-            end_ts = end_ts.replace(tzinfo=MEXICO_TZ)
-
-        if end_ts > now_dt:
-            ca = x.get("created_at", "")
-            if ca >= best_created:
-                best = d
-                best_created = ca
-
-    return best
+    Es una sola lectura (drop24_active_qr/{username}), sin importar cuántos QRs tenga el usuario.
+    """
+    return token_store.active_for_user(username, now_mx())
 
 # =================================================
 # LOCKER SLOTS (HORA) - REQUIRED
@@ -379,76 +276,8 @@ PRICES = {
 # CHATBOT HELPERS
 # ---------------------------
 def drop24_help_answer(user_text: str) -> str:
-    t = (user_text or "").lower().strip()
-    p = PRICES
-
-    # --- PRECIOS ---
-    if any(k in t for k in ["precio", "precios", "cuánto", "cuanto", "costo", "vale", "$", "tarifa"]):
-        return (
-            "💸 **Precios Drop24**\n\n"
-            "### 🧺 Autoservicio\n"
-            f"- Lavado (carga completa hasta 22 kg): **${p['lavado_carga_completa']}**\n"
-            f"- Secado 30 min: **${p['secado_30_min']}**\n"
-            f"- 15 min extra: **${p['secado_15_extra']}**\n"
-            f"- 60 min: **${p['secado_60_min']}**\n\n"
-            "📌 *El precio es por ciclo de lavadora, no por kilo.*\n"
-            "📌 *El cliente trae sus insumos (o puede adquirirlos en mostrador).*\n\n"
-            "### 🧺 Drop Express (Mostrador)\n"
-            "📌 Política: entrega en 24 horas hábiles (sujeto a disponibilidad) · doblado básico incluido.\n"
-            f"- Lavado + Secado: **${p['lavado_secado_por_kg']} por kilo**\n"
-            f"- Promoción (15 kg): **${p['promo_15kg']}**\n"
-            "📌 *Incluye detergente premium y suavizante.*\n"
-            "📌 *Se pesa al recibir. Mínimo de cobro: 3 kg.*\n\n"
-            "### 📦 Buzón inteligente 24/7\n"
-            f"- Ropa general: **${p['buzon_por_kg']} por kilo**\n"
-            f"- Renta de locker (por servicio) / Recolección 24/7: **${p['locker_24_7']}**\n\n"
-            "### 🛏️ Especiales (por pieza)\n"
-            f"- Edredones y cobijas (Individual/Matrimonial): **${p['edredon_ind_matr']}**\n"
-            f"- Edredones y cobijas (Queen/King): **${p['edredon_q_king']}**\n\n"
-            "Si me dices qué vas a lavar (kg o piezas), te calculo el total ✅"
-        )
-
-    # --- BUZÓN ---
-    if any(k in t for k in ["buzon", "buzón", "24/7", "depositar", "dejar ropa"]):
-        return (
-            "🧺 **Buzón 24/7 (Drop24)**\n\n"
-            "1) Te registras en mostrador y obtienes tu **QR**.\n"
-            "2) Escaneas el QR en el buzón.\n"
-            "3) La puerta se libera y depositas tu ropa en bolsa/morral identificado.\n"
-            "4) Recolectamos en el siguiente horario hábil y comenzamos el proceso.\n\n"
-            f"Precio ropa general: **${p['buzon_por_kg']} por kilo**\n"
-            f"Renta de locker (por servicio) / Recolección 24/7: **${p['locker_24_7']}**"
-        )
-
-    # --- ENTREGA ---
-    if any(k in t for k in ["tarda", "entrega", "cuando", "listo", "24 horas", "24hrs", "24 h"]):
-        return (
-            "⏱️ **Tiempos de entrega**\n\n"
-            "En Drop Express (Mostrador): **Entrega en 24 horas hábiles** (sujeto a disponibilidad).\n"
-            "Si es volumen grande o prendas especiales, puede variar.\n\n"
-            "Dime cuántos kg o si incluye edredón/cobija y te doy un estimado."
-        )
-
-    # --- QR ---
-    if any(k in t for k in ["qr", "token", "agendado", "ventana", "no funciona", "error"]):
-        return (
-            "📲 **Problemas con tu QR (Checklist)**\n\n"
-            "1) Verifica que estás dentro de la **ventana de tiempo**.\n"
-            "2) Si era de **1 uso**, revisa que no esté marcado como **used**.\n"
-            "3) Confirma el acceso correcto: **BZ / L1 / L2**.\n\n"
-            "Si me dices qué mensaje te sale o qué estás intentando abrir, te digo exactamente qué revisar."
-        )
-
-    # --- DEFAULT ---
-    return (
-        "¡Claro! 🙌\n\n"
-        "Escribe una opción o tu duda:\n"
-        "1) **Precios**\n"
-        "2) **Buzón 24/7**\n"
-        "3) **QR agendado**\n"
-        "4) **Tiempos de entrega**\n"
-        "5) **Especiales (edredones/cobijas)**\n"
-    )
+    # el matcher se arma una vez al importar drop24.helpdesk, no en cada rerun
+    return help_answer(user_text, PRICES)
 
 
 def send_to_drop24_bot(text: str):
@@ -461,7 +290,54 @@ def send_to_drop24_bot(text: str):
     st.session_state.drop24_chat.append({"role": "user", "content": text})
     reply = drop24_help_answer(text)
     st.session_state.drop24_chat.append({"role": "assistant", "content": reply})
-    st.rerun()
+
+
+# Fragmento: un clic o mensaje del chat re-ejecuta solo esta función (sin CSS, sin
+# lecturas a Firestore ni el resto de las pestañas). El historial se pinta al final
+# en un contenedor reservado arriba, así el turno nuevo sale sin st.rerun().
+@st.fragment
+def chat_panel():
+    # historial por sesión
+    if "drop24_chat" not in st.session_state:
+        st.session_state.drop24_chat = [
+            {"role": "assistant", "content": "¡Hola! Soy el asistente de Drop24 🧺 ¿Qué duda tienes hoy?"}
+        ]
+
+    # FAQ rápida
+    with st.expander("📌 Preguntas frecuentes (FAQ)", expanded=False):
+        c1, c2, c3, c4 = st.columns(4)
+        if c1.button("¿Cómo funciona el buzón 24/7?", use_container_width=True):
+            send_to_drop24_bot("¿Cómo funciona el buzón 24/7?")
+        if c2.button("¿Cuánto tarda la entrega?", use_container_width=True):
+            send_to_drop24_bot("¿Cuánto tarda la entrega?")
+        if c3.button("Problemas con mi QR", use_container_width=True):
+            send_to_drop24_bot("Mi QR no funciona, ¿qué reviso?")
+        if c4.button("Ver precios", use_container_width=True):
+            send_to_drop24_bot("Precios")
+
+    st.markdown("---")
+    history = st.container()
+
+    # input nativo
+    user_text = st.chat_input("Escribe tu duda…")
+    if user_text:
+        send_to_drop24_bot(user_text)
+
+    # botón limpiar
+    colA, colB = st.columns([1, 3])
+    with colA:
+        if st.button("🧹 Limpiar chat", use_container_width=True):
+            st.session_state.drop24_chat = [
+                {"role": "assistant", "content": "Listo ✅ ¿Qué duda tienes ahora?"}
+            ]
+    with colB:
+        st.caption("Tip: usa las FAQ para respuestas rápidas.")
+
+    # pintar chat
+    with history:
+        for m in st.session_state.drop24_chat:
+            with st.chat_message(m["role"]):
+                st.write(m["content"])
 
 
 # =================================================
@@ -472,40 +348,61 @@ if "auth" not in st.session_state:
 if "username" not in st.session_state:
     st.session_state.username = None
 
+# =================================================
+# LOGIN (header y sidebar usan lo mismo)
+# =================================================
+@st.cache_resource
+def init_auth():
+    # compartido entre sesiones: el throttling y la cache negativa son por proceso
+    return AuthService(user_store, now_fn=now_mx)
+
+auth_service = init_auth()
+
+
+def client_key() -> str:
+    ip = getattr(st.context, "ip_address", None)
+    if not ip:
+        ip = (st.context.headers.get("X-Forwarded-For", "") or "").split(",")[0].strip()
+    return ip or "local"
+
+
+def do_login(u_in: str, p_in: str):
+    res = auth_service.login(u_in, p_in, client=client_key())
+    if res.code == "missing":
+        st.error("Completa usuario (o teléfono/email) y contraseña.")
+    elif res.code == "throttled":
+        st.error(f"Demasiados intentos. Intenta de nuevo en {int(res.retry_after) + 1} s.")
+    elif res.code == "no_user":
+        st.error("No hay una cuenta con ese usuario, teléfono o email.")
+    elif res.code == "inactive":
+        st.error("Usuario desactivado. Contacta a Drop24.")
+    elif res.code == "bad_password":
+        st.error("Contraseña incorrecta.")
+    else:
+        st.session_state.auth = True
+        st.session_state.username = res.user["username"]
+        st.success(f"Bienvenido(a), {res.user.get('full_name','')} ✅")
+        st.rerun()
+
 # =================================================
 # LOGO HTML (URL o fallback)
 # =================================================
-logo_html = (
-    f"""<img class="corp-logo" src="{LOGO_URL}" />"""
-    if LOGO_URL
-    else """<div class="corp-logo" style="display:flex;align-items:center;justify-content:center;font-weight:900;color:#055671;">DROP24</div>"""
-)
+# un solo asset local versionado (ver drop24/logo.py); URL remota solo si no hay local optimizado
+logo_html = logo_markup(logo_src(APP_DIR, LOGO_URL))
 
 # =================================================
 # HEADER
 # =================================================
+# CSS + header + título ya armados (cache por proceso en drop24.theme)
 st.markdown(
-    f"""
-    <div class="corp-header">
-        <div class="corp-header-left">
-            {logo_html}
-            <div>
-                <div class="corp-header-title">{ORG_NAME}</div>
-                <div class="corp-header-sub">{ORG_SUB}</div>
-            </div>
-        </div>
-        <div class="corp-header-right">
-            <div><b>Portal de Usuarios</b></div>
-            <div style="opacity:0.92;">Registro · Login · QR agendado</div>
-        </div>
-    </div>
-    """,
+    page_head_html(
+        logo_html, ORG_NAME, ORG_SUB,
+        "Drop24 · Usuarios & QR",
+        "Registro de clientes y domicilio para servicio a domicilio (próximamente)",
+    ),
     unsafe_allow_html=True,
 )
 
-st.markdown("<div class='big-title'>Drop24 · Usuarios & QR</div>", unsafe_allow_html=True)
-st.markdown("<div class='subtitle'>Registro de clientes y domicilio para servicio a domicilio (próximamente)</div>", unsafe_allow_html=True)
-
 st.markdown("---")
 
 with st.container():
@@ -526,28 +423,11 @@ with st.container():
     with colR:
         expanded_login = not (st.session_state.auth and st.session_state.username)
         with st.expander("👤 Login", expanded=expanded_login):
-            u_in = st.text_input("Usuario", value=st.session_state.get("username") or "", key="login_user_top")
+            u_in = st.text_input("Usuario, teléfono o email", value=st.session_state.get("username") or "", key="login_user_top")
             p_in = st.text_input("Contraseña", type="password", key="login_pass_top")
 
             if st.button("Ingresar", use_container_width=True, key="btn_login_top"):
-                u = (u_in or "").strip().lower()
-                if not u or not p_in:
-                    st.error("Completa usuario y contraseña.")
-                else:
-                    doc = user_ref(u).get()
-                    if not doc.exists:
-                        st.error("Usuario no existe.")
-                    else:
-                        data = doc.to_dict() or {}
-                        if not data.get("active", True):
-                            st.error("Usuario desactivado. Contacta a Drop24.")
-                        elif not check_password(p_in, data.get("password_hash", "")):
-                            st.error("Contraseña incorrecta.")
-                        else:
-                            st.session_state.auth = True
-                            st.session_state.username = u
-                            st.success(f"Bienvenido(a), {data.get('full_name','')} ✅")
-                            st.rerun()
+                do_login(u_in, p_in)
 
 st.markdown("---")
 
@@ -558,28 +438,11 @@ st.markdown("---")
 st.sidebar.title("🔐 Accesos")
 
 with st.sidebar.expander("👤 Login Usuario", expanded=True):
-    u_in = st.text_input("Usuario", value=st.session_state.get("username") or "", key="login_user")
+    u_in = st.text_input("Usuario, teléfono o email", value=st.session_state.get("username") or "", key="login_user")
     p_in = st.text_input("Contraseña", type="password", key="login_pass")
 
     if st.button("Ingresar", use_container_width=True, key="btn_login"):
-        u = (u_in or "").strip().lower()
-        if not u or not p_in:
-            st.error("Completa usuario y contraseña.")
-        else:
-            doc = user_ref(u).get()
-            if not doc.exists:
-                st.error("Usuario no existe.")
-            else:
-                data = doc.to_dict() or {}
-                if not data.get("active", True):
-                    st.error("Usuario desactivado. Contacta a Drop24.")
-                elif not check_password(p_in, data.get("password_hash", "")):
-                    st.error("Contraseña incorrecta.")
-                else:
-                    st.session_state.auth = True
-                    st.session_state.username = u
-                    st.success(f"Bienvenido(a), {data.get('full_name','')} ✅")
-                    st.rerun()
+        do_login(u_in, p_in)
 
     if st.session_state.auth and st.session_state.username:
         st.caption(f"Sesión: **{st.session_state.username}**")
@@ -598,43 +461,11 @@ with st.sidebar.expander("🛡️ Admin (solo para control)", expanded=False):
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 🧺 Acciones")
-st.sidebar.markdown(
-    """
-    <span class="pill">Registro</span>
-    <span class="pill">Login</span>
-    <span class="pill">QR</span>
-    <span class="pill">Chatbot</span>
-    """,
-    unsafe_allow_html=True,
-)
+st.sidebar.markdown(SIDEBAR_ACTIONS_HTML, unsafe_allow_html=True)
 st.sidebar.caption("Los datos se guardan en Firestore.")
 
 st.sidebar.markdown("---")
-st.sidebar.markdown(
-    """
-    <div style="text-align:center;">
-        <a href="https://wa.me/523343928767" target="_blank" style="text-decoration:none;">
-            <button style="
-                background-color:#25D366;
-                color:white;
-                border:none;
-                border-radius:12px;
-                padding:12px 16px;
-                font-size:14px;
-                font-weight:700;
-                width:100%;
-                cursor:pointer;
-            ">
-                💬 Contáctanos por WhatsApp
-            </button>
-        </a>
-        <div style="font-size:12px;color:#6A7067;margin-top:6px;">
-            Atención y soporte Drop24
-        </div>
-    </div>
-    """,
-    unsafe_allow_html=True,
-)
+st.sidebar.markdown(WHATSAPP_BUTTON_HTML, unsafe_allow_html=True)
 
 
 # =================================================
@@ -643,441 +474,333 @@ st.sidebar.markdown(
 tabs = [ "ℹ️ Cómo funciona","📝 Registro", "📲 QR Agendado","🤖 Chatbot Ayuda" ]
 if is_admin():
     tabs.append("🛡️ Admin")
+    tabs.append("📈 Rendimiento")
 
 
-tab_objs = st.tabs(tabs)
+# Pestañas con estado: solo corre el cuerpo de la visible (tab.open), así "Cómo funciona"
+# no paga las lecturas del QR ni del directorio de Admin
+tab_objs = st.tabs(tabs, key="main_tab", on_change="rerun")
 # =================================================
 # TAB 4: CÓMO FUNCIONA
 # =================================================
 with tab_objs[0]:
-    st.markdown(
-        """
-        <div class="card">
-        <b>ℹ️ ¿Cómo funciona Drop24?</b><br>
-        Aquí te explicamos paso a paso cómo usar el portal, el QR agendado y el buzón/lockers.
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
-
-    st.markdown(
-        f"""
-        <div class="card">
-        <b>1) 📝 Registro</b><br>
-        - Crea tu usuario y contraseña.<br>
-        - Captura tu teléfono y correo.<br>
-        - Agrega tu domicilio (para servicio a domicilio próximamente).<br>
-        </div>
-
-        <div class="card">
-        <b>2) 📲 Login</b><br>
-        - Inicia sesión desde la parte superior (más cómodo en teléfono).<br>
-        - Con sesión activa podrás generar QRs agendados y ver tus tokens.<br>
-        </div>
-
-        <div class="card">
-        <b>3) 🔒 QR Agendado (seguridad)</b><br>
-        - Puedes generar un QR con ventana de tiempo.<br>
-        - Por seguridad: el QR dura <b>15 minutos</b> (buzón) y solo puedes tener <b>1 QR activo</b> a la vez.<br>
-        - Si es de 1 uso, se marca como usado después de abrir.<br>
-        </div>
-
-        <div class="card">
-        <b>4) 🧺 Buzón 24/7</b><br>
-        - Te registras y obtienes tu QR.<br>
-        - Escaneas el QR en el buzón y depositas tu ropa identificada.<br>
-        - Recolectamos en el siguiente horario hábil y comenzamos el proceso.<br>
-        </div>
-
-        <div class="card">
-        <b>5) 🔐 Lockers (L1 / L2)</b><br>
-        - Si eliges Locker, seleccionas un rango de 1 hora (ej. 19:00–20:00).<br>
-        - Tu QR solo funciona dentro de esa ventana.<br>
-        - Si no se recoge a tiempo, se guarda en almacén y se solicita apoyo por WhatsApp.<br>
-        </div>
-
-        <div class="card">
-        <b>6) 🤖 Chatbot</b><br>
-        - Resuelve dudas rápidas: precios, buzón, QR, tiempos de entrega y especiales.<br>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
-
-    st.markdown(
-        """
-        <div class="card">
-        <b>💬 Soporte</b><br>
-        ¿Necesitas ayuda con tu QR o locker? Contáctanos por WhatsApp.<br><br>
-        👉 <a href="https://wa.me/523343928767" target="_blank"><b>Escríbenos aquí</b></a>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    if tab_objs[0].open:
+        st.markdown(HOW_IT_WORKS_HTML, unsafe_allow_html=True)
 
 
 # =================================================
 # TAB 1: REGISTRO
 # =================================================
 with tab_objs[1]:
-    st.markdown(
-        """
-        <div class="card">
-        <b>Registro de usuario Drop24</b><br>
-        Este registro también recopila tu domicilio <b>para el servicio a domicilio (próximamente)</b>.
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    if tab_objs[1].open:
+        st.markdown(REGISTER_INTRO_HTML, unsafe_allow_html=True)
+
+        with st.form("register_form", clear_on_submit=False):
+            st.subheader("Datos del usuario")
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                username = st.text_input("Usuario (único) *", placeholder="ej: cliente001").strip().lower()
+            with c2:
+                full_name = st.text_input("Nombre completo *", placeholder="Nombre y apellido")
+            with c3:
+                phone = st.text_input("Teléfono (WhatsApp) *", placeholder="55 1234 5678")
+
+            c4, c5 = st.columns(2)
+            with c4:
+                email = st.text_input("Email *", placeholder="correo@ejemplo.com")
+            with c5:
+                preferred_contact = st.selectbox("Contacto preferido", ["WhatsApp", "Llamada", "Email"])
+
+            st.subheader("Seguridad de cuenta")
+            p1 = st.text_input("Contraseña *", type="password")
+            p2 = st.text_input("Confirmar contraseña *", type="password")
+
+            st.markdown("---")
+            st.subheader("Domicilio (para servicio a domicilio · próximamente)")
+
+            a1, a2, a3 = st.columns(3)
+            with a1:
+                street = st.text_input("Calle *")
+            with a2:
+                ext_number = st.text_input("Número exterior *")
+            with a3:
+                int_number = st.text_input("Número interior (opcional)")
+
+            b1, b2, b3 = st.columns(3)
+            with b1:
+                neighborhood = st.text_input("Colonia *")
+            with b2:
+                borough = st.text_input("Alcaldía / Municipio *")
+            with b3:
+                postal_code = st.text_input("Código Postal *", max_chars=5)
+
+            c6, c7, c8 = st.columns(3)
+            with c6:
+                city = st.text_input("Ciudad *", value="CDMX")
+            with c7:
+                state = st.text_input("Estado *", value="Ciudad de México")
+            with c8:
+                country = st.text_input("País", value="México")
+
+            d1, d2 = st.columns(2)
+            with d1:
+                between_streets = st.text_input("Entre calles (opcional)", placeholder="Ej. Acoxpa y…")
+            with d2:
+                references = st.text_input("Referencias (opcional)", placeholder="Portón negro, edificio…")
+
+            delivery_notes = st.text_area("Instrucciones para entrega (opcional)", placeholder="Horario preferido, si hay caseta, etc.")
+
+            consent = st.checkbox("Acepto que Drop24 guarde mi domicilio para el servicio a domicilio (próximamente) *", value=False)
+
+            submitted = st.form_submit_button("Crear cuenta")
+
+        if submitted:
+            payload = clean_payload({
+                "username": username,
+                "full_name": full_name,
+                "phone": phone,
+                "email": email,
+                "preferred_contact": preferred_contact,
+                "street": street,
+                "ext_number": ext_number,
+                "int_number": int_number,
+                "neighborhood": neighborhood,
+                "borough": borough,
+                "postal_code": postal_code,
+                "city": city,
+                "state": state,
+                "country": country,
+                "between_streets": between_streets,
+                "references": references,
+                "delivery_notes": delivery_notes,
+            })
 
-    with st.form("register_form", clear_on_submit=False):
-        st.subheader("Datos del usuario")
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            username = st.text_input("Usuario (único) *", placeholder="ej: cliente001").strip().lower()
-        with c2:
-            full_name = st.text_input("Nombre completo *", placeholder="Nombre y apellido")
-        with c3:
-            phone = st.text_input("Teléfono (WhatsApp) *", placeholder="55 1234 5678")
-
-        c4, c5 = st.columns(2)
-        with c4:
-            email = st.text_input("Email *", placeholder="correo@ejemplo.com")
-        with c5:
-            preferred_contact = st.selectbox("Contacto preferido", ["WhatsApp", "Llamada", "Email"])
-
-        st.subheader("Seguridad de cuenta")
-        p1 = st.text_input("Contraseña *", type="password")
-        p2 = st.text_input("Confirmar contraseña *", type="password")
-
-        st.markdown("---")
-        st.subheader("Domicilio (para servicio a domicilio · próximamente)")
-
-        a1, a2, a3 = st.columns(3)
-        with a1:
-            street = st.text_input("Calle *")
-        with a2:
-            ext_number = st.text_input("Número exterior *")
-        with a3:
-            int_number = st.text_input("Número interior (opcional)")
-
-        b1, b2, b3 = st.columns(3)
-        with b1:
-            neighborhood = st.text_input("Colonia *")
-        with b2:
-            borough = st.text_input("Alcaldía / Municipio *")
-        with b3:
-            postal_code = st.text_input("Código Postal *", max_chars=5)
-
-        c6, c7, c8 = st.columns(3)
-        with c6:
-            city = st.text_input("Ciudad *", value="CDMX")
-        with c7:
-            state = st.text_input("Estado *", value="Ciudad de México")
-        with c8:
-            country = st.text_input("País", value="México")
-
-        d1, d2 = st.columns(2)
-        with d1:
-            between_streets = st.text_input("Entre calles (opcional)", placeholder="Ej. Acoxpa y…")
-        with d2:
-            references = st.text_input("Referencias (opcional)", placeholder="Portón negro, edificio…")
-
-        delivery_notes = st.text_area("Instrucciones para entrega (opcional)", placeholder="Horario preferido, si hay caseta, etc.")
-
-        consent = st.checkbox("Acepto que Drop24 guarde mi domicilio para el servicio a domicilio (próximamente) *", value=False)
-
-        submitted = st.form_submit_button("Crear cuenta")
-
-    if submitted:
-        payload = {
-            "username": username,
-            "full_name": (full_name or "").strip(),
-            "phone": normalize_phone(phone),
-            "email": (email or "").strip().lower(),
-            "preferred_contact": preferred_contact,
-            "street": (street or "").strip(),
-            "ext_number": (ext_number or "").strip(),
-            "int_number": (int_number or "").strip(),
-            "neighborhood": (neighborhood or "").strip(),
-            "borough": (borough or "").strip(),
-            "postal_code": (postal_code or "").strip(),
-            "city": (city or "").strip(),
-            "state": (state or "").strip(),
-            "country": (country or "").strip(),
-            "between_streets": (between_streets or "").strip(),
-            "references": (references or "").strip(),
-            "delivery_notes": (delivery_notes or "").strip(),
-        }
-
-        required = [
-            "username", "full_name", "phone", "email",
-            "street", "ext_number", "neighborhood", "borough", "postal_code",
-            "city", "state"
-        ]
-        missing = require_fields(payload, required)
-
-        if missing:
-            st.error(f"Faltan campos obligatorios: {', '.join(missing)}")
-        elif not payload["postal_code"].isdigit() or len(payload["postal_code"]) != 5:
-            st.error("El Código Postal debe ser de 5 dígitos.")
-        elif p1 != p2:
-            st.error("Las contraseñas no coinciden.")
-        elif len(p1) < 6:
-            st.error("Contraseña muy corta (mínimo 6).")
-        elif not consent:
-            st.error("Debes aceptar el guardado de domicilio para continuar.")
-        else:
-            ref = user_ref(payload["username"])
-            if ref.get().exists:
-                st.error("Ese usuario ya existe. Elige otro.")
+            problem = validate_registration(payload, p1, p2, consent)
+            if problem:
+                st.error(problem)
             else:
-                ref.set({
-                    "username": payload["username"],
-                    "password_hash": hash_password(p1),
-                    "full_name": payload["full_name"],
-                    "phone": payload["phone"],
-                    "email": payload["email"],
-                    "preferred_contact": payload["preferred_contact"],
-                    "address": {
-                        "street": payload["street"],
-                        "ext_number": payload["ext_number"],
-                        "int_number": payload["int_number"],
-                        "neighborhood": payload["neighborhood"],
-                        "borough": payload["borough"],
-                        "postal_code": payload["postal_code"],
-                        "city": payload["city"],
-                        "state": payload["state"],
-                        "country": payload["country"],
-                        "between_streets": payload["between_streets"],
-                        "references": payload["references"],
-                        "delivery_notes": payload["delivery_notes"],
-                    },
-                    "delivery_service_future": True,
-                    "active": True,
-                    "role": "USER",
-                    "created_at": now_mx_str(),
-                    "updated_at": now_mx_str(),
-                })
-                st.success("Cuenta creada ✅ Ya puedes iniciar sesión en el sidebar.")
+                # un solo commit atómico: usuario + índices de teléfono y email (sin leer antes)
+                taken = user_store.register(payload["username"], user_doc(payload, hash_password(p1), now_mx()))
+                if taken == "username":
+                    st.error("Ese usuario ya existe. Elige otro.")
+                elif taken == "phone":
+                    st.error("Ese teléfono ya está registrado en otra cuenta.")
+                elif taken == "email":
+                    st.error("Ese email ya está registrado en otra cuenta.")
+                else:
+                    auth_service.forget(payload["username"], payload["phone"], payload["email"])
+                    st.success("Cuenta creada ✅ Ya puedes iniciar sesión en el sidebar.")
 
 # =================================================
 # TAB 2: QR AGENDADO
 # =================================================
 with tab_objs[2]:
-    if not st.session_state.auth:
-        st.info("Inicia sesión para generar QRs agendados.")
-        st.markdown(
-            """
-            <div class="card">
-            <b>¿Qué hace este QR?</b><br>
-            El QR contiene un token corto. La app Android validará en Firestore si está activo, dentro de horario y (si aplica) si ya fue usado.
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-    else:
-        st.markdown(
-            f"""
+    if tab_objs[2].open:
+        if not st.session_state.auth:
+            st.info("Inicia sesión para generar QRs agendados.")
+            st.markdown(QR_INFO_HTML, unsafe_allow_html=True)
+        else:
+            st.markdown(
+                f"""
             <div class="card">
             <b>Sesión activa:</b> {st.session_state.username}<br>
             <span class="note">Genera un QR con ventana de tiempo. Ideal para distinguir usuarios y reservas.</span>
             </div>
             """,
-            unsafe_allow_html=True,
-        )
-
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            client_id = st.text_input("Client ID (opcional)", placeholder="CNA1234...")
-        with c2:
-            access_type = st.selectbox("Acceso", ["BZ (Buzón)", "L1 (Locker 1)", "L2 (Locker 2)"])
-        with c3:
-            one_time = st.checkbox("QR de 1 solo uso (recomendado)", value=True)
-
-        st.markdown("### 🔒 Ventana fija (seguridad)")
-        st.caption("Los QRs duran **15 minutos** y solo puedes tener **1 QR activo** a la vez.")
+                unsafe_allow_html=True,
+            )
+
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                client_id = st.text_input("Client ID (opcional)", placeholder="CNA1234...")
+            with c2:
+                access_type = st.selectbox("Acceso", ["BZ (Buzón)", "L1 (Locker 1)", "L2 (Locker 2)"])
+            with c3:
+                one_time = st.checkbox("QR de 1 solo uso (recomendado)", value=True)
+
+            st.markdown("### 🔒 Ventana fija (seguridad)")
+            st.caption("Los QRs duran **15 minutos** y solo puedes tener **1 QR activo** a la vez.")
         
-        prefix = st.text_input("Prefijo QR", value="DROP24", key="qr_prefix_fixed")
+            prefix = st.text_input("Prefijo QR", value="DROP24", key="qr_prefix_fixed")
         
-        # Lockers: apartados solo por 1 hora
-        slot_label = None
-        locker_day = now_mx().date()
+            # Lockers: apartados solo por 1 hora
+            slot_label = None
+            locker_day = now_mx().date()
         
-        if access_type.startswith("L"):
-            st.markdown("#### ⏱️ Apartado de locker (1 hora)")
-            locker_day = st.date_input("Día del apartado", value=now_mx().date(), key="locker_day")
-            slots = next_full_hour_slots(7, 21)
-            slot_map = {slot_to_display(s): s for s in slots}  # display -> value real (24h)
-            
-            slot_display = st.selectbox(
-                "Horario (bloques de 1 hora)",
-                list(slot_map.keys()),
-                key="locker_slot_display"
-            )
-            slot_label = slot_map[slot_display]  # esto queda tipo '19:00-20:00'
+            if access_type.startswith("L"):
+                st.markdown("#### ⏱️ Apartado de locker (1 hora)")
+                locker_day = st.date_input("Día del apartado", value=now_mx().date(), min_value=now_mx().date(),
+                                           key="locker_day")
+                # hoy: solo los bloques que aún no terminan
+                slots = [s for s in next_full_hour_slots(7, 21) if slot_to_datetimes(s, locker_day)[1] > now_mx()]
+                # disponibilidad de todo el día en 1 lectura batch
+                free = locker_ledger.availability(access_type.split()[0], locker_day, slots)
+                def _slot_option(s):
+                    tag = "lleno" if free[s] <= 0 else f"{free[s]} libre" + ("s" if free[s] > 1 else "")
+                    return f"{slot_to_display(s)} · {tag}"
+
+                # el value real sigue siendo 24h ('19:00-20:00'); solo cambia lo que se ve
+                slot_label = st.selectbox(
+                    "Horario (bloques de 1 hora)",
+                    slots,
+                    format_func=_slot_option,
+                    key="locker_slot_display"
+                )
+                if not slots:
+                    st.info("Ya no quedan horarios para hoy. Elige otro día.")
 
-            st.warning("⚠️ Si no se recoge a tiempo, se guarda en almacén y tendrás que solicitar apoyo vía WhatsApp : +52 33 4392 8767")
+                st.warning("⚠️ Si no se recoge a tiempo, se guarda en almacén y tendrás que solicitar apoyo vía WhatsApp : +52 33 4392 8767")
         
-        if st.button("✅ Crear QR (15 min)", use_container_width=True, key="btn_create_qr_fixed"):
-            # 1) Bloqueo: si ya tiene uno activo vigente, no crear otro
-            existing = get_active_qr_for_user(st.session_state.username)
-            if existing:
-                x = existing.to_dict() or {}
-                st.error(f"Ya tienes un QR activo vigente hasta: **{x.get('end_time','')}**. Espera a que termine.")
-            else:
+            create_qr = st.button("✅ Crear QR (15 min)", use_container_width=True, key="btn_create_qr_fixed")
+            if create_qr and access_type.startswith("L") and not slot_label:
+                st.error("Elige un horario de locker.")
+                create_qr = False
+            if create_qr:
                 token_id = make_token_id()
-                payload_qr = f"{prefix}|{token_id}"
-        
-                # 2) Ventana fija: 15 min (Buzón)
+
+                # 1) Ventana fija: 15 min (Buzón)
                 start_dt = now_mx().replace(second=0, microsecond=0)
                 end_dt = start_dt + timedelta(minutes=15)
-        
-                # 3) Lockers: ventana fija por slot (1 hora)
+
+                # 2) Lockers: ventana fija por slot (1 hora)
                 if access_type.startswith("L") and slot_label:
                     start_dt, end_dt = slot_to_datetimes(slot_label, locker_day)
-        
-                token_ref(token_id).set({
+
+                # Payload: firmado si hay llaves (el escáner valida sin red); si no, el formato clásico
+                if QR_SIGNER:
+                    payload_qr = QR_SIGNER.sign(prefix, token_id, access_type.split()[0], start_dt, end_dt, bool(one_time))
+                else:
+                    payload_qr = f"{prefix}|{token_id}"
+
+                # 3) Bloqueo: si ya tiene uno activo vigente, no se crea otro (misma transacción)
+                #    Lockers: el horario se aparta en esa misma transacción
+                token_data = {
                     "token_id": token_id,
                     "payload": payload_qr,
                     "username": st.session_state.username,
                     "client_id": (client_id or "").strip(),
                     "access_type": access_type.split()[0],
-        
+
                     "start_time": dt_to_str(start_dt),
                     "end_time": dt_to_str(end_dt),
-        
+
                     "start_ts": start_dt,
                     "end_ts": end_dt,
-        
+
                     "one_time": bool(one_time),
                     "used": False,
                     "used_at": None,
                     "active": True,
-        
+
                     # info extra locker
                     "locker_day": str(locker_day) if access_type.startswith("L") else None,
                     "locker_slot": slot_label if access_type.startswith("L") else None,
-        
-                    "created_at": now_mx_str(),
+
+                    "created_at": now_mx(),
                     "created_by": st.session_state.username,
-                })
-        
-                png = make_qr_png_bytes(payload_qr)
+                }
+
+                try:
+                    existing = token_store.issue(token_id, token_data, now_mx(), ledger=locker_ledger)
+                    slot_taken = False
+                except SlotUnavailable:
+                    existing, slot_taken = None, True
+
+                if slot_taken:
+                    st.error("Ese horario de locker ya está lleno. Elige otro bloque.")
+                elif existing:
+                    st.error(f"Ya tienes un QR activo vigente hasta: **{existing.get('end_time','')}**. Espera a que termine.")
+                else:
+                    png = make_qr_png_bytes(payload_qr)
         
-                st.success("QR creado y guardado ✅")
-                st.code(payload_qr)
-                st.image(png, caption="QR generado", width=260)
+                    st.success("QR creado y guardado ✅")
+                    st.code(payload_qr)
+                    st.image(png, caption="QR generado", width=260)
         
-                st.download_button(
-                    "⬇️ Descargar QR (PNG)",
-                    data=png,
-                    file_name=f"DROP24_QR_{token_id}.png",
-                    mime="image/png",
-                    use_container_width=True,
-                )
+                    d1, d2 = st.columns(2)
+                    with d1:
+                        st.download_button(
+                            "⬇️ Descargar QR (PNG)",
+                            data=png,
+                            file_name=f"DROP24_QR_{token_id}.png",
+                            mime="image/png",
+                            use_container_width=True,
+                        )
+                    with d2:
+                        st.download_button(
+                            "⬇️ Descargar QR (SVG)",
+                            data=render_qr(payload_qr, "svg"),
+                            file_name=f"DROP24_QR_{token_id}.svg",
+                            mime=QR_MIME["svg"],
+                            use_container_width=True,
+                        )
         
                 
                 
-        st.markdown("---")
-        st.markdown("### Mis últimos QRs")
-
-        rows = []
-        try:
-            docs = (
-                db.collection(TOKENS_COL)
-                .where("created_by", "==", st.session_state.username)
-                .limit(50)   # leo más y ordeno aquí
-                .stream()
-            )
-
-
-            for d in docs:
-                x = d.to_dict() or {}
-                rows.append({
-                    "token_id": x.get("token_id"),
-                    "access_type": x.get("access_type"),
-                    "start_time": x.get("start_time"),
-                    "end_time": x.get("end_time"),
-                    "one_time": x.get("one_time"),
-                    "used": x.get("used"),
-                    "active": x.get("active"),
-                    "created_at": x.get("created_at"),
-                })
-        except Exception as e:
-            st.error(f"Error leyendo QRs: {e}")
-
-        if rows:
-            df_rows = pd.DataFrame(rows)
-            if "created_at" in df_rows.columns:
-                df_rows = df_rows.sort_values("created_at", ascending=False)
-            st.dataframe(df_rows, use_container_width=True, hide_index=True)
-        else:
-            st.info("Aún no has generado QRs.")
-
-        if rows:
-            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
-        else:
-            st.info("Aún no has generado QRs.")
+            st.markdown("---")
+            st.markdown("### Mis últimos QRs")
+
+            rows = []
+            payloads = {}  # token_id -> payload, para volver a mostrar sin regenerar nada
+            with metrics.span("ui.mis_qrs"):
+                try:
+                    docs = token_store.latest_by_creator(st.session_state.username, MY_QRS_LIMIT)
+
+                    for x in docs:
+                        if x.get("payload"):
+                            payloads[x.get("token_id")] = x["payload"]
+                        rows.append({
+                            "token_id": x.get("token_id"),
+                            "access_type": x.get("access_type"),
+                            "start_time": x.get("start_time"),
+                            "end_time": x.get("end_time"),
+                            "one_time": x.get("one_time"),
+                            "used": x.get("used"),
+                            "active": x.get("active"),
+                            "created_at": fmt_ts(x.get("created_at")),
+                        })
+                except Exception as e:
+                    st.error(f"Error leyendo QRs: {e}")
+
+            if rows:
+                import pandas as pd
+
+                st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            else:
+                st.info("Aún no has generado QRs.")
+
+            if payloads:
+                with st.expander("🔁 Ver / descargar un QR anterior", expanded=False):
+                    r1, r2 = st.columns([2, 1])
+                    with r1:
+                        again_id = st.selectbox("Token", list(payloads), key="qr_again_token")
+                    with r2:
+                        again_fmt = st.selectbox(
+                            "Formato",
+                            ["png", "svg", "png1"],
+                            format_func={"png": "PNG", "svg": "SVG", "png1": "PNG compacto (1 bit)"}.get,
+                            key="qr_again_fmt",
+                        )
+                    img = render_qr(payloads[again_id], again_fmt)  # cache LRU: no se vuelve a codificar
+                    st.image(render_qr(payloads[again_id], "png"), caption=again_id, width=220)
+                    ext = "svg" if again_fmt == "svg" else "png"
+                    st.download_button(
+                        f"⬇️ Descargar ({ext.upper()})",
+                        data=img,
+                        file_name=f"DROP24_QR_{again_id}.{ext}",
+                        mime=QR_MIME[again_fmt],
+                        use_container_width=True,
+                        key="btn_qr_again_download",
+                    )
 
 # =================================================
 # TAB 3: CHATBOT (NUEVO)
 # =================================================
 with tab_objs[3]:
-    st.markdown(
-        """
-        <div class="card">
-        <b>🤖 Chatbot Drop24</b><br>
-        Soporte tipo “página de ayuda”: buzón 24/7, QR, lockers, tiempos y cuidado de prendas.
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
-
-    # historial por sesión
-    if "drop24_chat" not in st.session_state:
-        st.session_state.drop24_chat = [
-            {"role": "assistant", "content": "¡Hola! Soy el asistente de Drop24 🧺 ¿Qué duda tienes hoy?"}
-        ]
-    
-    # FAQ rápida
-    with st.expander("📌 Preguntas frecuentes (FAQ)", expanded=False):
-        c1, c2, c3, c4 = st.columns(4)
-        if c1.button("¿Cómo funciona el buzón 24/7?", use_container_width=True):
-            send_to_drop24_bot("¿Cómo funciona el buzón 24/7?")
-        if c2.button("¿Cuánto tarda la entrega?", use_container_width=True):
-            send_to_drop24_bot("¿Cuánto tarda la entrega?")
-        if c3.button("Problemas con mi QR", use_container_width=True):
-            send_to_drop24_bot("Mi QR no funciona, ¿qué reviso?")
-        if c4.button("Ver precios", use_container_width=True):
-            send_to_drop24_bot("Precios")
-    
-    st.markdown("---")
-    
-    # pintar chat
-    for m in st.session_state.drop24_chat:
-        with st.chat_message(m["role"]):
-            st.write(m["content"])
-    
-    # input nativo
-    user_text = st.chat_input("Escribe tu duda…")
-    if user_text:
-        send_to_drop24_bot(user_text)
-
-
-    # botón limpiar
-    colA, colB = st.columns([1, 3])
-    with colA:
-        if st.button("🧹 Limpiar chat", use_container_width=True):
-            st.session_state.drop24_chat = [
-                {"role": "assistant", "content": "Listo ✅ ¿Qué duda tienes ahora?"}
-            ]
-            st.rerun()
-    with colB:
-        st.caption("Tip: usa las FAQ para respuestas rápidas.")
-
-
+    if tab_objs[3].open:
+        st.markdown(CHAT_INTRO_HTML, unsafe_allow_html=True)
 
+        chat_panel()
 
 
 # =================================================
@@ -1085,100 +808,349 @@ with tab_objs[3]:
 # =================================================
 if is_admin():
     with tab_objs[4]:
-        st.subheader("🛡️ Admin · Usuarios")
-        st.caption("Control básico: ver usuarios y activar/desactivar.")
-
-        docs = db.collection(USERS_COL).limit(200).stream()
-        data = []
-        for d in docs:
-            x = d.to_dict() or {}
-            addr = x.get("address", {}) or {}
-            data.append({
-                "username": x.get("username"),
-                "full_name": x.get("full_name"),
-                "phone": x.get("phone"),
-                "email": x.get("email"),
-                "active": x.get("active", True),
-                "street": addr.get("street", ""),
-                "ext": addr.get("ext_number", ""),
-                "colonia": addr.get("neighborhood", ""),
-                "borough": addr.get("borough", ""),
-                "cp": addr.get("postal_code", ""),
-                "created_at": x.get("created_at", ""),
-            })
-
-        df = pd.DataFrame(data) if data else pd.DataFrame()
-        if df.empty:
-            st.info("No hay usuarios todavía.")
-        else:
-            st.dataframe(df, use_container_width=True, hide_index=True)
+        if tab_objs[4].open:
+            st.subheader("🛡️ Admin · Usuarios")
+            st.caption("Control básico: ver usuarios y activar/desactivar.")
+
+            # Búsqueda de mostrador: una lectura puntual por índice (teléfono/email) + la del usuario
+            st.markdown("### 🔎 Buscar cliente")
+            s1, s2 = st.columns([3, 1])
+            with s1:
+                search_q = st.text_input("Usuario, teléfono (WhatsApp) o email", key="adm_search_q").strip()
+            with s2:
+                st.write("")
+                if st.button("Buscar", use_container_width=True, key="btn_adm_search") and search_q:
+                    st.session_state.adm_found = user_store.find(search_q)[0] or ""
+            found_u = st.session_state.get("adm_found")
+            if found_u == "":
+                st.info("No hay una cuenta con ese usuario, teléfono o email.")
+            elif found_u:
+                found = user_store.get(found_u) or {}
+                addr = found.get("address", {}) or {}
+                st.markdown(
+                    f"**{found_u}** · {found.get('full_name', '')} · "
+                    f"{'activo' if found.get('active', True) else 'inactivo'}  \n"
+                    f"📱 {found.get('phone', '')} · ✉️ {found.get('email', '')}  \n"
+                    f"📍 {addr.get('street', '')} {addr.get('ext_number', '')}, {addr.get('neighborhood', '')}, "
+                    f"{addr.get('borough', '')} {addr.get('postal_code', '')}"
+                )
+                with st.expander("✏️ Cambiar teléfono / email", expanded=False):
+                    c_phone = st.text_input("Teléfono", value=found.get("phone", ""), key="adm_contact_phone")
+                    c_email = st.text_input("Email", value=found.get("email", ""), key="adm_contact_email")
+                    if st.button("Guardar contacto", use_container_width=True, key="btn_adm_contact"):
+                        if not normalize_phone(c_phone) or not c_email.strip():
+                            st.error("Teléfono y email son obligatorios.")
+                        else:
+                            taken = user_store.update_contact(found_u, phone=c_phone, email=c_email, now=now_mx())
+                            if taken == "phone":
+                                st.error("Ese teléfono ya está registrado en otra cuenta.")
+                            elif taken == "email":
+                                st.error("Ese email ya está registrado en otra cuenta.")
+                            elif taken:
+                                st.error("No existe ese usuario.")
+                            else:
+                                auth_service.forget(normalize_phone(c_phone), c_email)
+                                st.success("Contacto actualizado ✅")
+
+            st.markdown("---")
+
+            f1, f2, f3, f4, f5 = st.columns([1, 2, 1, 2, 1])
+            with f1:
+                f_active = st.selectbox("Estado", ["Todos", "Activos", "Inactivos"], key="adm_f_active")
+            with f2:
+                f_borough = st.text_input("Alcaldía / Municipio", key="adm_f_borough").strip()
+            with f3:
+                f_cp = st.text_input("CP", max_chars=5, key="adm_f_cp").strip()
+            with f4:
+                f_order = st.selectbox(
+                    "Orden",
+                    ["created_at:desc", "created_at:asc", "username:asc", "full_name:asc"],
+                    format_func={
+                        "created_at:desc": "Más recientes",
+                        "created_at:asc": "Más antiguos",
+                        "username:asc": "Usuario A-Z",
+                        "full_name:asc": "Nombre A-Z",
+                    }.get,
+                    key="adm_f_order",
+                )
+            with f5:
+                f_size = st.selectbox("Por página", [25, 50, 100], index=1, key="adm_f_size")
+
+            # Paginación con cursores; si cambian filtros se regresa a la página 1
+            query_key = (f_active, f_borough, f_cp, f_order, f_size)
+            if st.session_state.get("adm_query_key") != query_key:
+                st.session_state.adm_query_key = query_key
+                st.session_state.adm_cursors = [None]  # cursor de inicio de cada página vista
+
+            order_field, order_dir = f_order.split(":")
+            with metrics.span("ui.admin_directory"):
+                try:
+                    docs, next_cursor = user_store.page(
+                        active={"Todos": None, "Activos": True, "Inactivos": False}[f_active],
+                        borough=f_borough,
+                        postal_code=f_cp,
+                        order=order_field,
+                        desc=order_dir == "desc",
+                        size=f_size,
+                        cursor=st.session_state.adm_cursors[-1],
+                    )
+                except Exception as e:
+                    # p. ej. FAILED_PRECONDITION de Firestore si falta un índice de firestore.indexes.json
+                    st.error(f"No se pudo consultar el directorio con esos filtros: {e}")
+                    docs, next_cursor = [], None
+                data = []
+                for x in docs:
+                    addr = x.get("address", {}) or {}
+                    data.append({
+                        "username": x.get("username"),
+                        "full_name": x.get("full_name"),
+                        "phone": x.get("phone"),
+                        "email": x.get("email"),
+                        "active": x.get("active", True),
+                        "street": addr.get("street", ""),
+                        "ext": addr.get("ext_number", ""),
+                        "colonia": addr.get("neighborhood", ""),
+                        "borough": addr.get("borough", ""),
+                        "cp": addr.get("postal_code", ""),
+                        "created_at": fmt_ts(x.get("created_at")),
+                    })
 
-        st.markdown("---")
-        st.markdown("### Cambiar estatus de usuario")
-        u_target = st.text_input("Username a modificar", placeholder="ej: cliente001").strip().lower()
-        new_active = st.selectbox("Nuevo estado", [True, False], index=0)
+                import pandas as pd
 
-        if st.button("Aplicar cambio", use_container_width=True, key="btn_admin_toggle"):
-            if not u_target:
-                st.error("Escribe un username.")
+                df = pd.DataFrame(data) if data else pd.DataFrame()
+            if df.empty:
+                st.info("No hay usuarios con esos filtros.")
             else:
-                ref = user_ref(u_target)
-                if not ref.get().exists:
-                    st.error("No existe ese usuario.")
+                st.dataframe(df, use_container_width=True, hide_index=True)
+
+            page_no = len(st.session_state.adm_cursors)
+            n1, n2, n3 = st.columns([1, 2, 1])
+            with n1:
+                if st.button("◀ Anterior", use_container_width=True, disabled=page_no == 1, key="btn_adm_prev"):
+                    st.session_state.adm_cursors.pop()
+                    st.rerun()
+            with n2:
+                st.caption(f"Página {page_no} · {len(data)} usuarios")
+            with n3:
+                if st.button("Siguiente ▶", use_container_width=True, disabled=next_cursor is None, key="btn_adm_next"):
+                    st.session_state.adm_cursors.append(next_cursor)
+                    st.rerun()
+
+            st.markdown("---")
+            st.markdown("### Cambiar estatus de usuario")
+            u_target = st.text_input("Usuario, teléfono o email a modificar", placeholder="ej: cliente001").strip()
+            new_active = st.selectbox("Nuevo estado", [True, False], index=0)
+
+            if st.button("Aplicar cambio", use_container_width=True, key="btn_admin_toggle"):
+                if not u_target:
+                    st.error("Escribe un username.")
                 else:
-                    ref.update({
-                        "active": bool(new_active),
-                        "updated_at": now_mx_str(),
-                    })
-                    st.success("Actualizado ✅")
+                    u_target = user_store.find(u_target)[0]
+                    if not u_target:
+                        st.error("No existe ese usuario.")
+                    else:
+                        user_store.update(u_target, {
+                            "active": bool(new_active),
+                            "updated_at": now_mx(),
+                        })
+                        st.success("Actualizado ✅")
+                        if not new_active:
+                            # sus QRs vigentes dejan de abrir también en escáneres offline/cache
+                            revoked = revoke_user_tokens(token_store, revocation_feed, u_target, now_mx())
+                            if revoked:
+                                st.info(f"QRs revocados: {len(revoked)}")
+
+            st.markdown("---")
+            st.markdown("### 📥 Importar / 📤 Exportar usuarios")
+            st.caption(
+                "XLSX o CSV con encabezados username, full_name, phone, email, street, ext_number, neighborhood, "
+                "borough, postal_code… (los de la exportación) y password (obligatoria; la exportación la trae vacía). "
+                "Mismas reglas que el Registro. "
+                "Si se corta, sube el mismo archivo otra vez y sigue donde se quedó."
+            )
+            imp_file = st.file_uploader("Archivo de usuarios", type=["xlsx", "csv"], key="users_import_file")
+            imp_restart = st.checkbox("Empezar de cero (ignorar el avance guardado)", key="users_import_restart")
+            if st.button("📥 Importar", use_container_width=True, disabled=imp_file is None, key="btn_users_import"):
+                imp_status = st.empty()
+                result = import_users(
+                    init_storage(), imp_file, imp_file.name, restart=imp_restart,
+                    progress=lambda done, created: imp_status.info(f"{done} filas leídas · {created} usuarios creados…"),
+                    # que los recién importados puedan entrar ya (sin esperar la cache negativa del login)
+                    on_created=lambda ps: auth_service.forget(*(p[k] for p in ps for k in ("username", "phone", "email"))),
+                )
+                user_store.invalidate()
+                imp_status.empty()
+                if result["resumed_from"]:
+                    st.info(f"Se retomó desde la fila {result['resumed_from'] + 2}.")
+                st.success(f"Importación: {result['created']} usuarios creados, {result['failed']} filas con error.")
+                if result["errors"]:
+                    import pandas as pd
+
+                    st.dataframe(pd.DataFrame(result["errors"], columns=["fila", "error"]),
+                                 use_container_width=True, hide_index=True)
+
+            x1, x2 = st.columns([1, 2])
+            with x1:
+                exp_fmt = st.selectbox("Formato", ["xlsx", "csv"], key="users_export_fmt")
+            with x2:
+                st.write("")
+                exp_go = st.button("📤 Exportar todos", use_container_width=True, key="btn_users_export")
+            if exp_go:
+                import tempfile
+
+                with tempfile.TemporaryDirectory() as tmp:
+                    exp_path = os.path.join(tmp, f"drop24_usuarios.{exp_fmt}")
+                    n_exp = export_users(init_storage(), exp_path, fmt_ts=fmt_ts)
+                    with open(exp_path, "rb") as f:
+                        exp_data = f.read()
+                st.success(f"{n_exp} usuarios exportados.")
+                st.download_button(
+                    "⬇️ Descargar", data=exp_data, file_name=f"drop24_usuarios_{now_mx():%Y%m%d}.{exp_fmt}",
+                    mime=("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet" if exp_fmt == "xlsx"
+                          else "text/csv"),
+                    use_container_width=True, key="btn_users_export_download",
+                )
 
-import textwrap
+            st.markdown("---")
+            st.markdown("### 🧾 Emisión masiva de QRs")
+            st.caption("Pases de buzón pre-emitidos. Se guardan en batches de 500. Los lockers se apartan por "
+                       "horario desde Generar QR (cada bloque tiene cupo).")
+
+            m1, m2, m3 = st.columns(3)
+            with m1:
+                bulk_n = st.number_input("Cantidad", min_value=1, max_value=5000, value=50, step=10, key="bulk_n")
+            with m2:
+                bulk_access = st.selectbox("Acceso", ["BZ (Buzón)"], key="bulk_access")
+            with m3:
+                bulk_out = st.selectbox("Salida", ["Hoja imprimible (PDF)", "ZIP de PNGs"], key="bulk_out")
+
+            m4, m5, m6 = st.columns(3)
+            with m4:
+                bulk_day = st.date_input("Válido desde", value=now_mx().date(), key="bulk_day")
+            with m5:
+                bulk_days = st.number_input("Días de vigencia", min_value=1, max_value=365, value=30, key="bulk_days")
+            with m6:
+                bulk_one_time = st.checkbox("1 solo uso", value=True, key="bulk_one_time")
+            bulk_prefix = st.text_input("Prefijo QR", value="DROP24", key="bulk_prefix")
+
+            if st.button("🧾 Generar lote", use_container_width=True, key="btn_bulk_issue"):
+                b_start = datetime.combine(bulk_day, dtime(0, 0)).replace(tzinfo=MEXICO_TZ)
+                b_end = b_start + timedelta(days=int(bulk_days))
+                b_access = bulk_access.split()[0]
+                batch_id = f"B{now_mx():%Y%m%d%H%M%S}"
+
+                bulk_tokens = new_bulk_tokens(
+                    bulk_n, b_access, b_start, b_end, bulk_one_time, bulk_prefix,
+                    created_by="admin:bulk", batch_id=batch_id, created_at=now_mx(),
+                    dt_to_str=dt_to_str, signer=QR_SIGNER,
+                )
+
+                bar = st.progress(0.0, text="Guardando tokens…")
+                token_store.create_many(bulk_tokens, progress=lambda d, t: bar.progress(d / t * 0.3, text=f"Guardados {d}/{t}"))
+
+                fmt = "png1" if bulk_out.startswith("Hoja") else "png"
+                # las imágenes se consumen conforme se escribe el archivo (temporal, no en memoria)
+                imgs = iter_render(
+                    [x["payload"] for x in bulk_tokens], fmt=fmt,
+                    progress=lambda d, t: bar.progress(0.3 + d / t * 0.6, text=f"QRs {d}/{t}"),
+                )
+
+                import tempfile
+
+                if fmt == "png1":
+                    fname, mime = f"DROP24_{batch_id}.pdf", "application/pdf"
+                else:
+                    fname, mime = f"DROP24_{batch_id}.zip", "application/zip"
+                with tempfile.TemporaryDirectory() as tmp:
+                    bulk_path = os.path.join(tmp, fname)
+                    with open(bulk_path, "wb") as out:
+                        if fmt == "png1":
+                            build_sheet_pdf(bulk_tokens, imgs, title=f"DROP24 · {batch_id}", out=out)
+                        else:
+                            build_zip(bulk_tokens, imgs, out=out)
+                    bar.progress(1.0, text="Listo ✅")
+
+                    st.success(f"Lote {batch_id}: {len(bulk_tokens)} QRs creados ✅")
+                    with open(bulk_path, "rb") as f:
+                        st.download_button("⬇️ Descargar lote", data=f, file_name=fname, mime=mime,
+                                           use_container_width=True, key="btn_bulk_download")
+
+            st.markdown("---")
+            st.markdown("### 🗄️ Auditoría de QRs (incluye archivo)")
+            st.caption(f"Los QRs cerrados con más de {ARCHIVE_KEEP_DAYS} días se mueven a colecciones mensuales.")
+            a1, a2 = st.columns([2, 1])
+            with a1:
+                audit_q = st.text_input("Token o username", key="audit_q").strip()
+            with a2:
+                audit_months = archive_reader.months()
+                audit_month = st.selectbox("Mes archivado", ["(todos)"] + audit_months, key="audit_month")
+            if st.button("Buscar", use_container_width=True, key="btn_audit_search") and audit_q:
+                where_found, tok = archive_reader.find(audit_q.upper())
+                if tok:
+                    st.success(f"Token en `{where_found}`")
+                    st.json({k: fmt_ts(v) if isinstance(v, datetime) else v for k, v in tok.items()})
+                else:
+                    m = None if audit_month == "(todos)" else audit_month
+                    rows = archive_reader.by_user(audit_q.lower(), month_from=m, month_to=m)
+                    if rows:
+                        import pandas as pd
+
+                        st.dataframe(pd.DataFrame([{
+                            "token_id": x.get("token_id"),
+                            "access_type": x.get("access_type"),
+                            "start_time": x.get("start_time"),
+                            "end_time": x.get("end_time"),
+                            "used": x.get("used"),
+                            "created_at": fmt_ts(x.get("created_at")),
+                        } for x in rows]), use_container_width=True, hide_index=True)
+                    else:
+                        st.info("Sin resultados en el archivo.")
 
 # =================================================
-# CONÓCENOS
+# TAB 5: RENDIMIENTO (solo admin)
 # =================================================
-conocenos_html = f"""<div class="card" style="margin-top:28px;">
-  <div style="display:flex;align-items:center;gap:16px;flex-wrap:wrap;">
-    {logo_html}
-    <div>
-      <h3 style="margin:0;color:{C_TEAL_DARK};font-weight:900;">Conócenos</h3>
-      <div class="note">Tecnología, confianza y comodidad para tu ropa</div>
-    </div>
-  </div>
-
-  <hr style="margin:14px 0;border:none;border-top:1px solid #E5EFF3;">
-
-  <p style="font-size:14px;line-height:1.6;margin:0 0 12px 0;">
-    <b>Drop24</b> es una plataforma de lavandería moderna que combina
-    <b>tecnología</b>, <b>automatización</b> y <b>atención responsable</b>.
-    Estamos preparando nuestro <b>servicio a domicilio</b> para que puedas
-    olvidarte por completo del lavado de ropa.
-  </p>
-
-  <div>
-    <span class="pill">Servicio a domicilio · Próximamente</span>
-    <span class="pill">Accesos con QR</span>
-    <span class="pill">Tecnología Drop24</span>
-  </div>
-</div>"""
-
-st.markdown(conocenos_html, unsafe_allow_html=True)
+if is_admin():
+    with tab_objs[5]:
+        if tab_objs[5].open:
+            st.subheader("📈 Rendimiento")
+            st.caption(
+                "Tiempos (p50/p95) y lecturas/escrituras de documentos por operación, desde que arrancó el proceso. "
+                "Las lecturas son las que cobra Firestore (una consulta vacía cuenta 1)."
+            )
+            sess = st.session_state._perf_session
+            p1, p2, p3, p4 = st.columns(4)
+            p1.metric("Lecturas (este rerun)", perf_run.reads)
+            p2.metric("Escrituras (este rerun)", perf_run.writes)
+            p3.metric("Lecturas (sesión)", sess.reads + perf_run.reads)
+            p4.metric("Escrituras (sesión)", sess.writes + perf_run.writes)
+
+            rows = metrics.snapshot()
+            if rows:
+                import pandas as pd
+
+                st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            else:
+                st.info("Aún no hay mediciones.")
+
+            d1, d2, d3 = st.columns(3)
+            with d1:
+                st.download_button(
+                    "⬇️ Prometheus (.prom)", metrics.prometheus_text(), file_name="drop24.prom",
+                    mime="text/plain", use_container_width=True, key="dl_perf_prom",
+                )
+            with d2:
+                st.download_button(
+                    "⬇️ Reruns (JSONL)", metrics.recent_runs_jsonl(), file_name="drop24_runs.jsonl",
+                    mime="application/x-ndjson", use_container_width=True, key="dl_perf_jsonl",
+                )
+            with d3:
+                if st.button("Reiniciar contadores", use_container_width=True, key="btn_perf_reset"):
+                    metrics.reset()
+                    st.rerun()
 
 # =================================================
-# FOOTER (logo abajo)
+# CONÓCENOS + FOOTER (logo abajo)
 # =================================================
-st.markdown(
-    f"""
-    <br>
-    <div style="text-align:center;margin-top:30px;">
-        <div style="display:flex;justify-content:center;margin-bottom:10px;">
-            {logo_html}
-        </div>
-        <div class="note">
-            © {now_mx().year} · {ORG_NAME}<br>
-            <span class="note">Portal Drop24 en Streamlit + Firestore. Domicilio requerido para servicio a domicilio (próximamente).</span>
-        </div>
-    </div>
-    """,
-    unsafe_allow_html=True,
-)
+st.markdown(closing_html(logo_html, now_mx().year, ORG_NAME), unsafe_allow_html=True)
+
+st.session_state._perf_session.add(metrics.finish_run(perf_run))
@@ -0,0 +1,262 @@
+"""
+Benchmarks de los caminos calientes del portal (sin Firestore, sin Streamlit).
+
+Corre contra ``LocalBackend(":memory:")`` envuelto en ``InstrumentedBackend``,
+así además del tiempo sale cuántas lecturas/escrituras de documento cuesta
+cada llamada (eso no depende de la máquina y es lo que cobra Firestore).
+
+Casos:
+
+- ``active_qr/<n>``: puntero del QR activo (``get_active_qr_for_user``) con n tokens del usuario.
+- ``my_qrs/<n>``: "Mis últimos QRs" (``latest_by_creator``) con n tokens del usuario.
+- ``qr_png/<len>``: ``make_qr_png_bytes`` sin cache, por largo de payload.
+- ``bcrypt_hash/<rounds>``, ``bcrypt_check/<rounds>``.
+- ``help_answer``: chatbot sobre ``help_corpus.jsonl``.
+- ``admin_page/<n>``, ``admin_page_filtered/<n>``: primera página del directorio admin con n usuarios.
+- ``find_user_phone/<n>``, ``find_user_email/<n>``: login/búsqueda de mostrador por teléfono o email.
+
+Salida JSON (``--out``); con ``thresholds.json`` y/o ``--baseline`` el proceso
+termina con código 1 si algo se pasa:
+
+    python benchmarks/bench_hot.py --out bench.json
+    python benchmarks/bench_hot.py --quick --baseline bench.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drop24 import metrics  # noqa: E402
+from drop24.helpdesk import help_answer  # noqa: E402
+from drop24.passwords import check_password, hash_password  # noqa: E402
+from drop24.qrrender import make_qr_png_bytes  # noqa: E402
+from drop24.registration import DEFAULTS, clean_payload, user_doc  # noqa: E402
+from drop24.repository import (  # noqa: E402
+    ACCESS_BUZON, ACTIVE_COL, TOKENS_COL, USERS_COL, TokenStore, UserStore, index_claims,
+)
+from drop24.storage import BATCH_LIMIT, LocalBackend  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(HERE, "help_corpus.jsonl")
+THRESHOLDS = os.path.join(HERE, "thresholds.json")
+
+TOKEN_SIZES = (10, 1_000, 100_000)
+USER_SIZES = (200, 10_000, 100_000)
+QUICK_MAX = 10_000  # --quick: sin los casos de 100k
+PAYLOAD_LENS = (16, 64, 256, 1024)
+BCRYPT_ROUNDS = 10  # fijo para que los números comparen entre máquinas (en producción se calibra)
+BOROUGHS = ("Coyoacán", "Tlalpan", "Benito Juárez", "Cuauhtémoc", "Miguel Hidalgo")
+PRICES = defaultdict(lambda: 99)  # las respuestas solo formatean precios; el valor no importa
+NOW = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+
+
+# =================================================
+# Datos sintéticos
+# =================================================
+def _bulk_set(backend, col, docs):
+    for i in range(0, len(docs), BATCH_LIMIT):
+        b = backend.batch()
+        for doc_id, data in docs[i:i + BATCH_LIMIT]:
+            b.set(col, doc_id, data)
+        b.commit()
+
+
+def seed_tokens(backend, username: str, n: int):
+    """n QRs de buzón del usuario, con los campos que escribe la app (el último vigente) + el puntero."""
+    docs = []
+    for i in range(n):
+        start = NOW - timedelta(minutes=15 * (n - i))
+        end = start + timedelta(minutes=15)
+        tid = f"{username[:4].upper()}{i:08X}"
+        docs.append((tid, {
+            "token_id": tid, "payload": f"DROP24|{tid}", "username": username, "client_id": "",
+            "access_type": ACCESS_BUZON, "start_time": start.isoformat(), "end_time": end.isoformat(),
+            "start_ts": start, "end_ts": end, "one_time": True, "used": i < n - 1, "used_at": None,
+            "active": i == n - 1, "locker_day": None, "locker_slot": None,
+            "created_at": start, "created_by": username,
+        }))
+    _bulk_set(backend, TOKENS_COL, docs)
+    last_id, last = docs[-1]
+    backend.set(ACTIVE_COL, username, {"token_id": last_id, "end_ts": NOW + timedelta(minutes=10)})
+
+
+def seed_users(backend, n: int):
+    """n usuarios armados como el Registro (clean_payload + user_doc) y sus índices (index_claims)."""
+    docs = []
+    for i in range(n):
+        payload = clean_payload({
+            "username": f"user{i:06d}", "full_name": f"Cliente {i}", "phone": f"55 {i:08d}",
+            "email": f"User{i:06d}@Example.com", "street": "Av. Universidad", "ext_number": str(i),
+            "neighborhood": "Xoco", "borough": BOROUGHS[i % len(BOROUGHS)], "postal_code": f"{4000 + i % 90:05d}",
+        }, DEFAULTS)
+        doc = user_doc(payload, "", NOW - timedelta(seconds=n - i))
+        doc["active"] = i % 7 != 0
+        docs.append((payload["username"], doc))
+    _bulk_set(backend, USERS_COL, docs)
+    claims = defaultdict(list)
+    for u, d in docs:
+        for col, key in index_claims(u, d):
+            claims[col].append((key, {"username": u, "created_at": d["created_at"]}))
+    for col, entries in claims.items():
+        _bulk_set(backend, col, entries)
+
+
+# =================================================
+# Medición
+# =================================================
+def measure(fn, repeat: int, warmup: int = 3) -> dict:
+    """Corre ``fn(i)`` ``repeat`` veces; tiempos en ms y lecturas/escrituras promedio por llamada."""
+    for i in range(warmup):
+        fn(-1 - i)
+    metrics.reset()
+    samples = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    rows = [r for r in metrics.snapshot() if r["op"].startswith("db.")]
+    samples.sort()
+    return {
+        "n": repeat,
+        "p50_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "reads": round(sum(r["reads"] for r in rows) / repeat, 2),
+        "writes": round(sum(r["writes"] for r in rows) / repeat, 2),
+    }
+
+
+def run_suite(quick: bool = False, only: str = "", log=print) -> dict:
+    results = {}
+
+    def case(name, fn, repeat):
+        if only and not name.startswith(only):
+            return
+        results[name] = r = measure(fn, repeat)
+        log(f"  {name:<28} p50 {r['p50_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  reads {r['reads']:g}")
+
+    def wanted(*groups):
+        # para no sembrar datos de casos que no se van a correr
+        return not only or any(g.startswith(only) or only.startswith(g) for g in groups)
+
+    tokens = [n for n in TOKEN_SIZES if not quick or n <= QUICK_MAX]
+    users = [n for n in USER_SIZES if not quick or n <= QUICK_MAX]
+
+    for n in tokens:
+        if not wanted("active_qr", "my_qrs"):
+            continue
+        backend = metrics.InstrumentedBackend(LocalBackend(":memory:"))
+        seed_tokens(backend, "cliente", n)
+        store = TokenStore(backend)
+        case(f"active_qr/{n}", lambda i: store.active_for_user("cliente", NOW), 500)
+        case(f"my_qrs/{n}", lambda i: store.latest_by_creator("cliente", 20), 200)
+
+    for length in PAYLOAD_LENS:
+        # payload distinto en cada llamada: mide el render real, no el lru_cache
+        case(f"qr_png/{length}", lambda i, k=length: make_qr_png_bytes(f"{i:+012d}".ljust(k, "X")), 50)
+
+    pw_hash = hash_password("correcto-caballo-bateria", rounds=BCRYPT_ROUNDS)
+    case(f"bcrypt_hash/{BCRYPT_ROUNDS}", lambda i: hash_password("correcto-caballo-bateria", rounds=BCRYPT_ROUNDS), 10)
+    case(f"bcrypt_check/{BCRYPT_ROUNDS}", lambda i: check_password("correcto-caballo-bateria", pw_hash), 10)
+
+    with open(CORPUS, encoding="utf-8") as f:
+        questions = [json.loads(line)["q"] for line in f if line.strip()]
+    case("help_answer", lambda i: help_answer(questions[i % len(questions)], PRICES), 2000)
+
+    for n in users:
+        if not wanted("admin_page", "find_user"):
+            continue
+        backend = metrics.InstrumentedBackend(LocalBackend(":memory:"))
+        seed_users(backend, n)
+        store = UserStore(backend, page_ttl=0)  # sin cache: cada llamada va al backend
+        case(f"admin_page/{n}", lambda i: store.page(size=50), 100)
+        case(f"admin_page_filtered/{n}", lambda i: store.page(active=True, borough="Tlalpan", size=50), 100)
+        case(f"find_user_phone/{n}", lambda i, n=n: store.find(f"55 {(i * 7919) % n:08d}"), 500)
+        case(f"find_user_email/{n}", lambda i, n=n: store.find(f"User{(i * 7919) % n:06d}@example.com"), 500)
+
+    return results
+
+
+# =================================================
+# Umbrales
+# =================================================
+def check(results: dict, thresholds: dict, baseline: dict = None, max_regression: float = 0.25) -> list[str]:
+    """Lista de fallas: límites absolutos de thresholds.json y regresión de p50 contra un baseline."""
+    fails = []
+    for name, r in results.items():
+        for key, limit in thresholds.get(name, {}).items():
+            if r.get(key, 0) > limit:
+                fails.append(f"{name}: {key} {r[key]} > {limit}")
+        base = (baseline or {}).get(name)
+        if base:
+            if r["p50_ms"] > base["p50_ms"] * (1 + max_regression):
+                fails.append(f"{name}: p50 {r['p50_ms']} ms vs baseline {base['p50_ms']} ms (+{max_regression:.0%} máx.)")
+            if r["reads"] > base["reads"]:
+                fails.append(f"{name}: lecturas {r['reads']} vs baseline {base['reads']}")
+    return fails
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=HERE).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks de los caminos calientes de Drop24")
+    ap.add_argument("--quick", action="store_true", help="sin los casos de 100k (para correr en cada cambio)")
+    ap.add_argument("--only", default="", help="prefijo de caso, p. ej. admin_page")
+    ap.add_argument("--out", help="archivo JSON de resultados (default: stdout)")
+    ap.add_argument("--thresholds", default=THRESHOLDS)
+    ap.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    ap.add_argument("--max-regression", type=float, default=0.25, help="regresión de p50 tolerada contra el baseline")
+    args = ap.parse_args(argv)
+
+    log = (lambda *a: print(*a, file=sys.stderr)) if not args.out else print
+    results = run_suite(quick=args.quick, only=args.only, log=log)
+
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, encoding="utf-8") as f:
+            thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    fails = check(results, thresholds, baseline, args.max_regression)
+
+    report = {
+        "meta": {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "quick": args.quick,
+        },
+        "results": results,
+        "failures": fails,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for msg in fails:
+        print(f"✗ {msg}", file=sys.stderr)
+    return 1 if fails else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark del chatbot de ayuda (drop24.helpdesk).
+
+1) Precisión sobre help_corpus.jsonl (preguntas reales de clientes + intención esperada),
+   contra la cadena de ``any(k in t ...)`` que había antes.
+2) Latencia por pregunta (p50/p99) del matcher real.
+3) Escala: el mismo corpus con 10, 100 y 500 intenciones sintéticas extra;
+   la latencia debe quedarse casi plana.
+
+    python benchmarks/bench_intents.py
+"""
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drop24.helpdesk import INTENTS, MATCHER  # noqa: E402
+from drop24.intents import Intent, IntentMatcher  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "help_corpus.jsonl")
+REPEAT = 200
+
+
+def load_corpus() -> list[dict]:
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def legacy_route(text: str):
+    """La cadena de if original (primer empate gana), para comparar."""
+    t = (text or "").lower().strip()
+    if any(k in t for k in ["precio", "precios", "cuánto", "cuanto", "costo", "vale", "$", "tarifa"]):
+        return "precios"
+    if any(k in t for k in ["buzon", "buzón", "24/7", "depositar", "dejar ropa"]):
+        return "buzon"
+    if any(k in t for k in ["tarda", "entrega", "cuando", "listo", "24 horas", "24hrs", "24 h"]):
+        return "entrega"
+    if any(k in t for k in ["qr", "token", "agendado", "ventana", "no funciona", "error"]):
+        return "qr"
+    return None
+
+
+def accuracy(route, corpus) -> float:
+    return sum(route(x["q"]) == x["intent"] for x in corpus) / len(corpus)
+
+
+def latency_us(matcher, corpus, repeat=REPEAT) -> tuple:
+    samples = []
+    for _ in range(repeat):
+        for x in corpus:
+            t0 = time.perf_counter()
+            matcher.match(x["q"])
+            samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def synthetic_intents(n: int, seed: int = 24) -> list[Intent]:
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        words = {"".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(5, 10))): rnd.choice((1, 1.5, 2))
+                 for _ in range(8)}
+        out.append(Intent(f"faq_{i}", words, f"respuesta {i}"))
+    return out
+
+
+def main():
+    corpus = load_corpus()
+
+    def route(q):
+        m = MATCHER.match(q)
+        return m.intent.name if m.intent else None
+
+    print(f"corpus: {len(corpus)} preguntas")
+    print(f"precisión  legacy: {accuracy(legacy_route, corpus):.1%}   matcher: {accuracy(route, corpus):.1%}")
+    for x in corpus:
+        got = route(x["q"])
+        if got != x["intent"]:
+            print(f"  ✗ {x['q']!r}: esperado {x['intent']}, salió {got}")
+
+    print("latencia por pregunta (µs):")
+    for extra in (0, 10, 100, 500):
+        m = IntentMatcher(INTENTS + synthetic_intents(extra)) if extra else MATCHER
+        n_kw = len(m.table)
+        p50, p99 = latency_us(m, corpus)
+        print(f"  {len(m.intents):>4} intenciones / {n_kw:>5} palabras clave: p50 {p50:6.1f}  p99 {p99:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
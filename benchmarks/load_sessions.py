@@ -0,0 +1,263 @@
+"""
+Prueba de carga: muchas sesiones simultáneas corriendo el App.py real.
+
+Cada sesión es un ``AppTest`` (el script completo, sin navegador) contra un
+backend SQLite temporal y recorre el flujo de la hora pico de lockers:
+
+    abrir -> registro -> login -> crear QR -> ver "Mis últimos QRs" -> chatbot
+
+Todas comparten el proceso (``st.cache_resource``, stores, pool de bcrypt),
+igual que en un contenedor de Streamlit. AppTest cambia estado global del
+proceso en cada run (``st.secrets``, ``Runtime._instance``), así que los reruns
+se ejecutan de uno en uno con un lock: es el caso de un proceso donde el GIL
+serializa el script. La latencia de cada paso incluye la espera en esa cola
+(lo que siente el cliente); el tiempo de servicio es solo el rerun. Se reporta:
+
+- throughput (sesiones completas/s y reruns/s),
+- latencia por paso (p50/p95/p99) y tiempo de servicio (p50),
+- memoria por sesión viva (RSS del proceso con todas las sesiones abiertas).
+
+Con ``--ramp`` se repite con varios niveles de concurrencia; donde el
+throughput deja de crecer y el p95 se dispara está la saturación.
+
+    python benchmarks/load_sessions.py --sessions 200 --concurrency 50
+    python benchmarks/load_sessions.py --ramp 10,25,50,100 --sessions 200 --json carga.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "App.py")
+
+STEPS = ("open", "register", "login", "create_qr", "list_qrs", "chat")
+QR_TAB = "📲 QR Agendado"
+REGISTER_TAB = "📝 Registro"
+CHAT_TAB = "🤖 Chatbot Ayuda"
+QUESTIONS = ("¿Cuánto cuesta lavar?", "¿Cómo funciona el buzón 24/7?", "Mi QR no funciona", "¿Cuándo está lista mi ropa?")
+
+
+# AppTest no es thread-safe (ver arriba): un rerun a la vez en todo el proceso
+_RUN_LOCK = threading.Lock()
+
+
+def rss_bytes() -> int:
+    """RSS actual (Linux: /proc/self/statm; en otros, el pico de getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Session:
+    """Un navegador simulado: un AppTest con su pestaña activa y sus tiempos por paso."""
+
+    def __init__(self, secrets: dict, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        for k, v in secrets.items():
+            self.at.secrets[k] = v
+        self.tab = None
+        self.timings = []  # (paso, segundos con cola, segundos de servicio)
+        self.reruns = 0
+
+    def run(self, step: str):
+        t0 = time.perf_counter()
+        with _RUN_LOCK:
+            t1 = time.perf_counter()
+            # AppTest no reenvía el estado del widget de pestañas: se repone en cada run
+            if self.tab:
+                self.at.session_state["main_tab"] = self.tab
+            self.at.run()
+        t2 = time.perf_counter()
+        self.timings.append((step, t2 - t0, t2 - t1))
+        self.reruns += 1
+        if self.at.exception:
+            raise RuntimeError(f"{step}: {self.at.exception[0].value}")
+
+    def open_tab(self, label: str, step: str):
+        self.tab = label
+        self.run(step)
+
+    def _by_label(self, label):
+        for e in self.at.text_input:
+            if e.label == label:
+                return e
+        raise KeyError(label)
+
+    def flow(self, n: int, tag: str):
+        username = f"load{tag}{n:05d}"
+        self.run("open")
+
+        self.open_tab(REGISTER_TAB, "register")
+        fields = {
+            "Usuario (único) *": username,
+            "Nombre completo *": f"Cliente Carga {n}",
+            "Teléfono (WhatsApp) *": f"5{int(tag, 16) % 10000:04d}{n:05d}",  # único por corrida (hay índice de teléfono)
+            "Email *": f"{username}@example.com",
+            "Contraseña *": "secreto-123",
+            "Confirmar contraseña *": "secreto-123",
+            "Calle *": "Av. Universidad",
+            "Número exterior *": str(n),
+            "Colonia *": "Xoco",
+            "Alcaldía / Municipio *": "Benito Juárez",
+            "Código Postal *": "03330",
+        }
+        for label, value in fields.items():
+            self._by_label(label).input(value)
+        self.at.checkbox[0].check()
+        next(b for b in self.at.button if b.label == "Crear cuenta").click()
+        self.run("register")
+
+        self.at.text_input(key="login_user").input(username)
+        self.at.text_input(key="login_pass").input("secreto-123")
+        self.at.button(key="btn_login").click()
+        self.run("login")
+        if not self.at.session_state.auth:
+            raise RuntimeError(f"login: {[e.value for e in self.at.error]}")
+
+        self.open_tab(QR_TAB, "list_qrs")
+        self.at.button(key="btn_create_qr_fixed").click()
+        self.run("create_qr")
+        self.run("list_qrs")
+        if not self.at.dataframe:
+            raise RuntimeError("list_qrs: sin tabla de QRs")
+
+        self.open_tab(CHAT_TAB, "chat")
+        self.at.chat_input[0].set_value(QUESTIONS[n % len(QUESTIONS)])
+        self.run("chat")
+
+
+def _pct(vals, q):
+    return vals[min(len(vals) - 1, int(len(vals) * q))] if vals else 0.0
+
+
+def run_level(sessions: int, concurrency: int, secrets: dict, timeout: float, keep: list) -> dict:
+    tag = uuid.uuid4().hex[:4]
+    done, errors = [], []
+    lock = threading.Lock()
+
+    def one(n):
+        s = Session(secrets, timeout)
+        try:
+            s.flow(n, tag)
+            with lock:
+                done.append(s)
+        except Exception as e:  # una sesión caída no tumba la corrida; se cuenta
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+        keep.append(s)
+
+    gc.collect()
+    rss0 = rss_bytes()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(sessions)))
+    wall = time.perf_counter() - t0
+    gc.collect()
+    rss1 = rss_bytes()
+
+    by_step = {s: [] for s in STEPS}
+    service = {s: [] for s in STEPS}
+    reruns = 0
+    for s in done:
+        reruns += s.reruns
+        for step, sec, busy in s.timings:
+            by_step[step].append(sec * 1000)
+            service[step].append(busy * 1000)
+    steps = {}
+    for step, vals in by_step.items():
+        vals.sort()
+        if vals:
+            steps[step] = {
+                "n": len(vals),
+                "p50_ms": round(statistics.median(vals), 1),
+                "p95_ms": round(_pct(vals, 0.95), 1),
+                "p99_ms": round(_pct(vals, 0.99), 1),
+                "service_p50_ms": round(statistics.median(service[step]), 1),
+            }
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "ok": len(done),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "wall_s": round(wall, 2),
+        "sessions_per_s": round(len(done) / wall, 2) if wall else 0.0,
+        "reruns_per_s": round(reruns / wall, 1) if wall else 0.0,
+        "rss_mb": round(rss1 / 2**20, 1),
+        "mem_per_session_kb": round((rss1 - rss0) / max(1, sessions) / 1024, 1),
+        "steps": steps,
+    }
+
+
+def format_level(r: dict) -> str:
+    out = [
+        f"concurrencia {r['concurrency']:>4} · {r['ok']}/{r['sessions']} sesiones ok"
+        f" ({r['errors']} con error) en {r['wall_s']} s",
+        f"  throughput: {r['sessions_per_s']} sesiones/s · {r['reruns_per_s']} reruns/s",
+        f"  memoria:    RSS {r['rss_mb']} MB · ~{r['mem_per_session_kb']} KB por sesión viva",
+        "  latencia por paso (ms):        p50      p95      p99   servicio p50",
+    ]
+    for step, s in r["steps"].items():
+        out.append(f"    {step:<24}{s['p50_ms']:8.1f} {s['p95_ms']:8.1f} {s['p99_ms']:8.1f} {s['service_p50_ms']:10.1f}")
+    for e in r["error_samples"]:
+        out.append(f"  ✗ {e}")
+    return "\n".join(out)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Carga de sesiones simultáneas sobre App.py (AppTest + SQLite)")
+    ap.add_argument("--sessions", type=int, default=100, help="sesiones por nivel")
+    ap.add_argument("--concurrency", type=int, default=25)
+    ap.add_argument("--ramp", help="niveles de concurrencia separados por coma (ignora --concurrency)")
+    ap.add_argument("--bcrypt-ms", type=float, default=250, help="bcrypt_target_ms (el de producción por default)")
+    ap.add_argument("--timeout", type=float, default=120, help="segundos máx. por rerun")
+    ap.add_argument("--json", help="guardar resultados en este archivo")
+    args = ap.parse_args(argv)
+
+    levels = [int(x) for x in args.ramp.split(",")] if args.ramp else [args.concurrency]
+    # el aviso de "missing ScriptRunContext" sale por cada rerun desde los hilos del harness
+    # (filtro y no nivel: Streamlit reajusta los niveles de sus loggers al aplicar config)
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda rec: "missing ScriptRunContext" not in rec.getMessage()
+    )
+    results = []
+    keep = []  # sesiones vivas: la memoria se mide con todas abiertas, como en el servidor
+    with tempfile.TemporaryDirectory() as tmp:
+        secrets = {
+            "storage_backend": "sqlite",
+            "sqlite_path": os.path.join(tmp, "load.db"),
+            "token_sweeper_every": 0,
+            "bcrypt_target_ms": args.bcrypt_ms,
+        }
+        # una sesión de calentamiento: imports perezosos, caches y calibración de bcrypt fuera de la medición
+        run_level(1, 1, secrets, args.timeout, keep)
+        for c in levels:
+            keep.clear()
+            r = run_level(args.sessions, c, secrets, args.timeout, keep)
+            results.append(r)
+            print(format_level(r), flush=True)
+        keep.clear()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"app": APP, "python": sys.version.split()[0], "levels": results}, f, indent=2, ensure_ascii=False)
+    return 1 if any(r["ok"] == 0 for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""
+Drop24 · núcleo del portal (sin Streamlit).
+
+App.py es solo la interfaz; aquí vive lo que se puede importar, perfilar y
+probar sin levantar el script ni tener un proyecto Firestore.
+"""
@@ -0,0 +1,355 @@
+"""
+Archivo de tokens (caliente / frío).
+
+``drop24_qr_tokens`` solo debe tener tokens vivos y recientes. Los cerrados
+(``active: False``) cuyo ``end_ts`` tiene más de ``keep_days`` días se mueven:
+
+- a una colección por mes de end_ts: ``drop24_qr_tokens_archive_2026_05``, o
+- a Parquet comprimido en disco: ``<dir>/2026_05/part-<timestamp>.parquet``.
+
+Cada bloque se mueve en una transacción: relee los tokens (si otra corrida ya
+se llevó alguno, se salta), copia, borra y suma al contador del mes en
+``drop24_archive_months`` (para que las auditorías no tengan que adivinar los
+meses). En Parquet el part-file se escribe antes como ``.pending`` y se
+renombra solo después de confirmar la transacción; si se corta en medio, la
+siguiente corrida revisa los ``.pending`` viejos: si ninguno de sus tokens
+sigue en la colección caliente lo publica, si no lo borra. La lectura además
+deduplica por token_id.
+
+El sweeper (``drop24.sweeper``) puede correr el archivado al final de cada
+pasada, con el mismo lease y tope de escrituras.
+
+    python -m drop24.archive run --firebase-creds sa.json --keep-days 30
+    python -m drop24.archive run --sqlite drop24.db --parquet-dir archivo/
+    python -m drop24.archive find --sqlite drop24.db 8F3A2B1C9D0E
+    python -m drop24.archive query --sqlite drop24.db --month 2026-05 --user cli1
+"""
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from drop24.migrate_timestamps import parse_mx_str
+from drop24.repository import TOKENS_COL
+from drop24.storage import BATCH_LIMIT, Backend, add_backend_args, backend_from_args, cursor_after
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = f"{TOKENS_COL}_archive_"
+ARCHIVE_MONTHS_COL = "drop24_archive_months"
+KEEP_DAYS = 30
+# copia + borrado + nota del mes (a lo más una por token) = 3 escrituras por token
+DEFAULT_CHUNK = BATCH_LIMIT // 3
+PENDING_SUFFIX = ".pending"
+STALE_PENDING_SECONDS = 3600  # un .pending más viejo que esto ya no es de una corrida en curso
+MONTHS_TTL_SECONDS = 300
+
+MEXICO_TZ = ZoneInfo("America/Mexico_City")
+TS_FIELDS = ("start_ts", "end_ts", "created_at", "updated_at", "used_at", "deactivated_at")
+
+CLOSED_ORDER = [("end_ts", "asc")]
+
+
+def month_key(dt: datetime) -> str:
+    """Mes (hora CDMX) con el que se archiva: '2026_05'."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(MEXICO_TZ).strftime("%Y_%m")
+
+
+def archive_col(month: str) -> str:
+    return ARCHIVE_PREFIX + month.replace("-", "_")
+
+
+def _norm_month(month: str) -> str:
+    return month.replace("-", "_")
+
+
+# =================================================
+# Parquet (opcional: requiere pyarrow)
+# =================================================
+def require_pyarrow():
+    """Falla antes de mover nada si se pidió Parquet y no está pyarrow."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("El archivo en Parquet necesita pyarrow: pip install pyarrow") from e
+
+
+def _to_frame(rows: list[dict]):
+    import pandas as pd
+
+    df = pd.DataFrame(rows)
+    for f in TS_FIELDS:
+        if f in df.columns:
+            vals = df[f].map(lambda v: parse_mx_str(v) if isinstance(v, str) else v)
+            df[f] = pd.to_datetime(vals, utc=True, errors="coerce")
+    # columnas con tipos mezclados (p. ej. None + str + int) -> texto, Parquet no las acepta
+    for c in df.columns:
+        if df[c].dtype == object and len({type(v) for v in df[c] if v is not None}) > 1:
+            df[c] = df[c].map(lambda v: None if v is None else str(v))
+    return df
+
+
+def write_parquet(rows: list[dict], directory: str, month: str) -> str:
+    """Escribe un part-file nuevo (zstd) para el mes como ``.pending``; regresa esa ruta.
+
+    Los lectores no lo ven hasta ``publish_parquet``.
+    """
+    folder = os.path.join(directory, _norm_month(month))
+    os.makedirs(folder, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(folder, f"part-{stamp}-{uuid.uuid4().hex[:6]}.parquet{PENDING_SUFFIX}")
+    _to_frame(rows).to_parquet(path, compression="zstd", index=False)
+    return path
+
+
+def publish_parquet(pending: str) -> str:
+    path = pending[: -len(PENDING_SUFFIX)]
+    os.replace(pending, path)
+    return path
+
+
+def _pending_files(directory: str, older_than: float) -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+    out = []
+    for month in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, month)
+        if not os.path.isdir(folder):
+            continue
+        for p in sorted(os.listdir(folder)):
+            path = os.path.join(folder, p)
+            if p.endswith(PENDING_SUFFIX) and os.path.getmtime(path) < older_than:
+                out.append(path)
+    return out
+
+
+def read_parquet_month(directory: str, month: str) -> list[dict]:
+    import pandas as pd
+
+    folder = os.path.join(directory, _norm_month(month))
+    if not os.path.isdir(folder):
+        return []
+    parts = sorted(os.path.join(folder, p) for p in os.listdir(folder) if p.endswith(".parquet"))
+    if not parts:
+        return []
+    df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+    if "token_id" in df.columns:
+        # un bloque que se publicó dos veces (corrida cortada + reintento) no se lista doble
+        df = df.drop_duplicates("token_id", keep="last")
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("records")
+
+
+# =================================================
+# Archivado
+# =================================================
+class TokenArchiver:
+    def __init__(self, backend: Backend, keep_days: int = KEEP_DAYS, chunk: int = DEFAULT_CHUNK,
+                 parquet_dir: str = None):
+        self.backend = backend
+        self.keep_days = int(keep_days)
+        self.chunk = max(1, min(int(chunk), DEFAULT_CHUNK))
+        self.parquet_dir = parquet_dir
+        if parquet_dir:
+            require_pyarrow()
+
+    def _move(self, by_month: dict, now: datetime) -> int:
+        """Copia + borrado + contador del mes de un bloque, en una transacción."""
+        def _txn(t):
+            current = t.get_many(TOKENS_COL, [d.id for items in by_month.values() for d in items])
+            notes = t.get_many(ARCHIVE_MONTHS_COL, list(by_month))
+            moved = 0
+            for month, items in by_month.items():
+                live = [d for d in items if d.id in current]
+                if not live:
+                    continue
+                for d in live:
+                    if not self.parquet_dir:
+                        t.set(archive_col(month), d.id, current[d.id])
+                    t.delete(TOKENS_COL, d.id)
+                prev = notes.get(month) or {}
+                sink = f"parquet:{self.parquet_dir}" if self.parquet_dir else archive_col(month)
+                t.set(ARCHIVE_MONTHS_COL, month, {
+                    "month": month,
+                    "sinks": sorted(set(prev.get("sinks", [])) | {sink}),
+                    "count": int(prev.get("count", 0)) + len(live),
+                    "updated_at": now,
+                })
+                moved += len(live)
+            return moved
+
+        return self.backend.run_transaction(_txn)
+
+    def recover_pending(self, older_than: float = None) -> int:
+        """Resuelve los ``.pending`` de corridas cortadas; regresa cuántos publicó."""
+        if not self.parquet_dir:
+            return 0
+        import pandas as pd
+
+        older_than = time.time() - STALE_PENDING_SECONDS if older_than is None else older_than
+        published = 0
+        for path in _pending_files(self.parquet_dir, older_than):
+            ids = [str(x) for x in pd.read_parquet(path, columns=["token_id"])["token_id"]]
+            if self.backend.get_many(TOKENS_COL, ids):
+                # la transacción no se confirmó: esos tokens se vuelven a mover
+                os.remove(path)
+                log.warning("archivo: %s descartado (su bloque no se confirmó)", path)
+            else:
+                publish_parquet(path)
+                published += 1
+                log.warning("archivo: %s publicado (se cortó después de confirmar)", path)
+        return published
+
+    def run(self, now: datetime = None, pace=None) -> int:
+        """Mueve los tokens cerrados con end_ts < now - keep_days; regresa cuántos.
+
+        ``pace(escrituras, inicio)`` se llama después de cada bloque (tope de escrituras del sweeper).
+        """
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.keep_days)
+        moved = 0
+        cursor = None
+        self.recover_pending()
+        while True:
+            docs = self.backend.query(
+                TOKENS_COL,
+                where=[("active", "==", False), ("end_ts", "<", cutoff)],
+                order_by=CLOSED_ORDER,
+                limit=self.chunk,
+                start_after=cursor,
+            )
+            if not docs:
+                break
+            started = time.monotonic()
+            by_month = {}
+            for d in docs:
+                by_month.setdefault(month_key(d.data["end_ts"]), []).append(d)
+
+            pending = []
+            try:
+                if self.parquet_dir:
+                    # el archivo queda escrito (sin publicar) antes del borrado
+                    for month, items in by_month.items():
+                        pending.append(write_parquet(
+                            [{**d.data, "token_id": d.data.get("token_id") or d.id} for d in items],
+                            self.parquet_dir, month))
+                n = self._move(by_month, now)
+            except Exception:
+                for path in pending:
+                    os.remove(path)
+                raise
+            for path in pending:
+                publish_parquet(path)
+            moved += n
+            cursor = cursor_after(docs[-1], CLOSED_ORDER)
+            log.info("archivo: %s tokens movidos (hasta %s)", moved, cursor[0])
+            if len(docs) < self.chunk:
+                break
+            if pace is not None:
+                pace(2 * n, started)
+        return moved
+
+
+# =================================================
+# Consultas de auditoría
+# =================================================
+class ArchiveReader:
+    """Lectura del archivo: por token, por mes y por usuario (más la colección caliente si se pide)."""
+
+    def __init__(self, backend: Backend, parquet_dir: str = None, months_ttl: float = MONTHS_TTL_SECONDS):
+        self.backend = backend
+        self.parquet_dir = parquet_dir
+        self.months_ttl = months_ttl
+        self._months = (0.0, [])  # (vence, meses)
+        if parquet_dir:
+            require_pyarrow()
+
+    def months(self) -> list[str]:
+        """Meses archivados, del más nuevo al más viejo (en caché ``months_ttl`` segundos)."""
+        until, cached = self._months
+        if time.monotonic() < until:
+            return list(cached)
+        docs = self.backend.query(ARCHIVE_MONTHS_COL, order_by=[("__name__", "desc")])
+        months = [d.id for d in docs]
+        self._months = (time.monotonic() + self.months_ttl, months)
+        return list(months)
+
+    def month(self, month: str, created_by: str = None, limit: int = None) -> list[dict]:
+        month = _norm_month(month)
+        rows = []
+        if self.parquet_dir:
+            rows = read_parquet_month(self.parquet_dir, month)
+            if created_by:
+                rows = [r for r in rows if r.get("created_by") == created_by]
+        where = [("created_by", "==", created_by)] if created_by else []
+        rows += [d.data for d in self.backend.query(archive_col(month), where=where, limit=limit)]
+        return rows[:limit] if limit else rows
+
+    def find(self, token_id: str, include_hot: bool = True) -> tuple:
+        """(dónde, token) buscando del mes más nuevo al más viejo; (None, None) si no está."""
+        if include_hot:
+            x = self.backend.get(TOKENS_COL, token_id)
+            if x is not None:
+                return TOKENS_COL, x
+        for month in self.months():
+            x = self.backend.get(archive_col(month), token_id)
+            if x is not None:
+                return archive_col(month), x
+            if self.parquet_dir:
+                for r in read_parquet_month(self.parquet_dir, month):
+                    if r.get("token_id") == token_id:
+                        return f"parquet:{month}", r
+        return None, None
+
+    def by_user(self, username: str, month_from: str = None, month_to: str = None) -> list[dict]:
+        out = []
+        lo = _norm_month(month_from) if month_from else None
+        hi = _norm_month(month_to) if month_to else None
+        for month in self.months():
+            if (lo and month < lo) or (hi and month > hi):
+                continue
+            out += self.month(month, created_by=username)
+        return out
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Archivo de tokens Drop24")
+    add_backend_args(ap)
+    ap.add_argument("--parquet-dir", help="archivar/leer Parquet en este directorio en vez de colecciones")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="mover tokens cerrados al archivo")
+    r.add_argument("--keep-days", type=int, default=KEEP_DAYS)
+    r.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    f = sub.add_parser("find", help="buscar un token (caliente y archivo)")
+    f.add_argument("token_id")
+    q = sub.add_parser("query", help="listar un mes archivado")
+    q.add_argument("--month", required=True, help="2026-05")
+    q.add_argument("--user")
+    sub.add_parser("months", help="meses archivados")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    backend = backend_from_args(ap, args)
+    if args.cmd == "run":
+        n = TokenArchiver(backend, keep_days=args.keep_days, chunk=args.chunk, parquet_dir=args.parquet_dir).run()
+        log.info("archivo: %s tokens movidos", n)
+        return
+    reader = ArchiveReader(backend, parquet_dir=args.parquet_dir)
+    if args.cmd == "months":
+        print("\n".join(reader.months()))
+    elif args.cmd == "find":
+        where, x = reader.find(args.token_id.strip().upper())
+        print(f"{where}: {x}" if x else "no encontrado")
+    elif args.cmd == "query":
+        for x in reader.month(args.month, created_by=args.user):
+            print(x)
+
+
+if __name__ == "__main__":
+    main()
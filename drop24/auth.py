@@ -0,0 +1,144 @@
+"""
+Servicio único de login (header y sidebar usan el mismo).
+
+Orden de trabajo, de lo más barato a lo más caro:
+1) throttling por usuario y por cliente (token bucket) -> rechaza antes de bcrypt
+2) cache negativa de usuarios inexistentes -> sin lectura a Firestore
+3) lectura del usuario (por username, o teléfono/email vía su índice: una lectura más)
+4) bcrypt (en el pool de drop24.passwords)
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from drop24.passwords import check_password, needs_rehash, rehash_async
+from drop24.repository import UserStore, canonical_identifier
+
+AuthResult = namedtuple("AuthResult", ["ok", "code", "user", "retry_after"])
+
+# (ráfaga, segundos por intento recuperado)
+PER_USER_LIMIT = (5, 30.0)
+PER_CLIENT_LIMIT = (20, 3.0)
+NEGATIVE_TTL = 60.0
+MAX_KEYS = 10000
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "refill", "tokens", "ts")
+
+    def __init__(self, capacity: int, seconds_per_token: float, now: float):
+        self.capacity = float(capacity)
+        self.refill = 1.0 / seconds_per_token
+        self.tokens = float(capacity)
+        self.ts = now
+
+    def take(self, now: float) -> float:
+        """0 si pasa; si no, segundos que faltan para el siguiente intento."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.refill)
+        self.ts = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.refill
+
+    def give_back(self):
+        self.tokens = min(self.capacity, self.tokens + 1.0)
+
+
+class Throttle:
+    """Buckets por llave, acotados (LRU) para que no crezca sin fin."""
+
+    def __init__(self, limit: tuple, max_keys: int = MAX_KEYS):
+        self.capacity, self.seconds_per_token = limit
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+
+    def take(self, key: str, now: float) -> float:
+        b = self.buckets.get(key)
+        if b is None:
+            b = self.buckets[key] = TokenBucket(self.capacity, self.seconds_per_token, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return b.take(now)
+
+    def give_back(self, key: str):
+        b = self.buckets.get(key)
+        if b is not None:
+            b.give_back()
+
+
+class AuthService:
+    def __init__(self, users: UserStore, now_fn=None, per_user=PER_USER_LIMIT, per_client=PER_CLIENT_LIMIT,
+                 negative_ttl: float = NEGATIVE_TTL, clock=time.monotonic):
+        self.users = users
+        self.now_fn = now_fn
+        self.per_user = Throttle(per_user)
+        self.per_client = Throttle(per_client)
+        self.negative_ttl = negative_ttl
+        self.missing = OrderedDict()  # username -> expira (monotonic)
+        self.clock = clock
+        self.lock = threading.Lock()
+
+    def forget(self, *identifiers: str):
+        """Quita usuario/teléfono/email de la cache negativa (p. ej. recién registrado)."""
+        with self.lock:
+            for ident in identifiers:
+                self.missing.pop(canonical_identifier(ident), None)
+
+    def _is_missing(self, username: str, now: float) -> bool:
+        exp = self.missing.get(username)
+        if exp is None:
+            return False
+        if exp <= now:
+            self.missing.pop(username, None)
+            return False
+        return True
+
+    def _remember_missing(self, username: str, now: float):
+        self.missing[username] = now + self.negative_ttl
+        self.missing.move_to_end(username)
+        if len(self.missing) > MAX_KEYS:
+            self.missing.popitem(last=False)
+
+    def login(self, identifier: str, password: str, client: str = "") -> AuthResult:
+        """``identifier``: username, teléfono o email."""
+        ident = canonical_identifier(identifier)
+        if not ident or not password:
+            return AuthResult(False, "missing", None, 0)
+
+        now = self.clock()
+        with self.lock:
+            wait = max(self.per_client.take(f"c:{client}", now), self.per_user.take(f"u:{ident}", now))
+            if wait > 0:
+                return AuthResult(False, "throttled", None, wait)
+            if self._is_missing(ident, now):
+                return AuthResult(False, "no_user", None, 0)
+
+        u = self.users.resolve(ident)
+        data = self.users.get(u) if u else None
+        if data is None:
+            with self.lock:
+                self._remember_missing(ident, now)
+            return AuthResult(False, "no_user", None, 0)
+        if u != ident:
+            # el bucket es del usuario, no del identificador: alternar teléfono/email/username no da más intentos
+            with self.lock:
+                wait = self.per_user.take(f"u:{u}", now)
+                self.per_user.give_back(f"u:{ident}")
+            if wait > 0:
+                return AuthResult(False, "throttled", None, wait)
+        if not data.get("active", True):
+            return AuthResult(False, "inactive", data, 0)
+
+        pw_hash = data.get("password_hash", "")
+        if not check_password(password, pw_hash):
+            return AuthResult(False, "bad_password", data, 0)
+
+        with self.lock:
+            self.per_user.give_back(f"u:{u}")  # un login bueno no cuenta contra el usuario
+        if needs_rehash(pw_hash):
+            fields = {"updated_at": self.now_fn()} if self.now_fn else {}
+            rehash_async(password, lambda h: self.users.update(u, {"password_hash": h, **fields}))
+        return AuthResult(True, "ok", {**data, "username": data.get("username") or u}, 0)
@@ -0,0 +1,203 @@
+"""
+Emisión masiva de QRs (pases de buzón pre-emitidos).
+
+1) Se arman N tokens con el mismo esquema de TOKENS_COL.
+2) Se escriben en batches de 500 (TokenStore.create_many).
+3) Las imágenes se renderizan en paralelo en un pool de procesos (``iter_render``
+   las entrega en orden conforme salen).
+4) Sale un ZIP de PNGs o una hoja imprimible (PDF multipágina), escritos en
+   streaming a un archivo temporal: en memoria nunca hay más de una página.
+
+Los lockers no entran: cada horario tiene cupo (``LockerLedger``) y un sticker
+de varios días no aparta ninguno, así que se saltaría la cuenta de lugares.
+"""
+import io
+import itertools
+import os
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from drop24.qrrender import render_qr
+from drop24.repository import make_token_id
+
+# Abajo de esto no vale la pena levantar procesos
+POOL_MIN_ITEMS = 40
+
+SHEET_DPI = 150
+SHEET_SIZE = (1240, 1754)  # A4 a 150 dpi
+SHEET_COLS = 4
+SHEET_ROWS = 6
+BULK_ACCESS_TYPES = ("BZ",)
+SPOOL_MAX_BYTES = 8 * 1024 * 1024  # arriba de esto el archivo temporal pasa a disco
+
+
+def new_bulk_tokens(n: int, access_type: str, start_dt, end_dt, one_time: bool, prefix: str,
+                    created_by: str, batch_id: str, created_at, dt_to_str, signer=None) -> list[dict]:
+    if access_type not in BULK_ACCESS_TYPES:
+        raise ValueError(f"Emisión masiva no disponible para {access_type} (los lockers se apartan por horario)")
+    tokens = []
+    for _ in range(int(n)):
+        token_id = make_token_id()
+        if signer:
+            payload = signer.sign(prefix, token_id, access_type, start_dt, end_dt, one_time)
+        else:
+            payload = f"{prefix}|{token_id}"
+        tokens.append({
+            "token_id": token_id,
+            "payload": payload,
+            "username": "",
+            "client_id": "",
+            "access_type": access_type,
+            "start_time": dt_to_str(start_dt),
+            "end_time": dt_to_str(end_dt),
+            "start_ts": start_dt,
+            "end_ts": end_dt,
+            "one_time": bool(one_time),
+            "used": False,
+            "used_at": None,
+            "active": True,
+            "locker_day": None,
+            "locker_slot": None,
+            "batch_id": batch_id,
+            "created_at": created_at,
+            "created_by": created_by,
+        })
+    return tokens
+
+
+def _render_one(args):
+    payload, fmt = args
+    return render_qr(payload, fmt)
+
+
+def iter_render(payloads: list[str], fmt: str = "png", workers: int = None, progress=None):
+    """Genera las imágenes en orden; usa todos los cores si el lote es grande."""
+    jobs = [(p, fmt) for p in payloads]
+    if len(jobs) < POOL_MIN_ITEMS:
+        for n, j in enumerate(jobs, 1):
+            yield _render_one(j)
+            if progress:
+                progress(n, len(jobs))
+        return
+
+    workers = workers or os.cpu_count() or 2
+    # spawn: no hereda hilos/sockets del proceso de Streamlit
+    ctx = multiprocessing.get_context("spawn")
+    chunk = max(len(jobs) // (workers * 4), 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        for n, img in enumerate(pool.map(_render_one, jobs, chunksize=chunk), 1):
+            yield img
+            if progress and (n % chunk == 0 or n == len(jobs)):
+                progress(n, len(jobs))
+
+
+def render_many(payloads: list[str], fmt: str = "png", workers: int = None, progress=None) -> list[bytes]:
+    return list(iter_render(payloads, fmt, workers, progress))
+
+
+def spooled():
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+
+def build_zip(tokens: list[dict], images, ext: str = "png", out=None):
+    """ZIP de ``images`` (iterable, se consume conforme se escribe) en ``out``; regresa ``out`` rebobinado."""
+    out = out if out is not None else spooled()
+    # los PNG ya vienen comprimidos: ZIP_STORED evita recomprimir
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as zf:
+        lines = ["token_id,access_type,start_time,end_time,one_time,payload"]
+        for x, img in zip(tokens, images):
+            zf.writestr(f"DROP24_QR_{x['token_id']}.{ext}", img)
+            lines.append(
+                f"{x['token_id']},{x['access_type']},{x['start_time']},{x['end_time']},{x['one_time']},{x['payload']}"
+            )
+        zf.writestr("tokens.csv", "\n".join(lines) + "\n", compress_type=zipfile.ZIP_DEFLATED)
+    out.seek(0)
+    return out
+
+
+class _PdfWriter:
+    """PDF mínimo escrito página por página (cada página es una imagen de 1 bit)."""
+
+    def __init__(self, out, dpi: int):
+        self.out = out
+        self.scale = 72.0 / dpi
+        self.offsets = {}  # número de objeto -> posición en el archivo
+        self.pages = []
+        self.next_obj = 3  # 1 = catálogo, 2 = árbol de páginas (van al final)
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self.out.write(data)
+
+    def _obj(self, num: int, body: bytes, stream: bytes = None):
+        self.offsets[num] = self.out.tell()
+        self._write(b"%d 0 obj\n" % num + body)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_page(self, page):
+        """``page``: imagen PIL en modo "1" (1 = blanco, igual que DeviceGray)."""
+        w, h = page.size
+        pw, ph = w * self.scale, h * self.scale
+        img, content, num = self.next_obj, self.next_obj + 1, self.next_obj + 2
+        self.next_obj += 3
+        data = zlib.compress(page.tobytes())
+        self._obj(img, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                       b"/BitsPerComponent 1 /Filter /FlateDecode /Length %d >>" % (w, h, len(data)), data)
+        draw = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (pw, ph)
+        self._obj(content, b"<< /Length %d >>" % len(draw), draw)
+        self._obj(num, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources << /XObject "
+                       b"<< /Im0 %d 0 R >> >> /Contents %d 0 R >>" % (pw, ph, img, content))
+        self.pages.append(num)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % n for n in self.pages)
+        self._obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages)))
+        self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.out.tell()
+        size = self.next_obj
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for num in range(1, size):
+            self._write(b"%010d 00000 n \n" % self.offsets[num])
+        self._write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref))
+
+
+def build_sheet_pdf(tokens: list[dict], images_png1, title: str = "DROP24", out=None):
+    """
+    Hoja imprimible: rejilla 4x6 por página, con el token debajo de cada QR.
+    ``images_png1`` se consume página por página; regresa ``out`` rebobinado.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    w, h = SHEET_SIZE
+    margin = 60
+    cell_w = (w - 2 * margin) // SHEET_COLS
+    cell_h = (h - 2 * margin - 40) // SHEET_ROWS
+    qr_px = min(cell_w, cell_h - 40) - 20
+    font = ImageFont.load_default()
+
+    out = out if out is not None else spooled()
+    pdf = _PdfWriter(out, SHEET_DPI)
+    images = iter(images_png1)
+    per_page = SHEET_COLS * SHEET_ROWS
+    for start in range(0, len(tokens), per_page):
+        page = Image.new("1", SHEET_SIZE, 1)
+        draw = ImageDraw.Draw(page)
+        draw.text((margin, margin - 40), f"{title} · {start + 1}-{min(start + per_page, len(tokens))} de {len(tokens)}",
+                  fill=0, font=font)
+        for i, (x, img) in enumerate(zip(tokens[start:start + per_page], itertools.islice(images, per_page))):
+            col, row = i % SHEET_COLS, i // SHEET_COLS
+            qr = Image.open(io.BytesIO(img)).resize((qr_px, qr_px), Image.NEAREST)
+            left = margin + col * cell_w + (cell_w - qr_px) // 2
+            top = margin + row * cell_h
+            page.paste(qr, (left, top))
+            draw.text((left, top + qr_px + 6), f"{x['token_id']} · {x['access_type']}", fill=0, font=font)
+            draw.text((left, top + qr_px + 20), f"hasta {x['end_time']}", fill=0, font=font)
+        pdf.add_page(page)
+    pdf.close()
+    out.seek(0)
+    return out
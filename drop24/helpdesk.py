@@ -0,0 +1,115 @@
+"""
+FAQ del chatbot Drop24: intenciones, pesos y respuestas.
+
+Pesos: 2 = palabra que por sí sola define el tema, 1 = pista normal,
+0.5 = pista débil (necesita otra para ganar; p. ej. "cuánto").
+"""
+from drop24.intents import Intent, IntentMatcher
+
+
+def _precios(p) -> str:
+    return (
+        "💸 **Precios Drop24**\n\n"
+        "### 🧺 Autoservicio\n"
+        f"- Lavado (carga completa hasta 22 kg): **${p['lavado_carga_completa']}**\n"
+        f"- Secado 30 min: **${p['secado_30_min']}**\n"
+        f"- 15 min extra: **${p['secado_15_extra']}**\n"
+        f"- 60 min: **${p['secado_60_min']}**\n\n"
+        "📌 *El precio es por ciclo de lavadora, no por kilo.*\n"
+        "📌 *El cliente trae sus insumos (o puede adquirirlos en mostrador).*\n\n"
+        "### 🧺 Drop Express (Mostrador)\n"
+        "📌 Política: entrega en 24 horas hábiles (sujeto a disponibilidad) · doblado básico incluido.\n"
+        f"- Lavado + Secado: **${p['lavado_secado_por_kg']} por kilo**\n"
+        f"- Promoción (15 kg): **${p['promo_15kg']}**\n"
+        "📌 *Incluye detergente premium y suavizante.*\n"
+        "📌 *Se pesa al recibir. Mínimo de cobro: 3 kg.*\n\n"
+        "### 📦 Buzón inteligente 24/7\n"
+        f"- Ropa general: **${p['buzon_por_kg']} por kilo**\n"
+        f"- Renta de locker (por servicio) / Recolección 24/7: **${p['locker_24_7']}**\n\n"
+        "### 🛏️ Especiales (por pieza)\n"
+        f"- Edredones y cobijas (Individual/Matrimonial): **${p['edredon_ind_matr']}**\n"
+        f"- Edredones y cobijas (Queen/King): **${p['edredon_q_king']}**\n\n"
+        "Si me dices qué vas a lavar (kg o piezas), te calculo el total ✅"
+    )
+
+
+def _buzon(p) -> str:
+    return (
+        "🧺 **Buzón 24/7 (Drop24)**\n\n"
+        "1) Te registras en mostrador y obtienes tu **QR**.\n"
+        "2) Escaneas el QR en el buzón.\n"
+        "3) La puerta se libera y depositas tu ropa en bolsa/morral identificado.\n"
+        "4) Recolectamos en el siguiente horario hábil y comenzamos el proceso.\n\n"
+        f"Precio ropa general: **${p['buzon_por_kg']} por kilo**\n"
+        f"Renta de locker (por servicio) / Recolección 24/7: **${p['locker_24_7']}**"
+    )
+
+
+def _entrega(p) -> str:
+    return (
+        "⏱️ **Tiempos de entrega**\n\n"
+        "En Drop Express (Mostrador): **Entrega en 24 horas hábiles** (sujeto a disponibilidad).\n"
+        "Si es volumen grande o prendas especiales, puede variar.\n\n"
+        "Dime cuántos kg o si incluye edredón/cobija y te doy un estimado."
+    )
+
+
+def _qr(p) -> str:
+    return (
+        "📲 **Problemas con tu QR (Checklist)**\n\n"
+        "1) Verifica que estás dentro de la **ventana de tiempo**.\n"
+        "2) Si era de **1 uso**, revisa que no esté marcado como **used**.\n"
+        "3) Confirma el acceso correcto: **BZ / L1 / L2**.\n\n"
+        "Si me dices qué mensaje te sale o qué estás intentando abrir, te digo exactamente qué revisar."
+    )
+
+
+def _especiales(p) -> str:
+    return (
+        "🛏️ **Especiales (por pieza)**\n\n"
+        f"- Edredones y cobijas (Individual/Matrimonial): **${p['edredon_ind_matr']}**\n"
+        f"- Edredones y cobijas (Queen/King): **${p['edredon_q_king']}**\n\n"
+        "Se entregan en 24 horas hábiles (sujeto a disponibilidad)."
+    )
+
+
+def _default(p) -> str:
+    return (
+        "¡Claro! 🙌\n\n"
+        "Escribe una opción o tu duda:\n"
+        "1) **Precios**\n"
+        "2) **Buzón 24/7**\n"
+        "3) **QR agendado**\n"
+        "4) **Tiempos de entrega**\n"
+        "5) **Especiales (edredones/cobijas)**\n"
+    )
+
+
+# El orden desempata: con el mismo puntaje gana la primera (igual que la cadena de if de antes)
+INTENTS = [
+    Intent("precios", {
+        "precio": 2, "costo": 2, "tarifa": 2, "cobran": 2, "$": 1, "vale": 1, "cuesta": 2,
+        "cuanto": 0.5, "promocion": 1, "por kilo": 1,
+    }, _precios),
+    Intent("buzon", {
+        "buzon": 2, "24/7": 2, "depositar": 1.5, "dejar ropa": 2, "dejar mi ropa": 2, "dejo la ropa": 2,
+        "locker": 1, "recoleccion": 1,
+    }, _buzon),
+    Intent("entrega", {
+        "tarda": 2, "entrega": 1.5, "cuando": 1, "listo": 1, "lista": 1, "24 horas": 1, "24hrs": 1, "24 h": 1,
+        "recoger": 1, "tiempo": 1,
+    }, _entrega),
+    Intent("qr", {
+        "qr": 2, "token": 2, "agendado": 1.5, "ventana": 1, "no abre": 1.5, "no funciona": 1, "error": 1,
+        "escane": 1, "codigo": 1,
+    }, _qr),
+    Intent("especiales", {
+        "edredon": 2, "cobija": 2, "especial": 1.5, "queen": 1, "king": 1, "matrimonial": 1,
+    }, _especiales),
+]
+
+MATCHER = IntentMatcher(INTENTS, default=_default, min_score=1.0)
+
+
+def help_answer(user_text: str, prices: dict) -> str:
+    return MATCHER.answer(user_text, prices)
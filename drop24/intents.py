@@ -0,0 +1,103 @@
+"""
+Motor de intenciones para el chatbot de ayuda.
+
+Se arma una vez (al importar el FAQ) y cada pregunta cuesta una sola pasada:
+
+- el texto se normaliza: minúsculas, sin acentos ("buzón" == "buzon"), espacios colapsados;
+- todas las palabras clave de todas las intenciones van en UNA regex compilada
+  en forma de trie (prefijos compartidos), así el costo por carácter casi no
+  crece aunque el FAQ tenga cientos de intenciones;
+- cada palabra clave suma su peso a su(s) intención(es); gana el mayor puntaje
+  (empate: la que se declaró primero) si pasa ``min_score``.
+
+Las palabras clave empatan al inicio de palabra ("precio" cubre "precios",
+pero "qr" no empata dentro de "sqrt").
+"""
+import re
+import unicodedata
+from collections import namedtuple
+
+Match = namedtuple("Match", ["intent", "score", "keywords"])
+
+_WS_RE = re.compile(r"\s+")
+
+
+def fold(text: str) -> str:
+    """Minúsculas, sin acentos ni diéresis (la ñ queda como n) y espacios colapsados."""
+    t = unicodedata.normalize("NFKD", (text or "").lower())
+    t = "".join(c for c in t if not unicodedata.combining(c))
+    return _WS_RE.sub(" ", t).strip()
+
+
+class Intent:
+    __slots__ = ("name", "keywords", "answer")
+
+    def __init__(self, name: str, keywords: dict, answer):
+        """``keywords``: {frase: peso}; ``answer``: texto o función que recibe el contexto."""
+        self.name = name
+        self.keywords = {fold(k): float(w) for k, w in keywords.items()}
+        self.answer = answer
+
+    def render(self, ctx=None) -> str:
+        return self.answer(ctx) if callable(self.answer) else self.answer
+
+
+def _trie_regex(words) -> str:
+    """Alternancia con prefijos factorizados: ['buzon','buzones'] -> 'buzon(?:es)?'."""
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def _build(node) -> str:
+        ends = "" in node
+        branches = [re.escape(ch) + _build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            # opcional y greedy: gana la frase más larga ("dejar ropa" antes que "dejar")
+            return "(?:" + body + ")?"
+        return body
+
+    return _build(trie)
+
+
+class IntentMatcher:
+    def __init__(self, intents: list[Intent], default=None, min_score: float = 1.0):
+        self.intents = list(intents)
+        self.default = default
+        self.min_score = float(min_score)
+        # palabra -> [(índice de intención, peso)]
+        self.table = {}
+        for i, intent in enumerate(self.intents):
+            for kw, w in intent.keywords.items():
+                self.table.setdefault(kw, []).append((i, w))
+        # una palabra clave empieza donde no hay letra/dígito antes
+        self.regex = re.compile(r"(?<![a-z0-9])(?:" + _trie_regex(self.table) + ")") if self.table else None
+
+    def match(self, text: str) -> Match:
+        t = fold(text)
+        if self.regex is None or not t:
+            return Match(None, 0.0, [])
+        # solo se tocan las intenciones que tuvieron algún empate: el costo no depende del tamaño del FAQ
+        scores = {}
+        hits = {}
+        for kw in {m.group(0) for m in self.regex.finditer(t)}:
+            for i, w in self.table.get(kw, ()):
+                scores[i] = scores.get(i, 0.0) + w
+                hits.setdefault(i, []).append(kw)
+        if not scores:
+            return Match(None, 0.0, [])
+        best = max(scores, key=lambda i: (scores[i], -i))
+        if scores[best] < self.min_score:
+            return Match(None, 0.0, [])
+        return Match(self.intents[best], scores[best], sorted(hits[best]))
+
+    def answer(self, text: str, ctx=None) -> str:
+        m = self.match(text)
+        if m.intent is None:
+            return self.default(ctx) if callable(self.default) else (self.default or "")
+        return m.intent.render(ctx)
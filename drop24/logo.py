@@ -0,0 +1,76 @@
+"""
+Logo como asset local (``static/``, servido por Streamlit en ``app/static/``).
+
+Una sola URL versionada para las tres apariciones (header, Conócenos, footer):
+el navegador la baja una vez y después solo revalida. Prioridad:
+
+1) ``static/drop24_logo.webp`` (generado con ``optimize``),
+2) ``drop24_logo_url`` de secrets (remoto),
+3) ``static/drop24_logo.svg`` (wordmark incluido en el repo).
+
+    python -m drop24.logo optimize https://.../logo.png   # -> static/drop24_logo.webp
+"""
+import io
+import os
+from functools import lru_cache
+
+STATIC_DIR = "static"
+OPTIMIZED = "drop24_logo.webp"
+DEFAULT = "drop24_logo.svg"
+# .corp-logo mide 44 px de alto; 2x para pantallas retina
+TARGET_HEIGHT = 88
+
+
+def _asset_url(app_dir: str, name: str):
+    path = os.path.join(app_dir, STATIC_DIR, name)
+    if not os.path.isfile(path):
+        return None
+    # ?v=mtime: si el archivo cambia, la URL cambia (y el cache viejo no estorba)
+    return f"app/static/{name}?v={int(os.path.getmtime(path))}"
+
+
+@lru_cache(maxsize=4)
+def logo_src(app_dir: str, remote_url: str = "") -> str:
+    """URL del logo ('' si no hay ninguno)."""
+    return _asset_url(app_dir, OPTIMIZED) or (remote_url or "").strip() or _asset_url(app_dir, DEFAULT) or ""
+
+
+def optimize(src: str, out_path: str, height: int = TARGET_HEIGHT, quality: int = 85) -> int:
+    """Baja/lee ``src``, lo escala a ``height`` px de alto y lo guarda como WebP; regresa bytes."""
+    from PIL import Image
+
+    if src.startswith(("http://", "https://")):
+        from urllib.request import urlopen
+
+        with urlopen(src, timeout=20) as r:
+            data = r.read()
+    else:
+        with open(src, "rb") as f:
+            data = f.read()
+
+    img = Image.open(io.BytesIO(data))
+    img = img.convert("RGBA")
+    if img.height > height:
+        img = img.resize((max(1, round(img.width * height / img.height)), height), Image.LANCZOS)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    img.save(out_path, format="WEBP", quality=quality, method=6)
+    return os.path.getsize(out_path)
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Logo local de Drop24")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    o = sub.add_parser("optimize", help="URL o archivo -> static/drop24_logo.webp")
+    o.add_argument("src")
+    o.add_argument("--out", default=os.path.join(STATIC_DIR, OPTIMIZED))
+    o.add_argument("--height", type=int, default=TARGET_HEIGHT)
+    args = ap.parse_args(argv)
+
+    n = optimize(args.src, args.out, height=args.height)
+    print(f"{args.out}: {n} bytes")
+
+
+if __name__ == "__main__":
+    main()
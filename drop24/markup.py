@@ -0,0 +1,170 @@
+"""
+Bloques HTML estáticos del portal.
+
+Se arman una vez por proceso y salen compactados (una sola línea, sin la
+indentación del código), así cada rerun manda menos bytes por el websocket.
+Los que dependen del logo o del año se cachean por esos valores.
+"""
+import re
+from functools import lru_cache
+
+from drop24.theme import C_TEAL_DARK
+
+WHATSAPP_URL = "https://wa.me/523343928767"
+
+
+def compact_html(html: str) -> str:
+    """Colapsa espacios y saltos de línea (una línea: Markdown la trata como un solo bloque HTML)."""
+    return re.sub(r"\s+", " ", html).strip()
+
+
+def logo_html(src: str) -> str:
+    if src:
+        return f'<img class="corp-logo" src="{src}" alt="Drop24" />'
+    return ('<div class="corp-logo" style="display:flex;align-items:center;justify-content:center;'
+            'font-weight:900;color:#055671;">DROP24</div>')
+
+
+SIDEBAR_ACTIONS_HTML = compact_html("""
+    <span class="pill">Registro</span>
+    <span class="pill">Login</span>
+    <span class="pill">QR</span>
+    <span class="pill">Chatbot</span>
+""")
+
+WHATSAPP_BUTTON_HTML = compact_html(f"""
+    <div style="text-align:center;">
+        <a href="{WHATSAPP_URL}" target="_blank" style="text-decoration:none;">
+            <button style="
+                background-color:#25D366;
+                color:white;
+                border:none;
+                border-radius:12px;
+                padding:12px 16px;
+                font-size:14px;
+                font-weight:700;
+                width:100%;
+                cursor:pointer;
+            ">
+                💬 Contáctanos por WhatsApp
+            </button>
+        </a>
+        <div style="font-size:12px;color:#6A7067;margin-top:6px;">
+            Atención y soporte Drop24
+        </div>
+    </div>
+""")
+
+HOW_IT_WORKS_HTML = compact_html(f"""
+    <div class="card">
+    <b>ℹ️ ¿Cómo funciona Drop24?</b><br>
+    Aquí te explicamos paso a paso cómo usar el portal, el QR agendado y el buzón/lockers.
+    </div>
+
+    <div class="card">
+    <b>1) 📝 Registro</b><br>
+    - Crea tu usuario y contraseña.<br>
+    - Captura tu teléfono y correo.<br>
+    - Agrega tu domicilio (para servicio a domicilio próximamente).<br>
+    </div>
+
+    <div class="card">
+    <b>2) 📲 Login</b><br>
+    - Inicia sesión desde la parte superior (más cómodo en teléfono).<br>
+    - Con sesión activa podrás generar QRs agendados y ver tus tokens.<br>
+    </div>
+
+    <div class="card">
+    <b>3) 🔒 QR Agendado (seguridad)</b><br>
+    - Puedes generar un QR con ventana de tiempo.<br>
+    - Por seguridad: el QR dura <b>15 minutos</b> (buzón) y solo puedes tener <b>1 QR activo</b> a la vez.<br>
+    - Si es de 1 uso, se marca como usado después de abrir.<br>
+    </div>
+
+    <div class="card">
+    <b>4) 🧺 Buzón 24/7</b><br>
+    - Te registras y obtienes tu QR.<br>
+    - Escaneas el QR en el buzón y depositas tu ropa identificada.<br>
+    - Recolectamos en el siguiente horario hábil y comenzamos el proceso.<br>
+    </div>
+
+    <div class="card">
+    <b>5) 🔐 Lockers (L1 / L2)</b><br>
+    - Si eliges Locker, seleccionas un rango de 1 hora (ej. 19:00–20:00).<br>
+    - Tu QR solo funciona dentro de esa ventana.<br>
+    - Si no se recoge a tiempo, se guarda en almacén y se solicita apoyo por WhatsApp.<br>
+    </div>
+
+    <div class="card">
+    <b>6) 🤖 Chatbot</b><br>
+    - Resuelve dudas rápidas: precios, buzón, QR, tiempos de entrega y especiales.<br>
+    </div>
+
+    <div class="card">
+    <b>💬 Soporte</b><br>
+    ¿Necesitas ayuda con tu QR o locker? Contáctanos por WhatsApp.<br><br>
+    👉 <a href="{WHATSAPP_URL}" target="_blank"><b>Escríbenos aquí</b></a>
+    </div>
+""")
+
+REGISTER_INTRO_HTML = compact_html("""
+    <div class="card">
+    <b>Registro de usuario Drop24</b><br>
+    Este registro también recopila tu domicilio <b>para el servicio a domicilio (próximamente)</b>.
+    </div>
+""")
+
+QR_INFO_HTML = compact_html("""
+    <div class="card">
+    <b>¿Qué hace este QR?</b><br>
+    El QR contiene un token corto. La app Android validará en Firestore si está activo, dentro de horario y (si aplica) si ya fue usado.
+    </div>
+""")
+
+CHAT_INTRO_HTML = compact_html("""
+    <div class="card">
+    <b>🤖 Chatbot Drop24</b><br>
+    Soporte tipo “página de ayuda”: buzón 24/7, QR, lockers, tiempos y cuidado de prendas.
+    </div>
+""")
+
+
+@lru_cache(maxsize=8)
+def closing_html(logo: str, year: int, org_name: str) -> str:
+    """Conócenos + footer en un solo bloque."""
+    return compact_html(f"""
+    <div class="card" style="margin-top:28px;">
+      <div style="display:flex;align-items:center;gap:16px;flex-wrap:wrap;">
+        {logo}
+        <div>
+          <h3 style="margin:0;color:{C_TEAL_DARK};font-weight:900;">Conócenos</h3>
+          <div class="note">Tecnología, confianza y comodidad para tu ropa</div>
+        </div>
+      </div>
+
+      <hr style="margin:14px 0;border:none;border-top:1px solid #E5EFF3;">
+
+      <p style="font-size:14px;line-height:1.6;margin:0 0 12px 0;">
+        <b>Drop24</b> es una plataforma de lavandería moderna que combina
+        <b>tecnología</b>, <b>automatización</b> y <b>atención responsable</b>.
+        Estamos preparando nuestro <b>servicio a domicilio</b> para que puedas
+        olvidarte por completo del lavado de ropa.
+      </p>
+
+      <div>
+        <span class="pill">Servicio a domicilio · Próximamente</span>
+        <span class="pill">Accesos con QR</span>
+        <span class="pill">Tecnología Drop24</span>
+      </div>
+    </div>
+
+    <div style="text-align:center;margin-top:50px;">
+        <div style="display:flex;justify-content:center;margin-bottom:10px;">
+            {logo}
+        </div>
+        <div class="note">
+            © {year} · {org_name}<br>
+            <span class="note">Portal Drop24 en Streamlit + Firestore. Domicilio requerido para servicio a domicilio (próximamente).</span>
+        </div>
+    </div>
+    """)
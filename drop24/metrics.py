@@ -0,0 +1,345 @@
+"""
+Instrumentación ligera del camino caliente.
+
+- ``span(op, col)``: mide una operación (lectura/escritura de storage, bcrypt,
+  render de QR, armado de tablas) y la suma al registro del proceso.
+- Lecturas/escrituras de documentos por operación, por rerun y por sesión:
+  ``start_run`` abre un contador para el rerun actual (contextvar del hilo del
+  script) y ``finish_run`` lo cierra.
+- ``InstrumentedBackend`` envuelve cualquier Backend y cuenta lo que cobra
+  Firestore (una consulta vacía también cuesta 1 lectura).
+- Export: texto Prometheus (textfile collector) y JSON lines por rerun.
+
+Todo vive en memoria del proceso; las percentiles salen de las últimas
+``SAMPLES`` mediciones de cada operación.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from drop24.storage import Backend, Batch
+
+SAMPLES = 1024
+# segundos; buckets del histograma de Prometheus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PROM_EVERY_SECONDS = 15.0
+RECENT_RUNS = 500
+
+_lock = threading.Lock()
+_ops = {}  # (op, col) -> _OpStats
+_run = contextvars.ContextVar("drop24_run", default=None)
+_export = {"prom_path": None, "jsonl_path": None, "last_prom": 0.0}
+_recent = deque(maxlen=RECENT_RUNS)  # dicts de los últimos reruns (para descargar como JSONL)
+
+
+class _OpStats:
+    __slots__ = ("count", "errors", "total", "reads", "writes", "samples", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.reads = 0
+        self.writes = 0
+        self.samples = deque(maxlen=SAMPLES)
+        self.buckets = [0] * len(BUCKETS)
+
+
+class RunStats:
+    """Lo que costó un rerun (o una sesión, si se acumulan)."""
+
+    __slots__ = ("session", "page", "started", "seconds", "reads", "writes", "ops", "finished")
+
+    def __init__(self, session: str = "", page: str = ""):
+        self.session = session
+        self.page = page
+        self.started = time.time()
+        self.seconds = 0.0
+        self.reads = 0
+        self.writes = 0
+        self.ops = {}  # "op col" -> [n, segundos]
+        self.finished = False
+
+    def add(self, other: "RunStats"):
+        self.seconds += other.seconds
+        self.reads += other.reads
+        self.writes += other.writes
+        for k, (n, s) in other.ops.items():
+            cur = self.ops.setdefault(k, [0, 0.0])
+            cur[0] += n
+            cur[1] += s
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": self.started, "session": self.session, "page": self.page, "seconds": round(self.seconds, 6),
+            "reads": self.reads, "writes": self.writes,
+            "ops": {k: {"n": n, "seconds": round(s, 6)} for k, (n, s) in self.ops.items()},
+        }
+
+
+def configure(prom_path: str = None, jsonl_path: str = None):
+    """Rutas de export (None = no escribir archivo)."""
+    _export["prom_path"] = prom_path or None
+    _export["jsonl_path"] = jsonl_path or None
+
+
+def record(op: str, col: str, seconds: float, reads: int = 0, writes: int = 0, error: bool = False):
+    key = (op, col or "")
+    with _lock:
+        s = _ops.get(key)
+        if s is None:
+            s = _ops[key] = _OpStats()
+        s.count += 1
+        s.errors += int(error)
+        s.total += seconds
+        s.reads += reads
+        s.writes += writes
+        s.samples.append(seconds)
+        for i, b in enumerate(BUCKETS):
+            if seconds <= b:
+                s.buckets[i] += 1
+                break
+    run = _run.get()
+    if run is not None and not run.finished:
+        run.reads += reads
+        run.writes += writes
+        cur = run.ops.setdefault(f"{op} {col}".strip(), [0, 0.0])
+        cur[0] += 1
+        cur[1] += seconds
+
+
+class span:
+    """``with span("db.query", col) as sp: ...; sp.reads = n``"""
+
+    __slots__ = ("op", "col", "reads", "writes", "t0")
+
+    def __init__(self, op: str, col: str = "", reads: int = 0, writes: int = 0):
+        self.op = op
+        self.col = col
+        self.reads = reads
+        self.writes = writes
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.op, self.col, time.perf_counter() - self.t0, self.reads, self.writes, error=exc_type is not None)
+        return False
+
+
+# =================================================
+# Reruns / sesiones
+# =================================================
+def start_run(session: str = "", page: str = "") -> RunStats:
+    run = RunStats(session, page)
+    run.seconds = time.perf_counter()  # marca de inicio; finish_run la convierte en duración
+    _run.set(run)
+    return run
+
+
+def finish_run(run: RunStats, interrupted: bool = False) -> RunStats:
+    """Cierra el rerun (idempotente). Un rerun cortado por st.rerun()/st.stop() se cierra al inicio del siguiente."""
+    if run is None or run.finished:
+        return run
+    run.seconds = time.perf_counter() - run.seconds
+    run.finished = True
+    if not interrupted:
+        record("app.rerun", run.page, run.seconds)
+    if _run.get() is run:
+        _run.set(None)
+    rec = {**run.to_dict(), "interrupted": interrupted}
+    _recent.append(rec)
+    path = _export["jsonl_path"]
+    if path:
+        with _lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    maybe_write_prometheus()
+    return run
+
+
+def recent_runs_jsonl() -> str:
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in list(_recent))
+
+
+# =================================================
+# Consultas / export
+# =================================================
+def _pct(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[i]
+
+
+def snapshot() -> list[dict]:
+    """Una fila por (operación, colección), de la más costosa (tiempo total) a la menos."""
+    with _lock:
+        items = [(k, s.count, s.errors, s.total, s.reads, s.writes, sorted(s.samples)) for k, s in _ops.items()]
+    rows = []
+    for (op, col), count, errors, total, reads, writes, vals in items:
+        rows.append({
+            "op": op, "col": col, "count": count, "errors": errors,
+            "p50_ms": round(_pct(vals, 0.50) * 1000, 2),
+            "p95_ms": round(_pct(vals, 0.95) * 1000, 2),
+            "max_ms": round((vals[-1] if vals else 0.0) * 1000, 2),
+            "total_s": round(total, 3),
+            "reads": reads, "writes": writes,
+        })
+    rows.sort(key=lambda r: -r["total_s"])
+    return rows
+
+
+def reset():
+    with _lock:
+        _ops.clear()
+        _recent.clear()
+
+
+def _label(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def prometheus_text() -> str:
+    with _lock:
+        items = [(k, s.count, s.errors, s.total, s.reads, s.writes, list(s.buckets)) for k, s in sorted(_ops.items())]
+    out = [
+        "# HELP drop24_op_seconds Duración de operaciones del portal.",
+        "# TYPE drop24_op_seconds histogram",
+    ]
+    for (op, col), count, _errors, total, _r, _w, buckets in items:
+        labels = f'op="{_label(op)}",col="{_label(col)}"'
+        acc = 0
+        for b, n in zip(BUCKETS, buckets):
+            acc += n
+            out.append(f'drop24_op_seconds_bucket{{{labels},le="{b}"}} {acc}')
+        out.append(f'drop24_op_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        out.append(f"drop24_op_seconds_sum{{{labels}}} {total:.6f}")
+        out.append(f"drop24_op_seconds_count{{{labels}}} {count}")
+    out += ["# HELP drop24_op_errors_total Operaciones que terminaron en excepción.", "# TYPE drop24_op_errors_total counter"]
+    out += [f'drop24_op_errors_total{{op="{_label(op)}",col="{_label(col)}"}} {e}' for (op, col), _c, e, *_ in items]
+    out += ["# HELP drop24_doc_reads_total Lecturas de documentos.", "# TYPE drop24_doc_reads_total counter"]
+    out += [f'drop24_doc_reads_total{{op="{_label(op)}",col="{_label(col)}"}} {r}'
+            for (op, col), _c, _e, _t, r, _w, _b in items if r]
+    out += ["# HELP drop24_doc_writes_total Escrituras de documentos.", "# TYPE drop24_doc_writes_total counter"]
+    out += [f'drop24_doc_writes_total{{op="{_label(op)}",col="{_label(col)}"}} {w}'
+            for (op, col), _c, _e, _t, _r, w, _b in items if w]
+    return "\n".join(out) + "\n"
+
+
+def maybe_write_prometheus(force: bool = False):
+    """Reescribe el archivo de Prometheus como mucho cada PROM_EVERY_SECONDS (escritura atómica)."""
+    path = _export["prom_path"]
+    if not path:
+        return
+    now = time.monotonic()
+    if not force and now - _export["last_prom"] < PROM_EVERY_SECONDS:
+        return
+    _export["last_prom"] = now
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+# =================================================
+# Backend instrumentado
+# =================================================
+class _TxnProxy:
+    """Las escrituras de una transacción sólo se encolan: se cuentan en el span
+    ``db.transaction`` que la envuelve (no son muestras de latencia propias)."""
+
+    def __init__(self, t):
+        self.t = t
+        self.writes = 0
+
+    def get(self, col, doc_id):
+        with span("db.txn_get", col, reads=1):
+            return self.t.get(col, doc_id)
+
+    def get_many(self, col, doc_ids):
+        ids = list(doc_ids)
+        with span("db.txn_get_many", col, reads=len(set(ids))):
+            return self.t.get_many(col, ids)
+
+    def _write(self, name, col, *args):
+        self.writes += 1
+        return getattr(self.t, name)(col, *args)
+
+    def set(self, col, doc_id, data, merge=False):
+        return self._write("set", col, doc_id, data, merge)
+
+    def create(self, col, doc_id, data):
+        return self._write("create", col, doc_id, data)
+
+    def update(self, col, doc_id, fields):
+        return self._write("update", col, doc_id, fields)
+
+    def delete(self, col, doc_id):
+        return self._write("delete", col, doc_id)
+
+
+class InstrumentedBackend(Backend):
+    """Mismo Backend, con spans y conteo de lecturas/escrituras por colección."""
+
+    def __init__(self, inner: Backend):
+        self.inner = inner
+        self.name = inner.name
+
+    def get(self, col, doc_id):
+        with span("db.get", col, reads=1):
+            return self.inner.get(col, doc_id)
+
+    def get_many(self, col, doc_ids):
+        ids = list(doc_ids)
+        with span("db.get_many", col, reads=len(set(ids))):
+            return self.inner.get_many(col, ids)
+
+    def set(self, col, doc_id, data, merge=False):
+        with span("db.set", col, writes=1):
+            return self.inner.set(col, doc_id, data, merge=merge)
+
+    def create(self, col, doc_id, data):
+        with span("db.create", col, writes=1):
+            return self.inner.create(col, doc_id, data)
+
+    def update(self, col, doc_id, fields):
+        with span("db.update", col, writes=1):
+            return self.inner.update(col, doc_id, fields)
+
+    def delete(self, col, doc_id):
+        with span("db.delete", col, writes=1):
+            return self.inner.delete(col, doc_id)
+
+    def query(self, col, where=(), order_by=(), limit=None, start_after=None):
+        with span("db.query", col) as sp:
+            docs = self.inner.query(col, where=where, order_by=order_by, limit=limit, start_after=start_after)
+            sp.reads = max(1, len(docs))
+        return docs
+
+    def batch(self) -> Batch:
+        return Batch(self)
+
+    def _commit(self, writes):
+        cols = {w[1] for w in writes}
+        with span("db.batch", cols.pop() if len(cols) == 1 else "*", writes=len(writes)):
+            return self.inner._commit(writes)
+
+    def run_transaction(self, fn):
+        with span("db.transaction") as sp:
+            def attempt(t):
+                # en cada reintento se vuelve a encolar todo: cuenta el último intento
+                proxy = _TxnProxy(t)
+                sp.writes = 0
+                out = fn(proxy)
+                sp.writes = proxy.writes
+                return out
+
+            return self.inner.run_transaction(attempt)
+
+    def __getattr__(self, name):
+        # lo específico de cada backend (p. ej. conn de SQLite) pasa directo
+        return getattr(self.inner, name)
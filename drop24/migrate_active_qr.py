@@ -0,0 +1,98 @@
+"""
+Migración: puntero ``drop24_active_qr/<username>`` para los QRs que ya estaban vigentes.
+
+``TokenStore.issue`` mantiene el puntero para los QRs nuevos; los emitidos
+antes no lo tienen, así que esos usuarios podían sacar un segundo QR hasta que
+el primero expirara. Esto recorre los tokens activos y vigentes por ``end_ts``
+en bloques y, por usuario, apunta al que termina más tarde (sin tocar un
+puntero vigente que ya apunte más lejos). Reporta los usuarios con más de un
+QR vigente. Checkpoint en ``drop24_migrations/active_qr__drop24_qr_tokens``.
+
+    python -m drop24.migrate_active_qr --firebase-creds service_account.json
+"""
+import logging
+from datetime import datetime, timezone
+
+from drop24.migrate_timestamps import MEXICO_TZ, MIGRATIONS_COL
+from drop24.repository import ACTIVE_COL, TOKENS_COL, pointer_live
+from drop24.storage import Backend, add_backend_args, as_utc, backend_from_args, cursor_after
+
+log = logging.getLogger(__name__)
+
+MIGRATION_NAME = "active_qr"
+DEFAULT_CHUNK = 300
+
+
+def backfill_active_pointers(backend: Backend, now: datetime = None, chunk: int = DEFAULT_CHUNK) -> tuple:
+    """Regresa (punteros escritos, {username: QRs vigentes}) de los usuarios con más de uno en esta corrida."""
+    now = now or datetime.now(timezone.utc)
+    ckpt_id = f"{MIGRATION_NAME}__{TOKENS_COL}"
+    ckpt = backend.get(MIGRATIONS_COL, ckpt_id) or {}
+    if ckpt.get("done"):
+        log.info("punteros de QR activo ya creados")
+        return 0, {}
+
+    where = [("active", "==", True), ("end_ts", ">", now)]
+    order_by = [("end_ts", "asc")]
+    cursor = tuple(ckpt["cursor"]) if ckpt.get("cursor") else None
+    written_before = int(ckpt.get("written", 0))
+    written, open_count = 0, {}
+
+    while True:
+        docs = backend.query(TOKENS_COL, where=where, order_by=order_by, limit=chunk, start_after=cursor)
+        if not docs:
+            break
+        # un QR de 1 uso ya usado no cuenta (mark_used ya soltó su puntero)
+        latest = {}
+        for d in docs:
+            owner = d.data.get("created_by")
+            if not owner or (d.data.get("one_time") and d.data.get("used")):
+                continue
+            open_count[owner] = open_count.get(owner, 0) + 1
+            latest[owner] = d  # vienen por end_ts asc: gana el último
+        pointers = backend.get_many(ACTIVE_COL, list(latest))
+        b = backend.batch()
+        for owner, d in latest.items():
+            p = pointers.get(owner)
+            if pointer_live(p, now) and as_utc(p["end_ts"]) >= as_utc(d.data["end_ts"]):
+                continue
+            b.set(ACTIVE_COL, owner, {
+                "token_id": d.id,
+                "end_ts": d.data.get("end_ts"),
+                "end_time": d.data.get("end_time", ""),
+                "one_time": bool(d.data.get("one_time", False)),
+                "updated_at": now,
+            })
+        written += b.commit()
+
+        cursor = cursor_after(docs[-1], order_by)
+        backend.set(MIGRATIONS_COL, ckpt_id, {
+            "collection": TOKENS_COL, "cursor": list(cursor), "written": written_before + written,
+            "done": False, "updated_at": datetime.now(MEXICO_TZ),
+        })
+        log.info("punteros: %s tokens revisados hasta %s", len(docs), docs[-1].id)
+
+    backend.set(MIGRATIONS_COL, ckpt_id, {
+        "collection": TOKENS_COL, "cursor": None, "written": written_before + written,
+        "done": True, "updated_at": datetime.now(MEXICO_TZ),
+    })
+    return written, {u: n for u, n in open_count.items() if n > 1}
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Crea el puntero de QR activo para los tokens ya vigentes")
+    add_backend_args(ap)
+    ap.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    written, multi = backfill_active_pointers(backend_from_args(ap, args), chunk=args.chunk)
+    log.info("%s punteros escritos, %s usuarios con más de un QR vigente", written, len(multi))
+    for username, n in sorted(multi.items()):
+        log.warning("%s tiene %s QRs vigentes (el puntero queda en el que termina más tarde)", username, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Migración: created_at / updated_at de string ("2026-01-31 19:05:00 CST") a timestamp.
+
+Recorre cada colección por id en bloques, convierte en batches y guarda un
+checkpoint (último id procesado) en ``drop24_migrations/<nombre>`` después de
+cada bloque; si se interrumpe, al volver a correr sigue donde se quedó.
+
+    python -m drop24.migrate_timestamps --firebase-creds service_account.json
+    python -m drop24.migrate_timestamps --sqlite drop24.db --chunk 200
+"""
+import logging
+import re
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from drop24.repository import USERS_COL, TOKENS_COL
+from drop24.storage import Backend, cursor_after, add_backend_args, backend_from_args
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_COL = "drop24_migrations"
+MIGRATION_NAME = "created_at_ts"
+FIELDS = ("created_at", "updated_at")
+DEFAULT_CHUNK = 300
+
+MEXICO_TZ = ZoneInfo("America/Mexico_City")
+_STR_RE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?:\s+(\S+))?$")
+
+
+def parse_mx_str(value: str):
+    """'2026-01-31 19:05:00 CST' -> datetime con tz CDMX (None si no se reconoce)."""
+    m = _STR_RE.match((value or "").strip())
+    if not m:
+        return None
+    naive = datetime.strptime(m.group(1), "%Y-%m-%d %H:%M:%S")
+    # en la hora repetida del cambio de horario, el sufijo decide (CDT=primera, CST=segunda)
+    fold = 1 if (m.group(2) or "").upper() == "CST" else 0
+    return naive.replace(tzinfo=MEXICO_TZ, fold=fold)
+
+
+def _fields_to_fix(data: dict) -> dict:
+    out = {}
+    for f in FIELDS:
+        v = data.get(f)
+        if isinstance(v, str):
+            dt = parse_mx_str(v)
+            if dt is not None:
+                out[f] = dt
+    return out
+
+
+def migrate_collection(backend: Backend, col: str, chunk: int = DEFAULT_CHUNK, name: str = MIGRATION_NAME) -> int:
+    """Migra una colección; regresa cuántos docs se actualizaron en esta corrida."""
+    ckpt_id = f"{name}__{col}"
+    ckpt = backend.get(MIGRATIONS_COL, ckpt_id) or {}
+    if ckpt.get("done"):
+        log.info("%s ya migrada", col)
+        return 0
+
+    order_by = [("__name__", "asc")]
+    cursor = (ckpt["last_id"],) if ckpt.get("last_id") else None
+    scanned = int(ckpt.get("scanned", 0))
+    updated_before = int(ckpt.get("updated", 0))
+    fixed_now = 0
+
+    while True:
+        docs = backend.query(col, order_by=order_by, limit=chunk, start_after=cursor)
+        if not docs:
+            break
+        b = backend.batch()
+        for d in docs:
+            fields = _fields_to_fix(d.data)
+            if fields:
+                b.update(col, d.id, fields)
+        fixed_now += b.commit()
+
+        scanned += len(docs)
+        cursor = cursor_after(docs[-1], order_by)
+        backend.set(MIGRATIONS_COL, ckpt_id, {
+            "collection": col, "last_id": docs[-1].id, "scanned": scanned, "updated": updated_before + fixed_now,
+            "done": False, "updated_at": datetime.now(MEXICO_TZ),
+        })
+        log.info("%s: %s docs revisados (último %s)", col, scanned, docs[-1].id)
+
+    backend.set(MIGRATIONS_COL, ckpt_id, {
+        "collection": col, "last_id": None, "scanned": scanned, "updated": updated_before + fixed_now,
+        "done": True, "updated_at": datetime.now(MEXICO_TZ),
+    })
+    return fixed_now
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Convierte created_at/updated_at de string a timestamp")
+    add_backend_args(ap)
+    ap.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    ap.add_argument("--collection", action="append", help="por default usuarios y tokens")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    backend = backend_from_args(ap, args)
+    for col in args.collection or [USERS_COL, TOKENS_COL]:
+        n = migrate_collection(backend, col, chunk=args.chunk)
+        log.info("%s: %s docs convertidos", col, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Migración: índices de unicidad de teléfono y email para los usuarios existentes.
+
+Los registros nuevos reclaman ``drop24_user_phones/<teléfono>`` y
+``drop24_user_emails/<email>`` en el mismo commit que el usuario; los que ya
+existían no los tienen. Esto recorre ``drop24_users`` por id en bloques, crea
+los índices que falten y reporta los duplicados (el primero por id se queda
+con el índice; los demás hay que corregirlos a mano). Checkpoint en
+``drop24_migrations/user_index__drop24_users``, igual que migrate_timestamps.
+
+El teléfono se indexa sin lada de país (``normalize_phone``). Si el usuario lo
+tiene guardado con lada (``5215512345678``), en el mismo batch se reescribe
+``phone`` a la forma canónica y se borra el índice viejo con esos dígitos si
+es de ese usuario: nadie lo vuelve a buscar y dejaría el número "tomado".
+
+    python -m drop24.migrate_user_index --firebase-creds service_account.json
+"""
+import logging
+import re
+from datetime import datetime
+
+from drop24.migrate_timestamps import MEXICO_TZ, MIGRATIONS_COL
+from drop24.registration import normalize_phone
+from drop24.repository import PHONE_INDEX_COL, USERS_COL, index_claims
+from drop24.storage import BATCH_LIMIT, Backend, add_backend_args, backend_from_args, cursor_after
+
+log = logging.getLogger(__name__)
+
+MIGRATION_NAME = "user_index"
+# por usuario: teléfono reescrito + 2 índices + índice viejo borrado = hasta 4 escrituras
+DEFAULT_CHUNK = BATCH_LIMIT // 4
+
+
+def _legacy_phone_key(phone) -> str:
+    """Id del índice de teléfono de antes de quitar la lada (solo dígitos)."""
+    return re.sub(r"\D+", "", str(phone or ""))
+
+
+def backfill_user_index(backend: Backend, chunk: int = DEFAULT_CHUNK) -> tuple:
+    """Regresa (índices creados, [(username, colección, id, dueño actual)] duplicados) de esta corrida."""
+    ckpt_id = f"{MIGRATION_NAME}__{USERS_COL}"
+    ckpt = backend.get(MIGRATIONS_COL, ckpt_id) or {}
+    if ckpt.get("done"):
+        log.info("índices de usuarios ya creados")
+        return 0, []
+
+    chunk = max(1, min(int(chunk), DEFAULT_CHUNK))
+    order_by = [("__name__", "asc")]
+    cursor = (ckpt["last_id"],) if ckpt.get("last_id") else None
+    created_before = int(ckpt.get("created", 0))
+    created, dups = 0, []
+
+    while True:
+        docs = backend.query(USERS_COL, order_by=order_by, limit=chunk, start_after=cursor)
+        if not docs:
+            break
+        canonical = {d.id: normalize_phone(d.data.get("phone")) for d in docs}
+        stale = {}
+        for d in docs:
+            old = _legacy_phone_key(d.data.get("phone"))
+            if old and old != canonical[d.id]:
+                stale[d.id] = old
+        wanted = [(d.id, d.data, col, key) for d in docs
+                  for col, key in index_claims(d.id, {**d.data, "phone": canonical[d.id]})]
+        keys = {}
+        for _, _, col, key in wanted:
+            keys.setdefault(col, []).append(key)
+        if stale:
+            keys.setdefault(PHONE_INDEX_COL, []).extend(stale.values())
+        current = {col: backend.get_many(col, ids) for col, ids in keys.items()}
+        b = backend.batch()
+        for d in docs:
+            if d.data.get("phone") != canonical[d.id]:
+                b.update(USERS_COL, d.id, {"phone": canonical[d.id]})
+        for username, old in stale.items():
+            owner = current[PHONE_INDEX_COL].get(old)
+            if owner is not None and owner.get("username") == username:
+                b.delete(PHONE_INDEX_COL, old)
+                current[PHONE_INDEX_COL].pop(old)
+        for username, data, col, key in wanted:
+            owner = current[col].get(key)
+            if owner is None:
+                b.set(col, key, {"username": username, "created_at": data.get("created_at")})
+                current[col][key] = {"username": username}
+                created += 1
+            elif owner.get("username") != username:
+                dups.append((username, col, key, owner.get("username")))
+        b.commit()
+
+        cursor = cursor_after(docs[-1], order_by)
+        backend.set(MIGRATIONS_COL, ckpt_id, {
+            "collection": USERS_COL, "last_id": docs[-1].id, "created": created_before + created,
+            "done": False, "updated_at": datetime.now(MEXICO_TZ),
+        })
+        log.info("índices: %s usuarios revisados hasta %s", len(docs), docs[-1].id)
+
+    backend.set(MIGRATIONS_COL, ckpt_id, {
+        "collection": USERS_COL, "last_id": None, "created": created_before + created,
+        "done": True, "updated_at": datetime.now(MEXICO_TZ),
+    })
+    return created, dups
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Crea los índices de teléfono/email de los usuarios existentes")
+    add_backend_args(ap)
+    ap.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    created, dups = backfill_user_index(backend_from_args(ap, args), chunk=args.chunk)
+    log.info("%s índices creados, %s duplicados", created, len(dups))
+    for username, col, key, owner in dups:
+        log.warning("duplicado: %s quiere %s/%s (ya es de %s)", username, col, key, owner)
+
+
+if __name__ == "__main__":
+    main()
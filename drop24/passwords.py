@@ -0,0 +1,145 @@
+"""
+Hash de contraseñas (bcrypt) fuera del hilo del script.
+
+- Un pool acotado de hilos hace el trabajo (bcrypt suelta el GIL), así una
+  ráfaga de logins no pone a competir más hashes que cores configurados.
+- ``calibrate_rounds`` elige el costo que da ~target_ms en este hardware (nunca
+  menos que el 12 fijo de antes); con ``configure(target_ms=...)`` la
+  calibración corre en el pool y el arranque no la espera.
+- ``needs_rehash`` detecta hashes con costo viejo para re-hashearlos tras un
+  login exitoso, sin que el usuario lo note.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from drop24.metrics import span
+
+log = logging.getLogger(__name__)
+
+DEFAULT_ROUNDS = 12
+MIN_ROUNDS = DEFAULT_ROUNDS  # en hardware lento la calibración no debe debilitar los hashes nuevos
+MAX_ROUNDS = 15
+TARGET_MS = 250
+
+_lock = threading.Lock()
+_pool = None
+_rounds = DEFAULT_ROUNDS
+_calibration = None  # Future de calibrate_rounds mientras corre
+
+
+def configure(max_workers: int = None, rounds: int = None, target_ms: float = None):
+    """Fija el tope de hashes simultáneos y/o el costo actual (o lo calibra en segundo plano)."""
+    global _pool, _rounds, _calibration
+    with _lock:
+        if max_workers:
+            old = _pool
+            _pool = ThreadPoolExecutor(max_workers=int(max_workers), thread_name_prefix="drop24-bcrypt")
+            if old is not None:
+                old.shutdown(wait=False)
+        if rounds:
+            _rounds = int(rounds)
+            _calibration = None
+    if target_ms and not rounds:
+        _calibration = _get_pool().submit(calibrate_rounds, float(target_ms))
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="drop24-bcrypt")
+    return _pool
+
+
+def current_rounds() -> int:
+    """Costo actual; si hay una calibración en curso, la espera (solo la primera vez)."""
+    global _rounds, _calibration
+    fut = _calibration
+    if fut is not None:
+        rounds = fut.result()
+        with _lock:
+            if _calibration is fut:
+                _rounds, _calibration = rounds, None
+    return _rounds
+
+
+def calibrate_rounds(target_ms: float = TARGET_MS, min_rounds: int = MIN_ROUNDS, max_rounds: int = MAX_ROUNDS) -> int:
+    """Mide un hash con costo mínimo y extrapola (cada +1 duplica el tiempo)."""
+    import bcrypt
+
+    salt = bcrypt.gensalt(rounds=min_rounds)
+    t0 = time.perf_counter()
+    bcrypt.hashpw(b"drop24-calibration", salt)
+    ms = (time.perf_counter() - t0) * 1000
+    rounds = min_rounds
+    while rounds < max_rounds and ms * 2 <= target_ms * 1.25:
+        ms *= 2
+        rounds += 1
+    return rounds
+
+
+def _hash(pw: str, rounds: int) -> str:
+    import bcrypt
+
+    return bcrypt.hashpw(pw.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _check(pw: str, pw_hash: str) -> bool:
+    import bcrypt
+
+    try:
+        return bcrypt.checkpw(pw.encode("utf-8"), pw_hash.encode("utf-8"))
+    except Exception:
+        return False
+
+
+def hash_password(pw: str, rounds: int = None) -> str:
+    rounds = rounds or current_rounds()
+    with span("bcrypt.hash", str(rounds)):
+        return _get_pool().submit(_hash, pw, rounds).result()
+
+
+def hash_many(pws: list[str], rounds: int = None) -> list[str]:
+    """Varios hashes a la vez en el pool (alta masiva); mismo orden que ``pws``."""
+    rounds = rounds or current_rounds()
+    pool = _get_pool()
+    with span("bcrypt.hash_many", str(rounds)):
+        futures = [pool.submit(_hash, pw, rounds) for pw in pws]
+        return [f.result() for f in futures]
+
+
+def check_password(pw: str, pw_hash: str) -> bool:
+    # incluye la espera en la cola del pool: es lo que siente el usuario
+    with span("bcrypt.check", str(hash_rounds(pw_hash))):
+        return _get_pool().submit(_check, pw, pw_hash).result()
+
+
+def hash_rounds(pw_hash: str) -> int:
+    """'$2b$12$...' -> 12 (0 si no se reconoce)."""
+    try:
+        return int((pw_hash or "").split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(pw_hash: str) -> bool:
+    return hash_rounds(pw_hash) < current_rounds()
+
+
+def rehash_async(pw: str, on_done):
+    """Re-hashea en el pool y llama ``on_done(nuevo_hash)``; el login no espera."""
+
+    rounds = current_rounds()
+
+    def _job():
+        try:
+            on_done(_hash(pw, rounds))
+        except Exception:
+            # nadie espera este Future: sin el log el error se perdería
+            log.exception("re-hash de contraseña falló (costo %s)", rounds)
+
+    return _get_pool().submit(_job)
@@ -0,0 +1,89 @@
+"""
+Render de QRs con cache.
+
+La matriz del QR y cada imagen ya codificada se guardan en caches LRU acotados
+(por payload + opciones), así volver a mostrar o descargar un QR no repite ni
+el armado de la matriz ni el encode PNG.
+
+Formatos:
+- "png":  mismos pixeles que antes (box 10, borde 2), 1 bit por pixel.
+- "png1": 1 pixel por módulo (~200 bytes); quien lo muestre lo escala sin suavizado.
+- "svg":  un solo <path>, escalable y ligero.
+"""
+import io
+from functools import lru_cache
+
+from drop24.metrics import span
+
+QR_CACHE_SIZE = 256
+
+MIME = {"png": "image/png", "png1": "image/png", "svg": "image/svg+xml"}
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_matrix(payload: str, border: int = 2) -> tuple:
+    """Matriz (tupla de tuplas de bool) con el borde incluido."""
+    import qrcode  # solo quien genera QRs paga el import
+
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=1,
+        border=border,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+def _png(matrix: tuple, box_size: int) -> bytes:
+    from PIL import Image
+
+    n = len(matrix)
+    # 1 bit por módulo: 1 = blanco, 0 = negro
+    img = Image.new("1", (n, n), 1)
+    img.putdata([0 if cell else 1 for row in matrix for cell in row])
+    if box_size > 1:
+        img = img.resize((n * box_size, n * box_size), Image.NEAREST)
+    bio = io.BytesIO()
+    img.save(bio, format="PNG", optimize=True)
+    return bio.getvalue()
+
+
+def _svg(matrix: tuple, box_size: int) -> bytes:
+    n = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < n:
+            if row[x]:
+                start = x
+                while x < n and row[x]:
+                    x += 1
+                path.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    size = n * box_size
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {n} {n}" shape-rendering="crispEdges">'
+        f'<rect width="{n}" height="{n}" fill="#fff"/>'
+        f'<path d="{"".join(path)}" fill="#000"/></svg>'
+    ).encode("utf-8")
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr(payload: str, fmt: str = "png", box_size: int = 10, border: int = 2) -> bytes:
+    # solo se mide lo que no salió de cache (los hits no llegan aquí)
+    with span("qr.render", fmt):
+        if fmt == "png":
+            return _png(qr_matrix(payload, border), box_size)
+        if fmt == "png1":
+            return _png(qr_matrix(payload, border), 1)
+        if fmt == "svg":
+            return _svg(qr_matrix(payload, border), box_size)
+        raise ValueError(f"Formato de QR no soportado: {fmt}")
+
+
+def make_qr_png_bytes(payload: str) -> bytes:
+    return render_qr(payload, "png")
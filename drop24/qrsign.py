@@ -0,0 +1,135 @@
+"""
+Payload QR firmado (verificable sin backend).
+
+Formato (v2):
+
+    DROP24|ABC123DEF456|s2.<kid>.<cuerpo>.<firma>
+
+- El 2º campo sigue siendo el token_id, así los escáneres viejos que solo
+  leen ``prefijo|token`` siguen funcionando.
+- cuerpo = base64url(access_type[2] · start_ts[u32] · end_ts[u32] · flags[u8])
+- firma  = HMAC-SHA256(clave[kid], "s2|prefijo|token_id|cuerpo") truncada a 16 bytes.
+
+Las claves llevan versión (kid): se firma con la activa y se verifica con
+cualquiera del llavero, así se pueden rotar sin invalidar QRs vigentes.
+Los payloads viejos ``DROP24|XXXX`` se reconocen como ``legacy`` y se validan
+contra el backend como siempre.
+"""
+import base64
+import hashlib
+import hmac
+import struct
+from collections import namedtuple
+from datetime import datetime, timezone
+
+VERSION = "s2"
+SIG_BYTES = 16
+_BODY = struct.Struct(">2sIIB")
+_FLAG_ONE_TIME = 0x01
+
+QRClaims = namedtuple(
+    "QRClaims",
+    ["prefix", "token_id", "access_type", "start_ts", "end_ts", "one_time", "kid", "signed"],
+)
+
+
+class InvalidQR(Exception):
+    pass
+
+
+def _b64e(b: bytes) -> str:
+    return base64.urlsafe_b64encode(b).rstrip(b"=").decode("ascii")
+
+
+def _b64d(s: str) -> bytes:
+    return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+
+
+def _epoch(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def split_payload(payload: str):
+    """'DROP24|TOKEN|s2...' -> ('DROP24', 'TOKEN', 's2...'); el 3º es None en legacy."""
+    parts = (payload or "").strip().split("|")
+    if len(parts) == 1:
+        return "", parts[0].strip().upper(), None
+    sig = parts[2].strip() if len(parts) > 2 and parts[2].strip() else None
+    return parts[0].strip(), parts[1].strip().upper(), sig
+
+
+class QRSigner:
+    def __init__(self, keys: dict, active_kid: str):
+        if active_kid not in keys:
+            raise ValueError(f"kid activo '{active_kid}' no está en el llavero")
+        self.keys = {str(k): (v if isinstance(v, bytes) else _b64d(str(v))) for k, v in keys.items()}
+        self.active_kid = str(active_kid)
+
+    @classmethod
+    def from_config(cls, cfg):
+        """cfg = {"active": "k2026a", "keys": {"k2026a": "<base64>", ...}} (dict o secrets de Streamlit)."""
+        if not cfg:
+            return None
+        keys = dict(cfg.get("keys", {}) or {})
+        if not keys:
+            return None
+        return cls(keys, cfg.get("active") or next(iter(keys)))
+
+    def _mac(self, kid: str, prefix: str, token_id: str, body: str) -> bytes:
+        msg = f"{VERSION}|{prefix}|{token_id}|{body}".encode("utf-8")
+        return hmac.new(self.keys[kid], msg, hashlib.sha256).digest()[:SIG_BYTES]
+
+    def sign(self, prefix: str, token_id: str, access_type: str, start_ts: datetime, end_ts: datetime,
+             one_time: bool) -> str:
+        raw = _BODY.pack(
+            (access_type or "")[:2].upper().encode("ascii").ljust(2, b" "),
+            _epoch(start_ts),
+            _epoch(end_ts),
+            _FLAG_ONE_TIME if one_time else 0,
+        )
+        body = _b64e(raw)
+        sig = _b64e(self._mac(self.active_kid, prefix, token_id, body))
+        return f"{prefix}|{token_id}|{VERSION}.{self.active_kid}.{body}.{sig}"
+
+    def verify(self, payload: str) -> QRClaims:
+        """
+        Regresa los claims del QR. Legacy -> ``signed=False`` (sin ventana).
+        Lanza InvalidQR si la firma o el formato no cuadran.
+        """
+        prefix, token_id, sig_part = split_payload(payload)
+        if not token_id:
+            raise InvalidQR("sin token")
+        if sig_part is None:
+            return QRClaims(prefix, token_id, None, None, None, None, None, False)
+
+        try:
+            version, kid, body, sig = sig_part.split(".")
+        except ValueError:
+            raise InvalidQR("formato inválido")
+        if version != VERSION:
+            raise InvalidQR(f"versión no soportada: {version}")
+        if kid not in self.keys:
+            raise InvalidQR(f"kid desconocido: {kid}")
+        try:
+            given = _b64d(sig)
+            raw = _b64d(body)
+        except (ValueError, TypeError):
+            raise InvalidQR("base64 inválido")
+        if not hmac.compare_digest(given, self._mac(kid, prefix, token_id, body)):
+            raise InvalidQR("firma inválida")
+        if len(raw) != _BODY.size:
+            raise InvalidQR("cuerpo inválido")
+
+        access, start, end, flags = _BODY.unpack(raw)
+        return QRClaims(
+            prefix,
+            token_id,
+            access.decode("ascii").strip(),
+            datetime.fromtimestamp(start, timezone.utc),
+            datetime.fromtimestamp(end, timezone.utc),
+            bool(flags & _FLAG_ONE_TIME),
+            kid,
+            True,
+        )
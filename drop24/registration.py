@@ -0,0 +1,102 @@
+"""
+Reglas de alta de usuario (formulario de Registro e importación masiva).
+
+Las dos entradas pasan por aquí para que un usuario importado quede igual que
+uno registrado a mano: mismos campos obligatorios, CP de 5 dígitos, teléfono
+normalizado y el mismo documento en ``drop24_users``.
+"""
+import re
+
+REQUIRED_FIELDS = (
+    "username", "full_name", "phone", "email",
+    "street", "ext_number", "neighborhood", "borough", "postal_code",
+    "city", "state",
+)
+ADDRESS_FIELDS = (
+    "street", "ext_number", "int_number", "neighborhood", "borough", "postal_code",
+    "city", "state", "country", "between_streets", "references", "delivery_notes",
+)
+# Valores con los que arranca el formulario
+DEFAULTS = {"preferred_contact": "WhatsApp", "city": "CDMX", "state": "Ciudad de México", "country": "México"}
+CONTACT_OPTIONS = ("WhatsApp", "Llamada", "Email")
+MIN_PASSWORD = 6
+# Teléfono: número nacional de 10 dígitos; la lada de país (52, o 521 de celulares) se quita
+NATIONAL_DIGITS = 10
+COUNTRY_PREFIXES = ("521", "52")
+# Desde cuántos dígitos algo escrito en "usuario, teléfono o email" se busca como teléfono
+PHONE_MIN_DIGITS = 8
+_PHONE_CHARS = set("0123456789 +-().")
+
+
+def normalize_phone(x: str) -> str:
+    """Solo dígitos, sin lada de país: "+52 1 55 1234 5678" y "55-1234-5678" dan lo mismo."""
+    digits = re.sub(r"\D+", "", (x or "").strip())
+    for prefix in COUNTRY_PREFIXES:
+        if digits.startswith(prefix) and len(digits) == len(prefix) + NATIONAL_DIGITS:
+            return digits[len(prefix):]
+    return digits
+
+
+def looks_like_phone(text: str) -> bool:
+    t = (text or "").strip()
+    return bool(t) and set(t) <= _PHONE_CHARS and len(re.sub(r"\D+", "", t)) >= PHONE_MIN_DIGITS
+
+
+def require_fields(data: dict, required) -> list[str]:
+    return [k for k in required if not str(data.get(k, "")).strip()]
+
+
+def clean_payload(raw: dict, defaults: dict = None) -> dict:
+    """Entrada cruda (form o fila) -> payload normalizado. ``defaults`` llena lo que venga vacío."""
+    defaults = defaults or {}
+
+    def val(k):
+        v = raw.get(k)
+        v = "" if v is None else str(v).strip()
+        return v or defaults.get(k, "")
+
+    payload = {k: val(k) for k in ("username", "full_name", "email", "preferred_contact") + ADDRESS_FIELDS}
+    payload["username"] = payload["username"].lower()
+    payload["email"] = payload["email"].lower()
+    payload["phone"] = normalize_phone(val("phone"))
+    return payload
+
+
+def validate(payload: dict, password: str, confirm: str = None, consent: bool = True):
+    """Mensaje de error (el mismo que ve el usuario en el formulario) o None si todo está bien."""
+    missing = require_fields(payload, REQUIRED_FIELDS)
+    if missing:
+        return f"Faltan campos obligatorios: {', '.join(missing)}"
+    # el login acepta usuario, teléfono o email en el mismo campo: el usuario no puede parecer ninguno de los otros
+    if "@" in payload["username"]:
+        return "El usuario no puede llevar @."
+    if looks_like_phone(payload["username"]):
+        return f"El usuario no puede parecer teléfono ({PHONE_MIN_DIGITS} o más dígitos)."
+    if not payload["postal_code"].isdigit() or len(payload["postal_code"]) != 5:
+        return "El Código Postal debe ser de 5 dígitos."
+    if confirm is not None and password != confirm:
+        return "Las contraseñas no coinciden."
+    if len(password or "") < MIN_PASSWORD:
+        return f"Contraseña muy corta (mínimo {MIN_PASSWORD})."
+    if not consent:
+        return "Debes aceptar el guardado de domicilio para continuar."
+    return None
+
+
+def user_doc(payload: dict, password_hash: str, now, **extra) -> dict:
+    """Documento de ``drop24_users`` para un alta nueva."""
+    return {
+        "username": payload["username"],
+        "password_hash": password_hash,
+        "full_name": payload["full_name"],
+        "phone": payload["phone"],
+        "email": payload["email"],
+        "preferred_contact": payload.get("preferred_contact") or DEFAULTS["preferred_contact"],
+        "address": {k: payload.get(k, "") for k in ADDRESS_FIELDS},
+        "delivery_service_future": True,
+        "active": True,
+        "role": "USER",
+        "created_at": now,
+        "updated_at": now,
+        **extra,
+    }
@@ -0,0 +1,462 @@
+"""
+Stores de Drop24: acceso a usuarios y tokens QR sobre cualquier ``Backend``.
+
+App.py no toca Firestore directamente; usa estos stores para que cada ruta
+(login, emisión de QR, listado de tokens, listado admin) se pueda medir igual
+contra Firestore o contra el backend local.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from drop24.registration import PHONE_MIN_DIGITS, looks_like_phone, normalize_phone  # noqa: F401
+from drop24.storage import Backend, AlreadyExists, BATCH_LIMIT, as_utc, cursor_after
+
+# =================================================
+# COLLECTIONS
+# =================================================
+USERS_COL = "drop24_users"
+TOKENS_COL = "drop24_qr_tokens"
+ACTIVE_COL = "drop24_active_qr"  # doc id = username -> token activo (puntero)
+LOCKER_SLOTS_COL = "drop24_locker_slots"  # doc id = L1_2026-01-31_19:00-20:00
+# Índices de unicidad: doc id = teléfono normalizado / email en minúsculas -> {"username": ...}
+PHONE_INDEX_COL = "drop24_user_phones"
+EMAIL_INDEX_COL = "drop24_user_emails"
+
+# access_type de los tokens (2 letras: es lo que va firmado en el QR y lo que compara la puerta)
+ACCESS_BUZON = "BZ"
+ACCESS_TYPES = (ACCESS_BUZON, "L1", "L2")
+
+
+def make_token_id() -> str:
+    return uuid.uuid4().hex[:12].upper()
+
+
+def phone_key(phone: str) -> str:
+    return normalize_phone(phone)
+
+
+DOC_ID_MAX_BYTES = 1500
+
+
+def _doc_id(key: str) -> str:
+    """
+    Reglas de id de documento de Firestore: sin "/", ni "." / "..", ni ``__.*__``,
+    y máximo 1500 bytes. Todo lo escapado lleva "%", así que no choca con una llave normal.
+    """
+    key = key.replace("%", "%25").replace("/", "%2F")
+    if key in (".", ".."):
+        return key.replace(".", "%2E")
+    if key.startswith("__") and key.endswith("__"):
+        return "%5F" + key[1:]
+    if len(key.encode("utf-8")) > DOC_ID_MAX_BYTES:
+        return "%H" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return key
+
+
+def email_key(email: str) -> str:
+    key = (email or "").strip().lower()
+    return _doc_id(key) if key else ""
+
+
+def canonical_identifier(text: str) -> str:
+    """Lo que escribe el usuario en "usuario, teléfono o email", normalizado (teléfono como ``phone_key``)."""
+    t = (text or "").strip()
+    return phone_key(t) if looks_like_phone(t) else t.lower()
+
+
+def index_claims(username: str, data: dict) -> list:
+    """[(colección, id)] de los índices de unicidad que reclama el usuario (sin los vacíos)."""
+    claims = []
+    if phone_key(data.get("phone")):
+        claims.append((PHONE_INDEX_COL, phone_key(data.get("phone"))))
+    if email_key(data.get("email")):
+        claims.append((EMAIL_INDEX_COL, email_key(data.get("email"))))
+    return claims
+
+
+def add_registration(batch, username: str, data: dict):
+    """Agrega al batch el alta del usuario + sus índices (todo ``create``: falla completo si algo ya existe)."""
+    batch.create(USERS_COL, username, data)
+    for col, key in index_claims(username, data):
+        batch.create(col, key, {"username": username, "created_at": data.get("created_at")})
+
+
+class SlotUnavailable(Exception):
+    """El horario de locker ya no tiene lugar."""
+
+
+# Orden permitido en el directorio admin (cada combinación filtro+orden usa un índice compuesto en Firestore)
+USER_ORDER_FIELDS = ("created_at", "username", "full_name")
+PAGE_CACHE_TTL = 30.0
+PAGE_CACHE_MAX = 256
+
+
+class UserStore:
+    def __init__(self, backend: Backend, page_ttl: float = PAGE_CACHE_TTL):
+        self.backend = backend
+        self.page_ttl = page_ttl
+        self._pages = {}  # llave de consulta -> (expira, resultado)
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._pages.clear()
+
+    def get(self, username: str):
+        """Regresa el dict del usuario o None."""
+        return self.backend.get(USERS_COL, username)
+
+    def exists(self, username: str) -> bool:
+        return self.get(username) is not None
+
+    def register(self, username: str, data: dict):
+        """
+        Alta atómica: usuario + índices de teléfono y email en un solo commit
+        (un viaje, sin leer antes). Regresa None si quedó, o qué ya estaba tomado:
+        "username", "phone" o "email" (solo en ese caso se lee para saberlo).
+        """
+        for attempt in range(2):
+            b = self.backend.batch()
+            add_registration(b, username, data)
+            try:
+                b.commit()
+            except AlreadyExists:
+                what = self.taken(username, data)
+                if what:
+                    return what
+                if attempt:
+                    raise  # chocó dos veces con algo que al leer ya no estaba
+                continue  # lo que chocó ya no está (p. ej. se borró): un reintento
+            self.invalidate()
+            return None
+
+    def resolve(self, identifier: str):
+        """
+        username, teléfono o email -> username (None si no hay). Email y teléfono
+        son una lectura puntual a su índice; un username no cuesta lectura aquí.
+        """
+        raw = (identifier or "").strip()
+        if not raw:
+            return None
+        if "@" in raw:
+            hit = self.backend.get(EMAIL_INDEX_COL, email_key(raw))
+            return hit.get("username") if hit else None
+        if looks_like_phone(raw):
+            hit = self.backend.get(PHONE_INDEX_COL, phone_key(raw))
+            if hit:
+                return hit.get("username")
+            # usernames de dígitos de antes de que el registro los rechazara
+        return raw.lower()
+
+    def find(self, identifier: str):
+        """(username, datos) por username/teléfono/email: 1 o 2 lecturas puntuales; (None, None) si no hay."""
+        username = self.resolve(identifier)
+        data = self.get(username) if username else None
+        return (username, data) if data is not None else (None, None)
+
+    def update_contact(self, username: str, phone: str = None, email: str = None, now=None):
+        """
+        Cambia teléfono y/o email moviendo sus índices en la misma transacción.
+        Regresa None si quedó, "phone"/"email" si ya es de otra cuenta, "username" si el usuario no existe.
+        """
+        def _txn(t):
+            # Firestore: todas las lecturas de la transacción van antes de cualquier escritura
+            user = t.get(USERS_COL, username)
+            if user is None:
+                return "username"
+            moves = []  # (campo, colección, valor nuevo, id viejo, id nuevo)
+            if phone is not None:
+                value = normalize_phone(phone)
+                moves.append(("phone", PHONE_INDEX_COL, value, phone_key(user.get("phone")), phone_key(value)))
+            if email is not None:
+                value = email.strip().lower()
+                moves.append(("email", EMAIL_INDEX_COL, value, email_key(user.get("email")), email_key(value)))
+            moves = [m for m in moves if m[3] != m[4]]
+            owners = {(col, key): t.get(col, key) for _, col, _, old, new in moves for key in (old, new) if key}
+
+            for what, col, _, _, new in moves:
+                owner = owners.get((col, new))
+                if new and owner and owner.get("username") != username:
+                    return what
+            fields = {}
+            for what, col, value, old, new in moves:
+                if new:
+                    t.set(col, new, {"username": username, "created_at": now})
+                old_owner = owners.get((col, old))
+                if old and old_owner and old_owner.get("username") == username:
+                    t.delete(col, old)
+                fields[what] = value
+            if fields:
+                if now is not None:
+                    fields["updated_at"] = now
+                t.update(USERS_COL, username, fields)
+            return None
+
+        taken = self.backend.run_transaction(_txn)
+        if taken is None:
+            self.invalidate()
+        return taken
+
+    def taken(self, username: str, data: dict):
+        """
+        Cuál de username/teléfono/email ya está en uso (None si ninguno). Un índice
+        que ya existe cuenta aunque apunte a este mismo username (quedó de un alta
+        o baja a medias): ``create`` choca con él igual.
+        """
+        if self.exists(username):
+            return "username"
+        for col, key in index_claims(username, data):
+            if self.backend.get(col, key) is not None:
+                return "email" if col == EMAIL_INDEX_COL else "phone"
+        return None
+
+    def update(self, username: str, fields: dict):
+        self.backend.update(USERS_COL, username, fields)
+        self.invalidate()
+
+    def page(self, active: bool = None, borough: str = "", postal_code: str = "", order: str = "created_at",
+             desc: bool = True, size: int = 50, cursor: tuple = None):
+        """
+        Una página del directorio: (usuarios, cursor_siguiente | None).
+        Cada página cuesta solo sus lecturas; el resultado se cachea ``page_ttl`` s
+        y se invalida en cualquier alta/cambio hecho por este store.
+        """
+        if order not in USER_ORDER_FIELDS:
+            raise ValueError(f"Orden no soportado: {order}")
+        where = []
+        if active is not None:
+            where.append(("active", "==", bool(active)))
+        if borough:
+            where.append(("address.borough", "==", borough))
+        if postal_code:
+            where.append(("address.postal_code", "==", postal_code))
+        order_by = [(order, "desc" if desc else "asc")]
+
+        key = (tuple(where), tuple(order_by), int(size), cursor)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._pages.get(key)
+            if hit and hit[0] > now:
+                return hit[1]
+
+        docs = self.backend.query(USERS_COL, where=where, order_by=order_by, limit=size, start_after=cursor)
+        next_cursor = cursor_after(docs[-1], order_by) if len(docs) == size else None
+        result = ([d.data for d in docs], next_cursor)
+
+        with self._lock:
+            if len(self._pages) >= PAGE_CACHE_MAX:
+                self._pages.pop(next(iter(self._pages)))
+            self._pages[key] = (now + self.page_ttl, result)
+        return result
+
+
+def pointer_live(p, now) -> bool:
+    """El puntero de QR activo apunta a un token cuya ventana no ha terminado."""
+    if not p or not p.get("token_id"):
+        return False
+    end_ts = as_utc(p.get("end_ts"))
+    return end_ts is not None and end_ts > now
+
+
+class TokenStore:
+    def __init__(self, backend: Backend):
+        self.backend = backend
+
+    def get(self, token_id: str):
+        return self.backend.get(TOKENS_COL, token_id)
+
+    def create_many(self, tokens: list[dict], progress=None) -> int:
+        """Alta masiva en batches de 500; ``progress(hechos, total)`` tras cada commit."""
+        total = len(tokens)
+        done = 0
+        for i in range(0, total, BATCH_LIMIT):
+            b = self.backend.batch()
+            for x in tokens[i:i + BATCH_LIMIT]:
+                b.create(TOKENS_COL, x["token_id"], x)
+            done += b.commit()
+            if progress:
+                progress(done, total)
+        return done
+
+    def latest_by_creator(self, username: str, n: int = 20) -> list[dict]:
+        """Los ``n`` más recientes, ordenados en el servidor (created_by + created_at desc)."""
+        docs = self.backend.query(
+            TOKENS_COL,
+            where=[("created_by", "==", username)],
+            order_by=[("created_at", "desc")],
+            limit=n,
+        )
+        return [d.data for d in docs]
+
+    def list_open(self, now: datetime) -> list[dict]:
+        """Tokens activos cuya ventana aún no termina (end_ts > now)."""
+        docs = self.backend.query(
+            TOKENS_COL,
+            where=[("active", "==", True), ("end_ts", ">", now)],
+            order_by=[("end_ts", "asc")],
+        )
+        return [d.data for d in docs]
+
+    def list_open_for_user(self, username: str, now: datetime) -> list[dict]:
+        docs = self.backend.query(
+            TOKENS_COL,
+            where=[("created_by", "==", username), ("active", "==", True), ("end_ts", ">", now)],
+        )
+        return [d.data for d in docs]
+
+    # -------------------------------------------------
+    # Puntero de QR activo por usuario (1 lectura)
+    # -------------------------------------------------
+    def active_for_user(self, username: str, now: datetime):
+        """Puntero al QR activo y vigente del usuario, o None. Cuesta 1 lectura."""
+        p = self.backend.get(ACTIVE_COL, username)
+        return p if pointer_live(p, now) else None
+
+    def issue(self, token_id: str, data: dict, now: datetime, ledger: "LockerLedger" = None):
+        """
+        Crea el token y mueve el puntero del usuario en una sola transacción.
+        Si el usuario ya tiene un QR vigente no crea nada y regresa ese puntero.
+        Si el token es de locker y se pasa ``ledger``, aparta el horario en la misma
+        transacción (SlotUnavailable si ya está lleno).
+        """
+        username = data["created_by"]
+        locker_key = None
+        if ledger is not None and data.get("locker_slot"):
+            locker_key = (data["access_type"], data["locker_day"], data["locker_slot"])
+
+        def _txn(t):
+            current = t.get(ACTIVE_COL, username)
+            if pointer_live(current, now):
+                return current
+            if locker_key:
+                ledger.claim_in(t, *locker_key, token_id, now)
+            t.create(TOKENS_COL, token_id, data)
+            t.set(ACTIVE_COL, username, {
+                "token_id": token_id,
+                "end_ts": data.get("end_ts"),
+                "end_time": data.get("end_time", ""),
+                "one_time": bool(data.get("one_time", False)),
+                "updated_at": now,
+            })
+            return None
+
+        return self.backend.run_transaction(_txn)
+
+    def mark_used(self, token_id: str, now: datetime) -> bool:
+        """Marca el token como usado (si es de 1 uso libera el puntero). False si ya no aplicaba."""
+
+        def _txn(t):
+            x = t.get(TOKENS_COL, token_id)
+            one_time = x.get("one_time", False) if x else False
+            if not x or not x.get("active", False) or (one_time and x.get("used", False)):
+                return False
+            owner = x.get("created_by", "")
+            p = t.get(ACTIVE_COL, owner) if owner else None
+            t.update(TOKENS_COL, token_id, {"used": True, "used_at": now})
+            if one_time and p and p.get("token_id") == token_id:
+                t.delete(ACTIVE_COL, owner)
+            return True
+
+        return self.backend.run_transaction(_txn)
+
+    def deactivate(self, token_id: str, now: datetime) -> bool:
+        """Desactiva un token (expirado/revocado) y libera el puntero si apuntaba a él."""
+
+        def _txn(t):
+            x = t.get(TOKENS_COL, token_id)
+            if not x:
+                return False
+            owner = x.get("created_by", "")
+            p = t.get(ACTIVE_COL, owner) if owner else None
+            slot_id = LockerLedger.slot_of(x)
+            slot = t.get(LOCKER_SLOTS_COL, slot_id) if slot_id else None
+            t.update(TOKENS_COL, token_id, {"active": False, "deactivated_at": now})
+            if p and p.get("token_id") == token_id:
+                t.delete(ACTIVE_COL, owner)
+            if slot_id:
+                LockerLedger.release_in(t, slot_id, slot, token_id, now)
+            return True
+
+        return self.backend.run_transaction(_txn)
+
+
+class LockerLedger:
+    """
+    Apartados de locker por (locker, día, horario) con capacidad por slot.
+
+    Un doc por slot en drop24_locker_slots:
+        {locker, day, slot, capacity, taken, holders: [token_id, ...]}
+    La disponibilidad de todo el día se lee con un solo get_many.
+    """
+
+    def __init__(self, backend: Backend, capacity: dict = None, default_capacity: int = 1):
+        self.backend = backend
+        self.capacity = dict(capacity or {})
+        self.default_capacity = default_capacity
+
+    @staticmethod
+    def slot_id(locker: str, day, slot: str) -> str:
+        return f"{locker}_{day}_{slot}"
+
+    @staticmethod
+    def slot_of(token: dict):
+        """Id del slot que aparta el token, o None si no es de locker."""
+        if token.get("locker_slot") and token.get("locker_day"):
+            return LockerLedger.slot_id(token.get("access_type", ""), token["locker_day"], token["locker_slot"])
+        return None
+
+    def capacity_for(self, locker: str) -> int:
+        return int(self.capacity.get(locker, self.default_capacity))
+
+    def availability(self, locker: str, day, slots: list[str]) -> dict:
+        """{slot: lugares libres} para todo el día (1 lectura batch)."""
+        ids = {self.slot_id(locker, day, s): s for s in slots}
+        docs = self.backend.get_many(LOCKER_SLOTS_COL, list(ids))
+        cap = self.capacity_for(locker)
+        out = {}
+        for doc_id, slot in ids.items():
+            taken = int((docs.get(doc_id) or {}).get("taken", 0))
+            out[slot] = max(cap - taken, 0)
+        return out
+
+    def claim_in(self, t, locker: str, day, slot: str, token_id: str, now: datetime):
+        """Aparta un lugar dentro de una transacción abierta (lectura + escritura)."""
+        doc_id = self.slot_id(locker, day, slot)
+        x = t.get(LOCKER_SLOTS_COL, doc_id) or {}
+        holders = list(x.get("holders") or [])
+        cap = self.capacity_for(locker)
+        if token_id in holders:
+            return
+        if len(holders) >= cap:
+            raise SlotUnavailable(f"{locker} {day} {slot}")
+        holders.append(token_id)
+        t.set(LOCKER_SLOTS_COL, doc_id, {
+            "locker": locker,
+            "day": str(day),
+            "slot": slot,
+            "capacity": cap,
+            "taken": len(holders),
+            "holders": holders,
+            "updated_at": now,
+        })
+
+    def claim(self, locker: str, day, slot: str, token_id: str, now: datetime):
+        self.backend.run_transaction(lambda t: self.claim_in(t, locker, day, slot, token_id, now))
+
+    @staticmethod
+    def release_in(t, doc_id: str, slot: dict, token_id: str, now: datetime) -> bool:
+        """Escritura que suelta el lugar; ``slot`` ya se leyó en la transacción (las lecturas van antes)."""
+        if not slot or token_id not in (slot.get("holders") or []):
+            return False
+        holders = [h for h in slot["holders"] if h != token_id]
+        t.update(LOCKER_SLOTS_COL, doc_id, {"holders": holders, "taken": len(holders), "updated_at": now})
+        return True
+
+    def release(self, doc_id: str, token_id: str, now: datetime) -> bool:
+        """Suelta el lugar de ``token_id`` en el slot ``doc_id`` (ver ``slot_of``); False si no lo tenía."""
+        return self.backend.run_transaction(
+            lambda t: self.release_in(t, doc_id, t.get(LOCKER_SLOTS_COL, doc_id), token_id, now)
+        )
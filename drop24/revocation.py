@@ -0,0 +1,224 @@
+"""
+Feed de revocaciones para escáneres que validan offline o desde cache.
+
+- Deltas versionados en ``drop24_revocations`` (doc id = versión con ceros):
+      {version, token_ids: [...], expires_at, reason, created_at}
+  Un escáner guarda la última versión aplicada y pide solo lo nuevo.
+- Snapshot Bloom en ``drop24_revocation_meta/bloom`` con todos los tokens
+  revocados que aún no expiran; un escáner nuevo lo baja una vez y luego
+  aplica deltas desde ``snapshot.version``. Rearmarlo recorre todos los
+  deltas vivos, así que no se hace en cada revocación: como mucho cada
+  ``SNAPSHOT_EVERY_SECONDS`` (``maybe_publish_snapshot``, también desde el
+  barrido). Un snapshot atrasado no pierde nada: los deltas lo completan.
+
+Un token que aparece en los deltas está revocado seguro; si solo pega en el
+Bloom (posible falso positivo) el escáner confirma contra el backend.
+"""
+import base64
+import hashlib
+import math
+import threading
+from datetime import datetime, timezone
+
+from drop24.storage import Backend, as_utc, cursor_after
+from drop24.repository import TokenStore
+
+REVOCATIONS_COL = "drop24_revocations"
+REVOCATION_META_COL = "drop24_revocation_meta"
+DELTA_PAGE = 500
+SNAPSHOT_EVERY_SECONDS = 300
+_LIVE_ORDER = [("expires_at", "asc")]
+
+
+class BloomFilter:
+    def __init__(self, m: int, k: int, bits: bytes = None):
+        self.m = max(int(m), 8)
+        self.k = max(int(k), 1)
+        self.bits = bytearray(bits) if bits else bytearray((self.m + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, n: int, fp_rate: float = 0.01) -> "BloomFilter":
+        n = max(int(n), 1)
+        m = math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2))
+        k = max(round(m / n * math.log(2)), 1)
+        return cls(m, k)
+
+    def _positions(self, item: str):
+        h = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(h[:8], "big")
+        h2 = int.from_bytes(h[8:16], "big") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, item: str):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def to_dict(self) -> dict:
+        return {"m": self.m, "k": self.k, "bits": base64.b64encode(bytes(self.bits)).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "BloomFilter":
+        return cls(d["m"], d["k"], base64.b64decode(d["bits"]))
+
+
+class RevocationFeed:
+    """Lado servidor: escribe deltas y publica el snapshot."""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+
+    @staticmethod
+    def _doc_id(version: int) -> str:
+        return f"{version:012d}"
+
+    def revoke(self, token_ids, now, expires_at=None, reason: str = "") -> int:
+        """Agrega un delta con ``token_ids`` y regresa su versión (0 si no había nada)."""
+        token_ids = sorted(set(token_ids))
+        if not token_ids:
+            return 0
+
+        def _txn(t):
+            meta = t.get(REVOCATION_META_COL, "feed") or {}
+            version = int(meta.get("version", 0)) + 1
+            t.create(REVOCATIONS_COL, self._doc_id(version), {
+                "version": version,
+                "token_ids": token_ids,
+                "expires_at": expires_at or now,
+                "reason": reason,
+                "created_at": now,
+            })
+            t.set(REVOCATION_META_COL, "feed", {"version": version, "updated_at": now}, merge=True)
+            return version
+
+        return self.backend.run_transaction(_txn)
+
+    def current_version(self) -> int:
+        return int((self.backend.get(REVOCATION_META_COL, "feed") or {}).get("version", 0))
+
+    def deltas_since(self, version: int, limit: int = DELTA_PAGE) -> list[dict]:
+        docs = self.backend.query(
+            REVOCATIONS_COL,
+            where=[("version", ">", int(version))],
+            order_by=[("version", "asc")],
+            limit=limit,
+        )
+        return [d.data for d in docs]
+
+    def build_snapshot(self, now, fp_rate: float = 0.01) -> dict:
+        """Bloom con los tokens revocados que siguen vigentes + la versión que cubre."""
+        version = self.current_version()
+        ids, cursor = [], None
+        while True:
+            live = self.backend.query(REVOCATIONS_COL, where=[("expires_at", ">", now)], order_by=_LIVE_ORDER,
+                                      limit=DELTA_PAGE, start_after=cursor)
+            ids += [tid for d in live if d.data.get("version", 0) <= version for tid in d.data.get("token_ids", [])]
+            if len(live) < DELTA_PAGE:
+                break
+            cursor = cursor_after(live[-1], _LIVE_ORDER)
+        bloom = BloomFilter.for_capacity(len(ids), fp_rate)
+        for tid in ids:
+            bloom.add(tid)
+        return {"version": version, "count": len(ids), "built_at": now, **bloom.to_dict()}
+
+    def publish_snapshot(self, now, fp_rate: float = 0.01) -> dict:
+        snap = self.build_snapshot(now, fp_rate)
+        self.backend.set(REVOCATION_META_COL, "bloom", snap)
+        self.backend.set(REVOCATION_META_COL, "feed", {"snapshot_version": snap["version"], "snapshot_at": now},
+                         merge=True)
+        return snap
+
+    def maybe_publish_snapshot(self, now, every_seconds: float = SNAPSHOT_EVERY_SECONDS, fp_rate: float = 0.01):
+        """Publica si hay versiones nuevas y el último snapshot tiene más de ``every_seconds``; si no, None."""
+        meta = self.backend.get(REVOCATION_META_COL, "feed") or {}
+        if int(meta.get("snapshot_version", 0)) >= int(meta.get("version", 0)):
+            return None
+        last = as_utc(meta.get("snapshot_at"))
+        if last is not None and (as_utc(now) - last).total_seconds() < every_seconds:
+            return None
+        return self.publish_snapshot(now, fp_rate)
+
+    def get_snapshot(self):
+        return self.backend.get(REVOCATION_META_COL, "bloom")
+
+
+class RevocationSet:
+    """Lado escáner: snapshot Bloom + deltas aplicados incrementalmente."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.bloom = None
+        self.exact = {}  # token_id -> expires_at del delta (se poda al pasar, como el snapshot)
+
+    def load_snapshot(self, snap: dict):
+        if not snap:
+            return
+        with self.lock:
+            self.bloom = BloomFilter.from_dict(snap)
+            self.version = max(self.version, int(snap.get("version", 0)))
+
+    def apply(self, deltas: list[dict]) -> list[str]:
+        """Aplica deltas en orden; regresa los token_ids nuevos."""
+        added = []
+        with self.lock:
+            for d in deltas:
+                v = int(d.get("version", 0))
+                if v <= self.version:
+                    continue
+                expires_at = d.get("expires_at")
+                for tid in d.get("token_ids", []):
+                    if tid not in self.exact:
+                        self.exact[tid] = expires_at
+                        added.append(tid)
+                        continue
+                    # revocado otra vez: se queda la fecha más lejana (None = no se poda)
+                    prev = self.exact[tid]
+                    if prev is not None and (expires_at is None or as_utc(expires_at) > as_utc(prev)):
+                        self.exact[tid] = expires_at
+                self.version = max(self.version, v)
+        return added
+
+    def prune(self, now: datetime) -> int:
+        """Quita los revocados cuyo ``expires_at`` ya pasó (ya no abrirían de todos modos)."""
+        now = as_utc(now)
+        with self.lock:
+            gone = [tid for tid, exp in self.exact.items() if exp is not None and as_utc(exp) <= now]
+            for tid in gone:
+                del self.exact[tid]
+        return len(gone)
+
+    def sync(self, feed: RevocationFeed, now: datetime = None) -> list[str]:
+        """Trae lo nuevo desde la última versión (1 consulta si no hay cambios) y poda lo vencido."""
+        added = []
+        while True:
+            deltas = feed.deltas_since(self.version, limit=DELTA_PAGE)
+            added += self.apply(deltas)
+            if len(deltas) < DELTA_PAGE:
+                break
+        self.prune(now or datetime.now(timezone.utc))
+        return added
+
+    def status(self, token_id: str) -> str:
+        """'revoked' (seguro), 'maybe' (solo Bloom) o 'ok'."""
+        if token_id in self.exact:
+            return "revoked"
+        if self.bloom is not None and token_id in self.bloom:
+            return "maybe"
+        return "ok"
+
+
+def revoke_user_tokens(tokens: TokenStore, feed: RevocationFeed, username: str, now, reason: str = "") -> list[str]:
+    """Desactiva los QRs vigentes del usuario y publica el delta (el snapshot se refresca con tope de frecuencia)."""
+    open_tokens = tokens.list_open_for_user(username, now)
+    if not open_tokens:
+        return []
+    ids = [x["token_id"] for x in open_tokens]
+    for tid in ids:
+        tokens.deactivate(tid, now)
+    expires_at = max(x["end_ts"] for x in open_tokens)
+    feed.revoke(ids, now, expires_at=expires_at, reason=reason or f"user_deactivated:{username}")
+    feed.maybe_publish_snapshot(now)
+    return ids
@@ -0,0 +1,115 @@
+"""
+Reporte de arranque en frío.
+
+Levanta un intérprete nuevo con ``-X importtime``, corre App.py una vez con
+AppTest (backend SQLite temporal, sin Firestore) y reporta:
+
+- tiempo de imports por paquete (los más caros primero),
+- tiempo del primer run del script y de un rerun ya caliente,
+- qué módulos pesados quedaron cargados (pandas, firebase_admin, qrcode, PIL, bcrypt).
+
+    python -m drop24.startup            # reporte en texto
+    python -m drop24.startup --top 25 --json
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+HEAVY = ("pandas", "pyarrow", "firebase_admin", "google.cloud.firestore", "qrcode", "PIL", "bcrypt")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+# Se corre en el proceso hijo (un intérprete limpio por medición)
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.secrets["storage_backend"] = "sqlite"
+at.secrets["sqlite_path"] = sys.argv[2]
+at.secrets["token_sweeper_every"] = 0
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+at.run()
+t3 = time.perf_counter()
+heavy = json.loads(sys.argv[3])
+print("@@" + json.dumps({
+    "harness_s": t1 - t0,
+    "first_run_s": t2 - t1,
+    "rerun_s": t3 - t2,
+    "exception": [str(e.value) for e in at.exception],
+    "loaded": {m: m in sys.modules for m in heavy},
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Salida de -X importtime -> {paquete raíz: microsegundos acumulados}."""
+    totals = {}
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        if indent == 1:  # import de primer nivel: su acumulado ya incluye los hijos
+            root = name.split(".")[0]
+            totals[root] = totals.get(root, 0) + cumulative
+    return totals
+
+
+def profile(app_path: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _CHILD, app_path, os.path.join(tmp, "startup.db"), json.dumps(HEAVY)],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(app_path)),
+        )
+    marker = [l for l in proc.stdout.splitlines() if l.startswith("@@")]
+    if not marker:
+        raise RuntimeError(f"el perfilado falló:\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+    result = json.loads(marker[-1][2:])
+    imports = parse_importtime(proc.stderr)
+    result["imports_ms"] = {k: v / 1000 for k, v in sorted(imports.items(), key=lambda kv: -kv[1])}
+    result["imports_total_ms"] = sum(imports.values()) / 1000
+    return result
+
+
+def format_report(r: dict, top: int = 15) -> str:
+    out = [
+        "Arranque en frío (App.py con AppTest, backend SQLite)",
+        f"  imports (total):  {r['imports_total_ms']:8.1f} ms",
+        f"  primer run:       {r['first_run_s'] * 1000:8.1f} ms",
+        f"  rerun en caliente:{r['rerun_s'] * 1000:8.1f} ms",
+        "",
+        f"  imports más caros (top {top}):",
+    ]
+    for name, ms in list(r["imports_ms"].items())[:top]:
+        out.append(f"    {name:<28}{ms:8.1f} ms")
+    out.append("")
+    out.append("  módulos pesados cargados tras el primer run:")
+    for m, loaded in r["loaded"].items():
+        out.append(f"    {m:<28}{'sí' if loaded else 'no'}")
+    if r["exception"]:
+        out.append("")
+        out.append(f"  ⚠ excepciones: {r['exception']}")
+    return "\n".join(out)
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Perfil de arranque en frío del portal Drop24")
+    ap.add_argument("--app", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "App.py"))
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    r = profile(args.app)
+    print(json.dumps(r, indent=2) if args.json else format_report(r, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,591 @@
+"""
+Motor de almacenamiento de Drop24.
+
+Todas las lecturas/escrituras pasan por un ``Backend``:
+
+- ``FirestoreBackend``: producción (cliente de firebase_admin).
+- ``LocalBackend``: SQLite (archivo o ":memory:") con la misma semántica de
+  consultas (filtros, orden, límite, cursores, batches y transacciones).
+  Sirve para perfilar, hacer benchmarks y pruebas de carga sin Firestore.
+
+Las consultas se describen igual en ambos:
+
+    backend.query(
+        "drop24_qr_tokens",
+        where=[("created_by", "==", "cliente001")],
+        order_by=[("created_at", "desc")],
+        limit=20,
+        start_after=cursor,
+    )
+"""
+import copy
+import json
+import sqlite3
+import threading
+import hashlib
+from collections import namedtuple
+from datetime import datetime, timezone
+
+# =================================================
+# TIPOS COMUNES
+# =================================================
+Doc = namedtuple("Doc", ["id", "data"])
+
+BATCH_LIMIT = 500  # máximo de operaciones por commit en Firestore
+
+OPS = ("==", "!=", "<", "<=", ">", ">=", "in", "not-in", "array_contains")
+
+
+class StorageError(Exception):
+    pass
+
+
+class AlreadyExists(StorageError):
+    pass
+
+
+class NotFound(StorageError):
+    pass
+
+
+def get_path(data: dict, field: str):
+    """Lee 'address.borough' de un dict anidado (None si no existe)."""
+    cur = data
+    for part in field.split("."):
+        if not isinstance(cur, dict) or part not in cur:
+            return None
+        cur = cur[part]
+    return cur
+
+
+def as_utc(dt):
+    """datetime con zona (un naive se toma como UTC); None si no es datetime."""
+    if not isinstance(dt, datetime):
+        return None
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def cursor_after(doc: Doc, order_by) -> tuple:
+    """Cursor para ``start_after``: valores de los campos de orden + id del doc."""
+    return tuple(get_path(doc.data, f) for f, _ in order_by if f != "__name__") + (doc.id,)
+
+
+def _is_desc(direction) -> bool:
+    return str(direction).lower() in ("desc", "descending")
+
+
+def _norm_order(order_by):
+    return [(f, "desc" if _is_desc(d) else "asc") for f, d in (order_by or [])]
+
+
+def _split_order(order_by):
+    """(campos de orden sin __name__, dirección del desempate por id)."""
+    order = _norm_order(order_by)
+    fields = [(f, d) for f, d in order if f != "__name__"]
+    named = [d for f, d in order if f == "__name__"]
+    id_dir = named[0] if named else (fields[-1][1] if fields else "asc")
+    return fields, id_dir
+
+
+class Backend:
+    """Interfaz común. Los stores de ``drop24.repository`` solo usan esto."""
+
+    name = "base"
+
+    def get(self, col: str, doc_id: str):
+        raise NotImplementedError
+
+    def get_many(self, col: str, doc_ids) -> dict:
+        raise NotImplementedError
+
+    def set(self, col: str, doc_id: str, data: dict, merge: bool = False):
+        raise NotImplementedError
+
+    def create(self, col: str, doc_id: str, data: dict):
+        raise NotImplementedError
+
+    def update(self, col: str, doc_id: str, fields: dict):
+        raise NotImplementedError
+
+    def delete(self, col: str, doc_id: str):
+        raise NotImplementedError
+
+    def query(self, col: str, where=(), order_by=(), limit=None, start_after=None) -> list:
+        raise NotImplementedError
+
+    def batch(self) -> "Batch":
+        return Batch(self)
+
+    def run_transaction(self, fn):
+        """Ejecuta ``fn(txn)`` de forma atómica; ``txn`` tiene get/get_many/set/create/update/delete."""
+        raise NotImplementedError
+
+    def _commit(self, writes: list):
+        raise NotImplementedError
+
+
+class Batch:
+    """
+    Escrituras agrupadas. ``commit()`` manda bloques de hasta 500 operaciones
+    (cada bloque es atómico; el conjunto completo no).
+    """
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self.writes = []
+
+    def set(self, col, doc_id, data, merge=False):
+        self.writes.append(("set", col, doc_id, data, merge))
+        return self
+
+    def create(self, col, doc_id, data):
+        self.writes.append(("create", col, doc_id, data, False))
+        return self
+
+    def update(self, col, doc_id, fields):
+        self.writes.append(("update", col, doc_id, fields, False))
+        return self
+
+    def delete(self, col, doc_id):
+        self.writes.append(("delete", col, doc_id, None, False))
+        return self
+
+    def __len__(self):
+        return len(self.writes)
+
+    def commit(self) -> int:
+        n = 0
+        for i in range(0, len(self.writes), BATCH_LIMIT):
+            chunk = self.writes[i:i + BATCH_LIMIT]
+            self.backend._commit(chunk)
+            n += len(chunk)
+        self.writes = []
+        return n
+
+
+# =================================================
+# FIRESTORE
+# =================================================
+class FirestoreBackend(Backend):
+    name = "firestore"
+
+    def __init__(self, client):
+        self.client = client
+
+    def _ref(self, col, doc_id):
+        return self.client.collection(col).document(doc_id)
+
+    @staticmethod
+    def _map_errors(fn, *args, **kwargs):
+        from google.api_core import exceptions as gexc
+
+        try:
+            return fn(*args, **kwargs)
+        except gexc.AlreadyExists as e:
+            raise AlreadyExists(str(e)) from e
+        except gexc.NotFound as e:
+            raise NotFound(str(e)) from e
+
+    def get(self, col, doc_id):
+        snap = self._ref(col, doc_id).get()
+        return (snap.to_dict() or {}) if snap.exists else None
+
+    def get_many(self, col, doc_ids):
+        refs = [self._ref(col, i) for i in dict.fromkeys(doc_ids)]
+        if not refs:
+            return {}
+        return {s.id: s.to_dict() or {} for s in self.client.get_all(refs) if s.exists}
+
+    def set(self, col, doc_id, data, merge=False):
+        self._ref(col, doc_id).set(data, merge=merge)
+
+    def create(self, col, doc_id, data):
+        self._map_errors(self._ref(col, doc_id).create, data)
+
+    def update(self, col, doc_id, fields):
+        self._map_errors(self._ref(col, doc_id).update, fields)
+
+    def delete(self, col, doc_id):
+        self._ref(col, doc_id).delete()
+
+    def _build_query(self, col, where=(), order_by=(), limit=None, start_after=None):
+        from google.cloud.firestore_v1 import FieldFilter, Query
+
+        q = self.client.collection(col)
+        for field, op, value in where or ():
+            q = q.where(filter=FieldFilter(field, op, value))
+
+        order, id_dir = _split_order(order_by)
+        for field, direction in order:
+            q = q.order_by(field, direction=Query.DESCENDING if direction == "desc" else Query.ASCENDING)
+        if order_by:
+            # desempate explícito por id para que los cursores sean exactos
+            q = q.order_by("__name__", direction=Query.DESCENDING if id_dir == "desc" else Query.ASCENDING)
+
+        if start_after is not None:
+            *values, last_id = start_after
+            q = q.start_after(list(values) + [self._ref(col, last_id)])
+        if limit:
+            q = q.limit(int(limit))
+        return q
+
+    def query(self, col, where=(), order_by=(), limit=None, start_after=None):
+        q = self._build_query(col, where, order_by, limit, start_after)
+        return [Doc(s.id, s.to_dict() or {}) for s in q.stream()]
+
+    def run_transaction(self, fn):
+        from google.cloud import firestore as gfs
+
+        @gfs.transactional
+        def _run(transaction):
+            return fn(_FirestoreTxn(self, transaction))
+
+        return self._map_errors(_run, self.client.transaction())
+
+    def _commit(self, writes):
+        b = self.client.batch()
+        for kind, col, doc_id, data, merge in writes:
+            ref = self._ref(col, doc_id)
+            if kind == "set":
+                b.set(ref, data, merge=merge)
+            elif kind == "create":
+                b.create(ref, data)
+            elif kind == "update":
+                b.update(ref, data)
+            else:
+                b.delete(ref)
+        self._map_errors(b.commit)
+
+
+class _FirestoreTxn:
+    def __init__(self, backend: FirestoreBackend, transaction):
+        self.backend = backend
+        self.t = transaction
+
+    def get(self, col, doc_id):
+        snap = self.backend._ref(col, doc_id).get(transaction=self.t)
+        return (snap.to_dict() or {}) if snap.exists else None
+
+    def get_many(self, col, doc_ids):
+        refs = [self.backend._ref(col, i) for i in dict.fromkeys(doc_ids)]
+        if not refs:
+            return {}
+        snaps = self.backend.client.get_all(refs, transaction=self.t)
+        return {s.id: s.to_dict() or {} for s in snaps if s.exists}
+
+    def set(self, col, doc_id, data, merge=False):
+        self.t.set(self.backend._ref(col, doc_id), data, merge=merge)
+
+    def create(self, col, doc_id, data):
+        self.t.create(self.backend._ref(col, doc_id), data)
+
+    def update(self, col, doc_id, fields):
+        self.t.update(self.backend._ref(col, doc_id), fields)
+
+    def delete(self, col, doc_id):
+        self.t.delete(self.backend._ref(col, doc_id))
+
+
+# =================================================
+# LOCAL (SQLite / memoria)
+# =================================================
+# Los datetimes se guardan como texto UTC de ancho fijo con un prefijo de control,
+# así ordenan bien en SQL y quedan antes que cualquier string (igual que Firestore).
+_TS_TAG = "\x01ts:"
+_TS_FMT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)  # naive = UTC (como Firestore)
+        return _TS_TAG + value.astimezone(timezone.utc).strftime(_TS_FMT)
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, str) and value.startswith(_TS_TAG):
+        return datetime.strptime(value[len(_TS_TAG):], _TS_FMT).replace(tzinfo=timezone.utc)
+    if isinstance(value, dict):
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _param(value):
+    v = _encode(value)
+    if isinstance(v, bool):
+        return int(v)  # json_extract regresa 1/0 para true/false
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, ensure_ascii=False)
+    return v
+
+
+def _json_path(field: str) -> str:
+    return "$." + ".".join(f'"{p}"' for p in field.split("."))
+
+
+def _expr(field: str) -> str:
+    if field == "__name__":
+        return "id"
+    return f"json_extract(data, '{_json_path(field)}')"
+
+
+def _deep_merge(base: dict, extra: dict) -> dict:
+    out = dict(base)
+    for k, v in extra.items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = _deep_merge(out[k], v)
+        else:
+            out[k] = v
+    return out
+
+
+def _apply_update(data: dict, fields: dict) -> dict:
+    """``update`` estilo Firestore: 'a.b' modifica el campo anidado."""
+    out = copy.deepcopy(data)
+    for key, value in fields.items():
+        parts = key.split(".")
+        cur = out
+        for p in parts[:-1]:
+            if not isinstance(cur.get(p), dict):
+                cur[p] = {}
+            cur = cur[p]
+        cur[parts[-1]] = value
+    return out
+
+
+class LocalBackend(Backend):
+    """
+    Documentos JSON en una tabla SQLite (col, id, data).
+
+    Crea índices por expresión la primera vez que ve una forma de consulta
+    (igualdades + orden), como los índices automáticos/compuestos de Firestore.
+    """
+
+    name = "local"
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.RLock()
+        self._indexed = set()
+        with self.lock:
+            if path != ":memory:":
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " col TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL,"
+                " PRIMARY KEY (col, id)) WITHOUT ROWID"
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # ---------- lecturas ----------
+    def _raw_get(self, col, doc_id):
+        row = self.conn.execute("SELECT data FROM docs WHERE col=? AND id=?", (col, doc_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, col, doc_id):
+        with self.lock:
+            raw = self._raw_get(col, doc_id)
+        return _decode(raw) if raw is not None else None
+
+    def get_many(self, col, doc_ids):
+        ids = list(dict.fromkeys(doc_ids))
+        out = {}
+        with self.lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT id, data FROM docs WHERE col=? AND id IN ({marks})", (col, *chunk)
+                ).fetchall()
+                for doc_id, data in rows:
+                    out[doc_id] = _decode(json.loads(data))
+        return out
+
+    def _ensure_index(self, col, where, order):
+        eq_fields = sorted({f for f, op, _ in where if op in ("==", "in")})
+        range_fields = [f for f, op, _ in where if op not in ("==", "in", "array_contains")]
+        fields = eq_fields + [f for f, _ in order] + [f for f in range_fields if f not in dict(order)]
+        fields = [f for f in dict.fromkeys(fields) if f != "__name__"]
+        if not fields:
+            return
+        key = (col, tuple(fields))
+        if key in self._indexed:
+            return
+        name = "ix_" + hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        cols = ", ".join(_expr(f) for f in fields)
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON docs(col, {cols})")
+        self._indexed.add(key)
+
+    def query(self, col, where=(), order_by=(), limit=None, start_after=None):
+        where = list(where or [])
+        order, id_dir = _split_order(order_by)
+        for _, op, _ in where:
+            if op not in OPS:
+                raise ValueError(f"Operador no soportado: {op}")
+
+        sql = ["SELECT id, data FROM docs WHERE col = ?"]
+        params = [col]
+
+        for field, op, value in where:
+            e = _expr(field)
+            if op == "==":
+                if value is None:
+                    sql.append(f"AND json_type(data, '{_json_path(field)}') = 'null'")
+                else:
+                    sql.append(f"AND {e} = ?")
+                    params.append(_param(value))
+            elif op in ("in", "not-in"):
+                vals = [_param(v) for v in value]
+                marks = ",".join("?" * len(vals)) or "NULL"
+                sql.append(f"AND {e} {'IN' if op == 'in' else 'NOT IN'} ({marks})")
+                params.extend(vals)
+            elif op == "array_contains":
+                sql.append(f"AND EXISTS (SELECT 1 FROM json_each(data, '{_json_path(field)}') WHERE value = ?)")
+                params.append(_param(value))
+            else:
+                sql.append(f"AND {e} {op} ?")
+                params.append(_param(value))
+
+        # Firestore excluye docs que no tienen el campo de orden
+        for field, _ in order:
+            sql.append(f"AND json_type(data, '{_json_path(field)}') IS NOT NULL")
+
+        keys = [(_expr(f), d) for f, d in order]
+        keys.append(("id", id_dir))
+
+        if start_after is not None:
+            values = [_param(v) for v in start_after]
+            if len(values) != len(keys):
+                raise ValueError("start_after debe traer un valor por campo de orden + id")
+            # comparación lexicográfica (soporta direcciones mezcladas)
+            ors = []
+            for i, (e, d) in enumerate(keys):
+                terms = [f"{keys[j][0]} = ?" for j in range(i)]
+                terms.append(f"{e} {'<' if d == 'desc' else '>'} ?")
+                ors.append("(" + " AND ".join(terms) + ")")
+                params.extend(values[:i] + [values[i]])
+            sql.append("AND (" + " OR ".join(ors) + ")")
+
+        sql.append("ORDER BY " + ", ".join(f"{e} {d.upper()}" for e, d in keys))
+        if limit:
+            sql.append("LIMIT ?")
+            params.append(int(limit))
+
+        with self.lock:
+            self._ensure_index(col, where, order)
+            rows = self.conn.execute(" ".join(sql), params).fetchall()
+        return [Doc(doc_id, _decode(json.loads(data))) for doc_id, data in rows]
+
+    # ---------- escrituras ----------
+    def _write(self, col, doc_id, data):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO docs (col, id, data) VALUES (?, ?, ?)",
+            (col, doc_id, json.dumps(_encode(data), ensure_ascii=False)),
+        )
+
+    def _apply(self, kind, col, doc_id, data, merge):
+        if kind == "delete":
+            self.conn.execute("DELETE FROM docs WHERE col=? AND id=?", (col, doc_id))
+            return
+        current = self._raw_get(col, doc_id)
+        if kind == "create":
+            if current is not None:
+                raise AlreadyExists(f"{col}/{doc_id}")
+            self._write(col, doc_id, data)
+        elif kind == "update":
+            if current is None:
+                raise NotFound(f"{col}/{doc_id}")
+            self._write(col, doc_id, _apply_update(_decode(current), fields=data))
+        elif merge and current is not None:
+            self._write(col, doc_id, _deep_merge(_decode(current), data))
+        else:
+            self._write(col, doc_id, data)
+
+    def _commit(self, writes):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for w in writes:
+                    self._apply(*w)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def set(self, col, doc_id, data, merge=False):
+        self._commit([("set", col, doc_id, data, merge)])
+
+    def create(self, col, doc_id, data):
+        self._commit([("create", col, doc_id, data, False)])
+
+    def update(self, col, doc_id, fields):
+        self._commit([("update", col, doc_id, fields, False)])
+
+    def delete(self, col, doc_id):
+        self._commit([("delete", col, doc_id, None, False)])
+
+    def run_transaction(self, fn):
+        # El lock serializa transacciones: lecturas consistentes + escrituras atómicas.
+        with self.lock:
+            txn = _LocalTxn(self)
+            result = fn(txn)
+            self._commit(txn.writes)
+        return result
+
+
+class _LocalTxn:
+    def __init__(self, backend: LocalBackend):
+        self.backend = backend
+        self.writes = []
+
+    def get(self, col, doc_id):
+        return self.backend.get(col, doc_id)
+
+    def get_many(self, col, doc_ids):
+        return self.backend.get_many(col, doc_ids)
+
+    def set(self, col, doc_id, data, merge=False):
+        self.writes.append(("set", col, doc_id, data, merge))
+
+    def create(self, col, doc_id, data):
+        self.writes.append(("create", col, doc_id, data, False))
+
+    def update(self, col, doc_id, fields):
+        self.writes.append(("update", col, doc_id, fields, False))
+
+    def delete(self, col, doc_id):
+        self.writes.append(("delete", col, doc_id, None, False))
+
+
+# =================================================
+# CLI (herramientas fuera de Streamlit)
+# =================================================
+def add_backend_args(ap):
+    ap.add_argument("--sqlite", help="ruta del backend local (en vez de Firestore)")
+    ap.add_argument("--firebase-creds", help="JSON de la cuenta de servicio de Firebase")
+
+
+def backend_from_args(ap, args) -> Backend:
+    if args.sqlite:
+        return LocalBackend(args.sqlite)
+    if not args.firebase_creds:
+        ap.error("usa --sqlite o --firebase-creds")
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(args.firebase_creds))
+    return FirestoreBackend(firestore.client())
@@ -0,0 +1,274 @@
+"""
+Barrido de tokens vencidos.
+
+Los tokens con ``end_ts`` pasado (y los de 1 uso ya usados) se quedaban con
+``active: True`` para siempre, y cada consulta de "abiertos" los leía para
+descartarlos. El barrido los pasa a ``active: False``:
+
+- consulta por ``active == True`` + ``end_ts <= ahora`` en orden de end_ts,
+  en bloques, y desactiva cada bloque con un batch (hasta 500 escrituras);
+- guarda un checkpoint (cursor end_ts + id) en ``drop24_jobs/token_sweeper``
+  después de cada bloque: si se interrumpe, la siguiente corrida sigue ahí.
+  Al terminar una pasada el cursor se borra y la siguiente empieza desde el
+  principio: un token con end_ts anterior al cursor (apartado de un día
+  pasado, lote con inicio atrasado, token reactivado) también se barre, y lo
+  ya desactivado sale solo de la consulta ``active == True``;
+- limita escrituras por segundo para no competir con el tráfico normal;
+- cada réplica de la app trae su hilo de barrido, pero solo barre la que tiene
+  el lease (``lease_owner`` / ``lease_until`` en el mismo doc, tomado en una
+  transacción). El checkpoint se guarda en transacción comprobando el lease y
+  lo renueva; si otra réplica se lo quedó (p. ej. esta se pausó más de
+  ``LEASE_SECONDS``), esta pasada se detiene sin tocar el checkpoint. Así el
+  tope de escrituras por segundo es del barrido completo, no por réplica.
+- con ``feed``, al final de cada pasada refresca el snapshot Bloom de
+  revocaciones si hay versiones nuevas (``maybe_publish_snapshot``);
+- con ``archiver`` (``drop24.archive.TokenArchiver``), además mueve al archivo
+  los tokens cerrados viejos, bajo el mismo lease y tope de escrituras.
+
+    python -m drop24.sweeper --firebase-creds service_account.json            # una pasada (cron)
+    python -m drop24.sweeper --sqlite drop24.db --every 900 --max-writes 100  # en bucle
+    python -m drop24.sweeper --sqlite drop24.db --archive-days 30             # y archiva
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from drop24.repository import TOKENS_COL, LockerLedger
+from drop24.storage import BATCH_LIMIT, Backend, add_backend_args, as_utc, backend_from_args, cursor_after
+
+log = logging.getLogger(__name__)
+
+JOBS_COL = "drop24_jobs"
+SWEEPER_JOB = "token_sweeper"
+DEFAULT_CHUNK = 200
+MAX_WRITES_PER_SEC = 50.0
+SWEEP_EVERY_SECONDS = 900
+LEASE_SECONDS = 120  # se renueva en cada checkpoint; si el dueño muere, otra réplica entra después de esto
+
+EXPIRED_ORDER = [("end_ts", "asc")]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LeaseLost(Exception):
+    """Otra réplica tiene el lease del barrido."""
+
+
+class TokenSweeper:
+    def __init__(self, backend: Backend, chunk: int = DEFAULT_CHUNK, max_writes_per_sec: float = MAX_WRITES_PER_SEC,
+                 clock=_utcnow, sleep=time.sleep, feed=None, owner: str = None,
+                 lease_seconds: float = LEASE_SECONDS, archiver=None):
+        self.backend = backend
+        self.chunk = max(1, min(int(chunk), BATCH_LIMIT))
+        self.max_writes_per_sec = max_writes_per_sec
+        self.clock = clock
+        self.sleep = sleep
+        self.owner = owner or _default_owner()
+        self.lease_seconds = lease_seconds
+        self.ledger = LockerLedger(backend)
+        self.feed = feed
+        self.archiver = archiver
+
+    def _checkpoint(self) -> dict:
+        return self.backend.get(JOBS_COL, SWEEPER_JOB) or {}
+
+    def _holds(self, job: dict, now: datetime) -> bool:
+        """El lease es nuestro, está libre o ya venció."""
+        if not job.get("lease_owner") or job.get("lease_owner") == self.owner:
+            return True
+        until = as_utc(job.get("lease_until"))
+        return until is None or until <= now
+
+    def acquire(self) -> bool:
+        """Toma (o renueva) el lease si está libre, vencido o ya es nuestro."""
+        def _txn(t):
+            now = self.clock()
+            if not self._holds(t.get(JOBS_COL, SWEEPER_JOB) or {}, now):
+                return False
+            t.set(JOBS_COL, SWEEPER_JOB, {
+                "lease_owner": self.owner, "lease_until": now + timedelta(seconds=self.lease_seconds),
+            }, merge=True)
+            return True
+
+        return self.backend.run_transaction(_txn)
+
+    def release(self):
+        def _txn(t):
+            job = t.get(JOBS_COL, SWEEPER_JOB) or {}
+            if job.get("lease_owner") == self.owner:
+                t.set(JOBS_COL, SWEEPER_JOB, {"lease_owner": None, "lease_until": None}, merge=True)
+
+        self.backend.run_transaction(_txn)
+
+    def _save(self, **fields):
+        """Checkpoint + renovación del lease en una transacción; LeaseLost si ya no es nuestro."""
+        def _txn(t):
+            now = self.clock()
+            job = t.get(JOBS_COL, SWEEPER_JOB) or {}
+            if not self._holds(job, now):
+                raise LeaseLost(job.get("lease_owner"))
+            t.set(JOBS_COL, SWEEPER_JOB, {
+                **fields, "updated_at": now,
+                "lease_owner": self.owner, "lease_until": now + timedelta(seconds=self.lease_seconds),
+            }, merge=True)
+
+        self.backend.run_transaction(_txn)
+
+    def _pace(self, writes: int, started: float):
+        """Duerme lo necesario para no pasar de ``max_writes_per_sec``."""
+        if not self.max_writes_per_sec or writes <= 0:
+            return
+        wait = writes / self.max_writes_per_sec - (time.monotonic() - started)
+        if wait > 0:
+            self.sleep(wait)
+
+    def _deactivate(self, docs, reason: str, now: datetime) -> int:
+        b = self.backend.batch()
+        for d in docs:
+            b.update(TOKENS_COL, d.id, {"active": False, "deactivated_at": now, "deactivated_reason": reason})
+        n = b.commit()
+        # apartados de locker: el lugar vuelve a quedar libre
+        for d in docs:
+            slot_id = LockerLedger.slot_of(d.data)
+            if slot_id:
+                self.ledger.release(slot_id, d.id, now)
+        return n
+
+    def sweep_expired(self, now: datetime = None) -> int:
+        """Desactiva los tokens con end_ts <= now; regresa cuántos."""
+        now = now or self.clock()
+        ckpt = self._checkpoint()
+        cursor = None
+        if ckpt.get("cursor_end_ts") is not None and ckpt.get("cursor_id"):
+            cursor = (ckpt["cursor_end_ts"], ckpt["cursor_id"])
+        total = int(ckpt.get("swept_total", 0))
+        swept = 0
+
+        while True:
+            docs = self.backend.query(
+                TOKENS_COL,
+                where=[("active", "==", True), ("end_ts", "<=", now)],
+                order_by=EXPIRED_ORDER,
+                limit=self.chunk,
+                start_after=cursor,
+            )
+            if not docs:
+                break
+            started = time.monotonic()
+            n = self._deactivate(docs, "expired", now)
+            swept += n
+            # el cursor solo sirve para retomar esta pasada si se corta
+            cursor = cursor_after(docs[-1], EXPIRED_ORDER)
+            self._save(cursor_end_ts=cursor[0], cursor_id=cursor[1], swept_total=total + swept)
+            log.info("barrido: %s tokens vencidos desactivados (hasta %s)", swept, cursor[0])
+            if len(docs) < self.chunk:
+                break
+            self._pace(n, started)
+        self._save(cursor_end_ts=None, cursor_id=None, swept_total=total + swept)
+        return swept
+
+    def sweep_used(self, now: datetime = None) -> int:
+        """Desactiva los tokens de 1 uso que ya se usaron (aunque su ventana siga)."""
+        now = now or self.clock()
+        swept = 0
+        while True:
+            # al desactivarlos salen de la consulta: no hace falta cursor
+            docs = self.backend.query(
+                TOKENS_COL,
+                where=[("active", "==", True), ("one_time", "==", True), ("used", "==", True)],
+                limit=self.chunk,
+            )
+            if not docs:
+                break
+            started = time.monotonic()
+            n = self._deactivate(docs, "used", now)
+            swept += n
+            self._save()  # renueva el lease (y comprueba que sigue siendo nuestro)
+            if len(docs) < self.chunk:
+                break
+            self._pace(n, started)
+        return swept
+
+    def _archive_pace(self, writes: int, started: float):
+        self._pace(writes, started)
+        self._save()  # renueva el lease entre bloques del archivado
+
+    def run_once(self, now: datetime = None):
+        """Una pasada completa; None si otra réplica tiene el lease (o se lo quedó a medias)."""
+        now = now or self.clock()
+        if not self.acquire():
+            log.debug("barrido: el lease es de otra réplica")
+            return None
+        try:
+            expired = self.sweep_expired(now)
+            used = self.sweep_used(now)
+            result = {"expired": expired, "used": used}
+            if self.archiver is not None:
+                result["archived"] = self.archiver.run(now, pace=self._archive_pace)
+            self._save(last_run_at=now, **{f"last_{k}": v for k, v in result.items()})
+            if self.feed is not None:
+                self.feed.maybe_publish_snapshot(now)
+        except LeaseLost as e:
+            log.warning("barrido: otra réplica (%s) tomó el lease; se detiene esta pasada", e)
+            return None
+        finally:
+            self.release()  # solo si sigue siendo nuestro
+        return result
+
+
+def start_background(sweeper: TokenSweeper, every_seconds: float = SWEEP_EVERY_SECONDS) -> threading.Thread:
+    """Hilo daemon que corre ``run_once`` cada ``every_seconds`` (un error no lo detiene)."""
+
+    def _loop():
+        while True:
+            try:
+                sweeper.run_once()
+            except Exception:
+                log.exception("barrido de tokens falló")
+            time.sleep(every_seconds)
+
+    th = threading.Thread(target=_loop, name="drop24-sweeper", daemon=True)
+    th.start()
+    return th
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Desactiva tokens vencidos/usados de Drop24")
+    add_backend_args(ap)
+    ap.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    ap.add_argument("--max-writes", type=float, default=MAX_WRITES_PER_SEC, help="escrituras por segundo (0 = sin tope)")
+    ap.add_argument("--every", type=int, default=0, help="segundos entre pasadas (0 = una sola pasada)")
+    ap.add_argument("--archive-days", type=int, default=0,
+                    help="también archiva los cerrados con más de N días (0 = no archiva)")
+    ap.add_argument("--parquet-dir", help="archivar en Parquet en este directorio en vez de colecciones")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    backend = backend_from_args(ap, args)
+    archiver = None
+    if args.archive_days > 0:
+        from drop24.archive import TokenArchiver
+
+        archiver = TokenArchiver(backend, keep_days=args.archive_days, parquet_dir=args.parquet_dir)
+    sweeper = TokenSweeper(backend, chunk=args.chunk, max_writes_per_sec=args.max_writes, archiver=archiver)
+    while True:
+        log.info("barrido: %s", sweeper.run_once())
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
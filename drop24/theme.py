@@ -0,0 +1,187 @@
+"""
+Tema visual del portal: paleta, CSS y encabezado.
+
+Todo se arma una sola vez por proceso (al importar / primer uso) y sale ya
+minificado; cada rerun solo manda el string hecho en un único st.markdown,
+en lugar de volver a formatear el f-string grande de CSS y el header.
+"""
+import re
+from functools import lru_cache
+
+# Paleta estilo
+C_TEAL_DARK = "#055671"
+C_TEAL_MID = "#6699A5"
+C_CYAN_LIGHT = "#B4DFE8"
+C_BG = "#F9FAF8"
+C_TEXT_MUTED = "#6A7067"
+
+_CSS_TEMPLATE = """
+<style>
+body {{
+    background-color: {C_BG};
+    font-family: "Segoe UI", system-ui, -apple-system, BlinkMacSystemFont, "Roboto", sans-serif;
+    color: #0B1F2A;
+}}
+
+.corp-header {{
+    width: 100%;
+    background: linear-gradient(90deg, {C_TEAL_DARK} 0%, {C_TEAL_MID} 55%, {C_CYAN_LIGHT} 100%);
+    color: white;
+    padding: 14px 26px;
+    display: flex;
+    align-items: center;
+    justify-content: space-between;
+    box-shadow: 0 2px 12px rgba(0,0,0,0.18);
+    margin-bottom: 18px;
+    border-radius: 0 0 18px 18px;
+    position: relative;
+    overflow: hidden;
+}}
+
+.corp-header::after {{
+    content: "";
+    position: absolute;
+    top: 0;
+    left: -20%;
+    width: 140%;
+    height: 100%;
+    background: radial-gradient(circle at 80% 50%, rgba(255,255,255,0.85) 0%, rgba(180,223,232,0.35) 30%, rgba(5,86,113,0) 70%);
+    opacity: 0.55;
+    transform: skewX(-18deg);
+}}
+
+.corp-header-left {{
+    display: flex;
+    align-items: center;
+    gap: 14px;
+    position: relative;
+    z-index: 2;
+    max-width: 75%;
+}}
+
+.corp-logo {{
+    height: 44px;
+    width: auto;
+    border-radius: 10px;
+    background: rgba(255,255,255,0.92);
+    padding: 6px 10px;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.18);
+}}
+
+.corp-header-title {{
+    font-size: 14px;
+    font-weight: 900;
+    color: #FFFFFF;
+    line-height: 1.15;
+    text-transform: uppercase;
+}}
+
+.corp-header-sub {{
+    font-size: 12px;
+    opacity: 0.95;
+    color: #EAF7FB;
+    margin-top: 4px;
+    text-transform: uppercase;
+    letter-spacing: 0.4px;
+}}
+
+.corp-header-right {{
+    font-size: 12px;
+    text-align: right;
+    position: relative;
+    z-index: 2;
+    color: #FFFFFF;
+    opacity: 0.98;
+    min-width: 190px;
+}}
+
+.big-title {{
+    font-size: 30px;
+    font-weight: 900;
+    text-align: center;
+    margin-bottom: 4px;
+    color: {C_TEAL_DARK};
+}}
+
+.subtitle {{
+    font-size: 14px;
+    text-align: center;
+    color: {C_TEXT_MUTED};
+    margin-bottom: 18px;
+}}
+
+.card {{
+    background-color: #FFFFFF;
+    border-left: 6px solid {C_TEAL_DARK};
+    border-radius: 16px;
+    padding: 14px 16px;
+    margin: 8px 0;
+    color: #0B1F2A;
+    box-shadow: 0 4px 14px rgba(0,0,0,0.06);
+}}
+
+.pill {{
+    display: inline-block;
+    padding: 6px 12px;
+    border-radius: 999px;
+    background-color: #EAF7FB;
+    color: {C_TEAL_DARK};
+    font-size: 12px;
+    margin: 3px;
+    border: 1px solid {C_CYAN_LIGHT};
+    font-weight: 800;
+}}
+
+.note {{
+    color: {C_TEXT_MUTED};
+    font-size: 12px;
+}}
+
+/* Botones */
+.stButton > button {{
+    border-radius: 12px !important;
+    border: 1px solid {C_CYAN_LIGHT} !important;
+}}
+
+/* Sidebar */
+section[data-testid="stSidebar"] {{
+    background: #FFFFFF;
+    border-right: 1px solid rgba(0,0,0,0.06);
+}}
+</style>
+"""
+
+
+def _minify(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+CSS_HTML = _minify(_CSS_TEMPLATE.format(
+    C_TEAL_DARK=C_TEAL_DARK, C_TEAL_MID=C_TEAL_MID, C_CYAN_LIGHT=C_CYAN_LIGHT, C_BG=C_BG, C_TEXT_MUTED=C_TEXT_MUTED,
+))
+
+
+@lru_cache(maxsize=8)
+def page_head_html(logo_html: str, org_name: str, org_sub: str, title: str, subtitle: str) -> str:
+    """CSS + header + título en un solo bloque HTML (una línea: Markdown no lo parte)."""
+    header = (
+        '<div class="corp-header">'
+        '<div class="corp-header-left">'
+        f"{logo_html}"
+        f'<div><div class="corp-header-title">{org_name}</div><div class="corp-header-sub">{org_sub}</div></div>'
+        "</div>"
+        '<div class="corp-header-right">'
+        "<div><b>Portal de Usuarios</b></div>"
+        '<div style="opacity:0.92;">Registro · Login · QR agendado</div>'
+        "</div>"
+        "</div>"
+    )
+    return (
+        CSS_HTML
+        + header
+        + f"<div class='big-title'>{title}</div>"
+        + f"<div class='subtitle'>{subtitle}</div>"
+    )
@@ -0,0 +1,351 @@
+"""
+Importación y exportación masiva de usuarios (XLSX / CSV), en streaming.
+
+Importar:
+- las filas se leen una a una (openpyxl en modo read-only, ``csv`` sobre el
+  archivo), nunca la hoja completa en memoria;
+- cada fila pasa por las mismas reglas que el formulario de Registro
+  (``drop24.registration``); las inválidas se reportan con su número de fila;
+- se escribe en bloques con un batch por bloque (hasta 500 escrituras) y
+  después de cada bloque se guarda un checkpoint en
+  ``drop24_jobs/user_import_<hash del archivo>``: si se corta, volver a subir
+  el mismo archivo sigue desde la última fila confirmada.
+
+Exportar:
+- pagina ``drop24_users`` por id con cursor y escribe cada página al archivo
+  (CSV o XLSX write-only) antes de pedir la siguiente.
+
+Encabezados: los nombres de campo del documento (``username``, ``full_name``,
+``phone``, ``email``, ``street``, ``postal_code``…) y ``password``, obligatoria
+igual que en el Registro (no hay otra forma de ponerle contraseña a una cuenta).
+La exportación trae la columna ``password`` vacía (nunca el hash): se llena y el
+archivo se puede volver a importar.
+
+    python -m drop24.userio import vecinos.xlsx --sqlite drop24.db
+    python -m drop24.userio export usuarios.csv --firebase-creds service_account.json
+"""
+import csv
+import hashlib
+import io
+import logging
+import os
+from datetime import datetime, timezone
+
+from drop24.passwords import hash_many
+from drop24.registration import ADDRESS_FIELDS, DEFAULTS, clean_payload, user_doc, validate
+from drop24.repository import (
+    EMAIL_INDEX_COL, PHONE_INDEX_COL, USERS_COL, UserStore, add_registration, email_key, phone_key,
+)
+from drop24.storage import BATCH_LIMIT, AlreadyExists, Backend, add_backend_args, backend_from_args, cursor_after
+from drop24.sweeper import JOBS_COL
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHUNK = 150
+WRITES_PER_USER = 3  # usuario + índice de teléfono + índice de email
+MAX_ERRORS_KEPT = 1000
+EXPORT_FIELDS = ("username", "full_name", "phone", "email", "preferred_contact", "active") + ADDRESS_FIELDS + (
+    "created_at", "password")
+EXPORT_ORDER = [("__name__", "asc")]
+_TAKEN = {"username": "El usuario", "phone": "El teléfono", "email": "El email"}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# =================================================
+# Lectura en streaming
+# =================================================
+def file_digest(f) -> str:
+    """sha1 del archivo (por bloques) y regresa el puntero al inicio."""
+    h = hashlib.sha1()
+    f.seek(0)
+    for block in iter(lambda: f.read(1 << 16), b""):
+        h.update(block)
+    f.seek(0)
+    return h.hexdigest()[:16]
+
+
+def _cell(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)  # Excel guarda teléfonos y CP como número: 5512345678.0
+    return str(v).strip()
+
+
+def _header(values) -> list[str]:
+    return [_cell(v).lower().replace(" ", "_") for v in values]
+
+
+def iter_csv(f):
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    try:
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(text, dialect)
+        header = _header(next(reader, []))
+        for values in reader:
+            if any(v.strip() for v in values):
+                yield dict(zip(header, (v.strip() for v in values)))
+    finally:
+        # si la importación se corta a medias, el archivo del que llama no se cierra con el wrapper
+        text.detach()
+
+
+def iter_xlsx(f):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = _header(next(rows, ()))
+        for values in rows:
+            row = dict(zip(header, (_cell(v) for v in values)))
+            if any(row.values()):
+                # un CP capturado como número pierde el cero inicial (03330 -> 3330)
+                cp = row.get("postal_code", "")
+                if cp.isdigit() and len(cp) == 4:
+                    row["postal_code"] = cp.zfill(5)
+                yield row
+    finally:
+        wb.close()
+
+
+def iter_rows(f, filename: str):
+    """Filas del archivo como dicts (encabezado en minúsculas); XLSX o CSV según la extensión."""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        return iter_xlsx(f)
+    return iter_csv(f)
+
+
+# =================================================
+# Importar
+# =================================================
+class UserImporter:
+    def __init__(self, backend: Backend, chunk: int = DEFAULT_CHUNK, clock=_utcnow):
+        self.backend = backend
+        self.chunk = max(1, min(int(chunk), BATCH_LIMIT // WRITES_PER_USER))
+        self.clock = clock
+
+    @staticmethod
+    def job_id(digest: str) -> str:
+        return f"user_import_{digest}"
+
+    def checkpoint(self, digest: str) -> dict:
+        return self.backend.get(JOBS_COL, self.job_id(digest)) or {}
+
+    def _save(self, digest: str, **fields):
+        self.backend.set(JOBS_COL, self.job_id(digest), {**fields, "updated_at": self.clock()}, merge=True)
+
+    def _check_row(self, row: dict):
+        """(payload, password, error)"""
+        payload = clean_payload(row, DEFAULTS)
+        password = row.get("password", "")
+        if not password:
+            return payload, password, "Falta la contraseña (columna password)."
+        return payload, password, validate(payload, password)
+
+    def _write_chunk(self, rows: list, source: str, now) -> tuple:
+        """rows: [(n_fila, payload, password)] -> ([payloads creados], [(n_fila, error)])."""
+        errors = []
+        # 3 lecturas agrupadas por bloque en vez de fallar el batch completo por un repetido
+        users = self.backend.get_many(USERS_COL, [p["username"] for _, p, _ in rows])
+        phones = self.backend.get_many(PHONE_INDEX_COL, [phone_key(p["phone"]) for _, p, _ in rows])
+        emails = self.backend.get_many(EMAIL_INDEX_COL, [email_key(p["email"]) for _, p, _ in rows])
+        fresh = []
+        for n, payload, pw in rows:
+            u, ph, em = payload["username"], phone_key(payload["phone"]), email_key(payload["email"])
+            if u in users:
+                errors.append((n, f"El usuario {u} ya existe."))
+            elif ph in phones:
+                errors.append((n, f"El teléfono {payload['phone']} ya está registrado."))
+            elif em in emails:
+                errors.append((n, f"El email {payload['email']} ya está registrado."))
+            else:
+                # los siguientes del mismo archivo chocan contra este
+                users[u] = phones[ph] = emails[em] = {"username": u}
+                fresh.append((n, payload, pw))
+        if not fresh:
+            return [], errors
+
+        hashes = hash_many([pw for _, _, pw in fresh])
+        docs = [(n, payload, user_doc(payload, h, now, imported_from=source))
+                for (n, payload, _), h in zip(fresh, hashes)]
+
+        b = self.backend.batch()
+        for _, payload, doc in docs:
+            add_registration(b, payload["username"], doc)
+        try:
+            b.commit()
+            return [payload for _, payload, _ in docs], errors
+        except AlreadyExists:
+            # alguien se registró con uno de estos datos entre la lectura y el batch: uno por uno
+            store = UserStore(self.backend)
+            created = []
+            for n, payload, doc in docs:
+                taken = store.register(payload["username"], doc)
+                if taken is None:
+                    created.append(payload)
+                else:
+                    errors.append((n, f"{_TAKEN[taken]} ya está registrado: {payload[taken]}."))
+            return created, errors
+
+    def run(self, rows, digest: str, source: str = "", restart: bool = False, progress=None,
+            on_created=None) -> dict:
+        """
+        Importa ``rows`` (iterable de dicts). ``progress(filas_leídas, creados)`` tras cada bloque y
+        ``on_created([payloads])`` con los usuarios que quedaron en ese bloque.
+        Regresa el resumen (también queda en el checkpoint); ``errors`` trae (fila, mensaje).
+        """
+        ckpt = {} if restart else self.checkpoint(digest)
+        if ckpt.get("done"):
+            return {**ckpt, "errors": [], "resumed_from": ckpt.get("rows_done", 0)}
+        skip = int(ckpt.get("rows_done", 0))
+        created = int(ckpt.get("created", 0))
+        failed = int(ckpt.get("failed", 0))
+        errors = []
+        now = self.clock()
+        row_no = 1  # la fila 1 es el encabezado
+        done = skip
+        pending = []
+
+        def flush():
+            nonlocal created, failed
+            if pending:
+                ok, errs = self._write_chunk(pending, source, now)
+                created += len(ok)
+                if ok and on_created:
+                    on_created(ok)
+                failed += len(errs)
+                errors.extend(errs[:max(0, MAX_ERRORS_KEPT - len(errors))])
+                pending.clear()
+            # el checkpoint va después del commit: lo confirmado nunca se repite
+            self._save(digest, source=source, rows_done=done, created=created, failed=failed, done=False)
+            if progress:
+                progress(done, created)
+
+        for row in rows:
+            row_no += 1
+            if row_no - 1 <= skip:
+                continue
+            payload, pw, problem = self._check_row(row)
+            if problem:
+                failed += 1
+                if len(errors) < MAX_ERRORS_KEPT:
+                    errors.append((row_no, problem))
+            else:
+                pending.append((row_no, payload, pw))
+            done = row_no - 1
+            if len(pending) >= self.chunk or (done - skip) % (self.chunk * 5) == 0:
+                flush()
+        flush()
+        self._save(digest, done=True)
+        log.info("importación %s: %s filas, %s creados, %s con error", source, done, created, failed)
+        return {"rows_done": done, "created": created, "failed": failed, "errors": errors, "resumed_from": skip}
+
+
+def import_file(backend: Backend, f, filename: str, chunk: int = DEFAULT_CHUNK, restart: bool = False,
+                progress=None, on_created=None) -> dict:
+    digest = file_digest(f)
+    return UserImporter(backend, chunk).run(iter_rows(f, filename), digest, source=os.path.basename(filename),
+                                            restart=restart, progress=progress, on_created=on_created)
+
+
+# =================================================
+# Exportar
+# =================================================
+def iter_users(backend: Backend, page_size: int = BATCH_LIMIT):
+    """Todos los usuarios, página por página (una consulta con cursor por página)."""
+    cursor = None
+    while True:
+        docs = backend.query(USERS_COL, order_by=EXPORT_ORDER, limit=page_size, start_after=cursor)
+        for d in docs:
+            yield d
+        if len(docs) < page_size:
+            return
+        cursor = cursor_after(docs[-1], EXPORT_ORDER)
+
+
+def _export_row(d, fmt_ts) -> list:
+    x = d.data
+    addr = x.get("address", {}) or {}
+    out = []
+    for k in EXPORT_FIELDS:
+        if k in ADDRESS_FIELDS:
+            v = addr.get(k, "")
+        elif k == "username":
+            v = x.get("username") or d.id
+        elif k == "password":
+            v = ""  # el hash nunca sale en la exportación
+        elif k == "created_at":
+            v = fmt_ts(x.get("created_at")) if fmt_ts else x.get("created_at")
+        else:
+            v = x.get(k, "")
+        out.append("" if v is None else v)
+    return out
+
+
+def export_users(backend: Backend, path: str, fmt_ts=None, page_size: int = BATCH_LIMIT, progress=None) -> int:
+    """Escribe todos los usuarios a ``path`` (.xlsx o .csv) sin juntarlos en memoria; regresa cuántos."""
+    n = 0
+    if path.lower().endswith(".xlsx"):
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("usuarios")
+        ws.append(list(EXPORT_FIELDS))
+        for d in iter_users(backend, page_size):
+            ws.append([v.replace(tzinfo=None) if isinstance(v, datetime) else v for v in _export_row(d, fmt_ts)])
+            n += 1
+            if progress and n % page_size == 0:
+                progress(n)
+        wb.save(path)
+    else:
+        with open(path, "w", encoding="utf-8-sig", newline="") as out:
+            w = csv.writer(out)
+            w.writerow(EXPORT_FIELDS)
+            for d in iter_users(backend, page_size):
+                w.writerow(_export_row(d, fmt_ts))
+                n += 1
+                if progress and n % page_size == 0:
+                    progress(n)
+    if progress:
+        progress(n)
+    return n
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Importar/exportar usuarios de Drop24 (XLSX/CSV)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    i = sub.add_parser("import", help="alta masiva desde XLSX/CSV (reanudable)")
+    i.add_argument("path")
+    i.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    i.add_argument("--restart", action="store_true", help="ignorar el checkpoint guardado")
+    add_backend_args(i)
+    e = sub.add_parser("export", help="todos los usuarios a .xlsx o .csv")
+    e.add_argument("path")
+    add_backend_args(e)
+    args = ap.parse_args(argv)
+    backend = backend_from_args(ap, args)
+
+    if args.cmd == "import":
+        with open(args.path, "rb") as f:
+            r = import_file(backend, f, args.path, chunk=args.chunk, restart=args.restart,
+                            progress=lambda done, created: print(f"  {done} filas · {created} creados", flush=True))
+        print(f"{r['created']} creados, {r['failed']} con error (desde la fila {r['resumed_from'] + 2})")
+        for row_no, msg in r["errors"]:
+            print(f"  fila {row_no}: {msg}")
+    else:
+        print(f"{export_users(backend, args.path)} usuarios -> {args.path}")
+
+
+if __name__ == "__main__":
+    main()
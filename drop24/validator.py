@@ -0,0 +1,351 @@
+"""
+Validación de QRs para el escáner Android de las puertas (buzón / lockers).
+
+Mantiene en memoria los tokens con ventana abierta o próxima (active y
+end_ts > now), valida la ventana sin ir a la nube y consume los de 1 uso con
+un check-and-set atómico en memoria. La escritura de ``used`` a Firestore se
+hace después (write-behind), así la puerta se abre en milisegundos.
+
+Ese check-and-set solo vale dentro de un proceso: con write-behind debe haber
+UNA réplica del validador por grupo de puertas. Con varias réplicas se corre
+con ``--confirm-use`` (``write_behind=False``): el primer uso se confirma con
+la transacción de ``mark_used`` antes de abrir, y solo una réplica gana.
+
+Si el backend no responde, el validador sigue con la cache que tiene (la
+reintenta cada ``REFRESH_RETRY_SECONDS``). Lo que sí necesita una lectura en
+ese momento (un "tal vez" del Bloom, confirmar un uso con ``--confirm-use``)
+se resuelve con ``on_backend_error``: "open" deja pasar, "closed" rechaza con
+``backend_unavailable``. Un QR sin firma que no está en cache se rechaza así.
+
+Con un ``QRSigner`` los QRs firmados (v2) se aceptan o rechazan solo con su
+payload, sin lectura al backend; el backend solo concilia el uso después.
+Las bajas llegan por el feed de revocaciones (``drop24.revocation``), que se
+consulta cada pocos segundos y solo trae los deltas nuevos.
+
+Servidor HTTP mínimo:
+
+    python -m drop24.validator --sqlite drop24.db --port 8765
+    GET /validate?qr=DROP24|ABC123DEF456&door=BZ
+    -> {"ok": true, "reason": "ok", "token_id": "...", ...}
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from drop24.repository import TokenStore
+from drop24.qrsign import QRSigner, InvalidQR, split_payload
+from drop24.revocation import RevocationFeed, RevocationSet
+from drop24.storage import add_backend_args, as_utc, backend_from_args
+
+log = logging.getLogger(__name__)
+
+REFRESH_SECONDS = 30
+REVOCATION_POLL_SECONDS = 3
+REFRESH_RETRY_SECONDS = 5  # con el backend caído, cada cuánto se reintenta el refresh
+FAIL_OPEN, FAIL_CLOSED = "open", "closed"
+
+
+class BackendUnavailable(Exception):
+    """No se pudo leer/escribir el backend y ``on_backend_error`` es "closed"."""
+
+
+def parse_qr(payload: str) -> str:
+    """'DROP24|ABC123' (o firmado 'DROP24|ABC123|s2...') -> 'ABC123'. También acepta el token solo."""
+    return split_payload(payload)[1]
+
+
+class TokenValidator:
+    def __init__(self, token_store: TokenStore, refresh_seconds: int = REFRESH_SECONDS, write_behind: bool = True,
+                 signer: QRSigner = None, feed: RevocationFeed = None,
+                 revocation_poll_seconds: int = REVOCATION_POLL_SECONDS, on_backend_error: str = FAIL_OPEN):
+        if on_backend_error not in (FAIL_OPEN, FAIL_CLOSED):
+            raise ValueError(f"on_backend_error debe ser {FAIL_OPEN!r} o {FAIL_CLOSED!r}")
+        self.tokens = token_store
+        self.on_backend_error = on_backend_error
+        self.signer = signer
+        self.feed = feed
+        self.revoked = RevocationSet()
+        self.revocation_poll_seconds = revocation_poll_seconds
+        self.revocations_at = 0.0
+        self._snapshot_loaded = False
+        self.refresh_seconds = refresh_seconds
+        self.write_behind = write_behind
+        self.lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # single-flight: un solo hilo refresca, los demás usan la cache
+        self.cache = {}          # token_id -> dict del token
+        self.consumed = {}       # token_id -> (used_at, end_ts) consumidos aquí; se purgan al expirar
+        self.loaded_at = 0.0
+        self._pending = queue.Queue()
+        # también sin write-behind: ahí quedan los usos aceptados con el backend caído (fail-open)
+        self._writer = threading.Thread(target=self._flush_loop, name="drop24-used-writer", daemon=True)
+        self._writer.start()
+
+    # ---------- cache ----------
+    def refresh(self, now: datetime = None):
+        now = now or datetime.now(timezone.utc)
+        fresh = {x["token_id"]: x for x in self.tokens.list_open(now) if x.get("token_id")}
+        with self.lock:
+            # lo consumido localmente gana sobre lo leído (la escritura puede ir en camino)
+            self.consumed = {tid: v for tid, v in self.consumed.items() if v[1] is None or v[1] > now}
+            for tid, (used_at, _) in self.consumed.items():
+                if tid in fresh:
+                    fresh[tid] = {**fresh[tid], "used": True, "used_at": used_at}
+            self.cache = fresh
+            self.loaded_at = time.monotonic()
+
+    def _maybe_refresh(self):
+        due = time.monotonic() - self.loaded_at > self.refresh_seconds
+        due_rev = self.feed is not None and time.monotonic() - self.revocations_at > self.revocation_poll_seconds
+        if not (due or due_rev) or not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self.loaded_at > self.refresh_seconds:
+                try:
+                    self.refresh()
+                except Exception:
+                    # sin backend se sigue validando con la cache vieja; reintento en REFRESH_RETRY_SECONDS
+                    log.warning("refresh falló; sigue la cache de hace %.0f s", time.monotonic() - self.loaded_at,
+                                exc_info=True)
+                    self.loaded_at = time.monotonic() - self.refresh_seconds + REFRESH_RETRY_SECONDS
+            if self.feed is not None and time.monotonic() - self.revocations_at > self.revocation_poll_seconds:
+                try:
+                    self.sync_revocations()
+                except Exception:
+                    log.warning("no se pudieron leer revocaciones; se reintenta", exc_info=True)
+                    self.revocations_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def _fail_open(self, what: str, token_id: str) -> bool:
+        """Una lectura/escritura necesaria falló: True si se deja pasar (``on_backend_error="open"``)."""
+        log.warning("backend no disponible (%s %s); on_backend_error=%s", what, token_id, self.on_backend_error,
+                    exc_info=True)
+        return self.on_backend_error == FAIL_OPEN
+
+    def sync_revocations(self):
+        """Baja el snapshot la primera vez y luego solo deltas nuevos."""
+        if self.feed is None:
+            return
+        if not self._snapshot_loaded:
+            self.revoked.load_snapshot(self.feed.get_snapshot())
+            self._snapshot_loaded = True
+        added = self.revoked.sync(self.feed)
+        if added:
+            with self.lock:
+                for tid in added:
+                    if tid in self.cache:
+                        self.cache[tid] = {**self.cache[tid], "active": False}
+        self.revocations_at = time.monotonic()
+
+    def _is_revoked(self, token_id: str) -> bool:
+        status = self.revoked.status(token_id)
+        if status == "maybe":
+            # posible falso positivo del Bloom: se confirma con 1 lectura directa (la cache puede ser vieja)
+            try:
+                x = self.tokens.get(token_id)
+            except Exception:
+                if self._fail_open("revocación", token_id):
+                    return False
+                raise BackendUnavailable("revocación")
+            if x is not None and not x.get("active", False):
+                with self.lock:
+                    self.cache[token_id] = x
+            return x is None or not x.get("active", False)
+        return status == "revoked"
+
+    def _lookup(self, token_id: str):
+        x = self.cache.get(token_id)
+        if x is not None:
+            return x
+        # creado después del último refresh: 1 lectura y queda en cache
+        try:
+            x = self.tokens.get(token_id)
+        except Exception:
+            # sin firma ni cache no hay con qué validarlo: se rechaza aunque sea fail-open
+            log.warning("backend no disponible (lookup %s)", token_id, exc_info=True)
+            raise BackendUnavailable("lookup")
+        if x is not None:
+            with self.lock:
+                x = self.cache.setdefault(token_id, x)
+        return x
+
+    # ---------- validación ----------
+    def validate(self, qr: str, door: str = None, now: datetime = None) -> dict:
+        now = now or datetime.now(timezone.utc)
+        self._maybe_refresh()
+        try:
+            return self._validate(qr, door, now)
+        except BackendUnavailable:
+            return {"ok": False, "reason": "backend_unavailable", "token_id": parse_qr(qr)}
+
+    def _validate(self, qr: str, door: str, now: datetime) -> dict:
+
+        if self.signer is not None:
+            try:
+                claims = self.signer.verify(qr)
+            except InvalidQR:
+                return {"ok": False, "reason": "bad_signature", "token_id": parse_qr(qr)}
+            if claims.signed:
+                return self._validate_signed(claims, door, now)
+
+        token_id = parse_qr(qr)
+        x = self._lookup(token_id) if token_id else None
+        if x is None:
+            return {"ok": False, "reason": "not_found", "token_id": token_id}
+
+        result = {"token_id": token_id, "access_type": x.get("access_type"), "username": x.get("created_by")}
+        if not x.get("active", False):
+            return {**result, "ok": False, "reason": "inactive"}
+        reason = self._check(x.get("access_type"), as_utc(x.get("start_ts")), as_utc(x.get("end_ts")), door, now)
+        if reason:
+            return {**result, "ok": False, "reason": reason}
+        if x.get("one_time", False) and not self._consume(token_id, as_utc(x.get("end_ts")), now):
+            return {**result, "ok": False, "reason": "used"}
+        return {**result, "ok": True, "reason": "ok"}
+
+    def _validate_signed(self, claims, door, now) -> dict:
+        """Todo sale del payload firmado; la cache solo aporta bajas (active=False) ya conocidas."""
+        token_id = claims.token_id
+        result = {"token_id": token_id, "access_type": claims.access_type, "offline": True}
+        known = self.cache.get(token_id)
+        if (known is not None and not known.get("active", False)) or self._is_revoked(token_id):
+            return {**result, "ok": False, "reason": "inactive"}
+        reason = self._check(claims.access_type, claims.start_ts, claims.end_ts, door, now)
+        if reason:
+            return {**result, "ok": False, "reason": reason}
+        if claims.one_time and not self._consume(token_id, claims.end_ts, now):
+            return {**result, "ok": False, "reason": "used"}
+        return {**result, "ok": True, "reason": "ok"}
+
+    @staticmethod
+    def _check(access_type, start_ts, end_ts, door, now):
+        if door and access_type and door.upper() != str(access_type).upper():
+            return "wrong_door"
+        if start_ts and now < start_ts:
+            return "not_yet"
+        if not end_ts or now >= end_ts:
+            return "expired"
+        return None
+
+    def _consume(self, token_id: str, end_ts, now: datetime) -> bool:
+        # check-and-set atómico: si dos puertas escanean a la vez, solo una abre
+        with self.lock:
+            current = self.cache.get(token_id)
+            if token_id in self.consumed or (current or {}).get("used", False):
+                return False
+            if current is not None:
+                self.cache[token_id] = {**current, "used": True, "used_at": now}
+            self.consumed[token_id] = (now, end_ts)
+        if self.write_behind:
+            self._pending.put((token_id, now))
+            return True
+        # varias réplicas: abre solo si la transacción del backend confirma que este fue el primer uso
+        try:
+            return self._write_used(token_id, now)
+        except Exception:
+            if not self._fail_open("confirmar uso", token_id):
+                with self.lock:  # no se abrió: que un reintento pueda usarlo
+                    self.consumed.pop(token_id, None)
+                    if current is not None:
+                        self.cache[token_id] = current
+                raise BackendUnavailable("confirmar uso")
+            self._pending.put((token_id, now))  # se concilia cuando vuelva el backend
+            return True
+
+    # ---------- escritura de used ----------
+    def _write_used(self, token_id: str, used_at: datetime) -> bool:
+        ok = self.tokens.mark_used(token_id, used_at)
+        if not ok:
+            log.warning("Token %s ya estaba usado/inactivo en backend", token_id)
+        return ok
+
+    def _flush_loop(self):
+        while True:
+            token_id, used_at = self._pending.get()
+            for attempt in range(5):
+                try:
+                    self._write_used(token_id, used_at)
+                    break
+                except Exception:
+                    log.exception("No se pudo marcar %s como usado (intento %s)", token_id, attempt + 1)
+                    time.sleep(min(2 ** attempt, 30))
+            self._pending.task_done()
+
+    def flush(self):
+        """Espera a que todas las escrituras pendientes lleguen al backend."""
+        self._pending.join()
+
+
+# =================================================
+# SERVIDOR HTTP (stdlib)
+# =================================================
+def make_server(validator: TokenValidator, host: str = "0.0.0.0", port: int = 8765):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            qs = parse_qs(url.query)
+            if url.path == "/validate":
+                res = validator.validate(qs.get("qr", [""])[0], door=qs.get("door", [None])[0])
+                self._json(200 if res["ok"] else 403, res)
+            elif url.path == "/revocations" and validator.feed is not None:
+                since = int(qs.get("since", ["0"])[0] or 0)
+                deltas = validator.feed.deltas_since(since)
+                self._json(200, {"since": since, "deltas": deltas})
+            elif url.path == "/revocations/snapshot" and validator.feed is not None:
+                self._json(200, validator.feed.get_snapshot() or {})
+            else:
+                self.send_error(404)
+
+        def _json(self, status, res):
+            body = json.dumps(res, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            log.debug(fmt, *args)
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Servicio de validación de QRs Drop24")
+    add_backend_args(ap)
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--refresh", type=int, default=REFRESH_SECONDS)
+    ap.add_argument("--fail-closed", action="store_true",
+                    help="con el backend caído, rechazar lo que necesite leerlo (default: dejar pasar)")
+    ap.add_argument("--confirm-use", action="store_true",
+                    help="confirmar cada primer uso en el backend antes de abrir (obligatorio con varias réplicas)")
+    ap.add_argument("--qr-keys", help='JSON {"active": kid, "keys": {kid: base64}} para QRs firmados')
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    signer = None
+    if args.qr_keys:
+        with open(args.qr_keys, encoding="utf-8") as f:
+            signer = QRSigner.from_config(json.load(f))
+    backend = backend_from_args(ap, args)
+    validator = TokenValidator(TokenStore(backend), refresh_seconds=args.refresh, signer=signer,
+                               feed=RevocationFeed(backend), write_behind=not args.confirm_use,
+                               on_backend_error=FAIL_CLOSED if args.fail_closed else FAIL_OPEN)
+    validator.refresh()
+    validator.sync_revocations()
+    server = make_server(validator, args.host, args.port)
+    log.info("Validador Drop24 escuchando en %s:%s (%s tokens en cache)", args.host, args.port, len(validator.cache))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
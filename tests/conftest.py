@@ -0,0 +1,34 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drop24.storage import FirestoreBackend, LocalBackend  # noqa: E402
+
+BACKENDS = ["local", "firestore"]
+
+
+def make_backend(kind: str):
+    if kind == "local":
+        return LocalBackend(":memory:")
+    # paridad contra Firestore real: solo con el emulador (firebase emulators:start --only firestore)
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        pytest.skip("sin FIRESTORE_EMULATOR_HOST")
+    from google.cloud import firestore
+
+    return FirestoreBackend(firestore.Client(project=f"drop24-test-{uuid.uuid4().hex[:8]}"))
+
+
+@pytest.fixture
+def backend():
+    b = LocalBackend(":memory:")
+    yield b
+    b.close()
+
+
+@pytest.fixture(params=BACKENDS)
+def any_backend(request):
+    return make_backend(request.param)
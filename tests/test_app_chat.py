@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+st_testing = pytest.importorskip("streamlit.testing.v1")
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "App.py")
+CHAT_TAB = "🤖 Chatbot Ayuda"
+
+
+@pytest.fixture
+def app(tmp_path):
+    import streamlit as st
+
+    st.cache_resource.clear()
+    at = st_testing.AppTest.from_file(APP, default_timeout=60)
+    at.secrets["storage_backend"] = "sqlite"
+    at.secrets["sqlite_path"] = str(tmp_path / "app.db")
+    at.secrets["token_sweeper_every"] = 0
+    at.session_state["main_tab"] = CHAT_TAB
+    at.run()
+    assert not at.exception
+    yield at
+    st.cache_resource.clear()
+
+
+def _rerun(at):
+    at.session_state["main_tab"] = CHAT_TAB  # AppTest no conserva el valor del control de pestañas
+    at.run()
+    assert not at.exception
+
+
+def test_chat_turn_shows_reply_in_the_same_run(app):
+    app.chat_input[0].set_value("precios")
+    _rerun(app)
+    # el historial se pinta después del input: la respuesta sale sin st.rerun()
+    assert [m.name for m in app.chat_message][-2:] == ["user", "assistant"]
+    assert len(app.session_state.drop24_chat) == 3
+    assert app.chat_message[-1].markdown[0].value == app.session_state.drop24_chat[-1]["content"]
+
+
+def test_faq_button_and_clear(app):
+    next(b for b in app.button if b.label == "¿Cuánto tarda la entrega?").click()
+    _rerun(app)
+    assert app.session_state.drop24_chat[-2]["content"] == "¿Cuánto tarda la entrega?"
+    assert len(app.chat_message) == 3
+
+    next(b for b in app.button if b.label == "🧹 Limpiar chat").click()
+    _rerun(app)
+    assert [m["role"] for m in app.session_state.drop24_chat] == ["assistant"]
+    assert len(app.chat_message) == 1
@@ -0,0 +1,105 @@
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from drop24.archive import (ARCHIVE_MONTHS_COL, PENDING_SUFFIX, ArchiveReader, TokenArchiver, publish_parquet,
+                            read_parquet_month, write_parquet)
+from drop24.repository import TOKENS_COL
+
+NOW = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+
+
+def closed(tid, days_ago):
+    end = NOW - timedelta(days=days_ago)
+    return {"token_id": tid, "created_by": "ana", "active": False, "end_ts": end, "start_ts": end - timedelta(minutes=15)}
+
+
+@pytest.mark.parametrize("parquet", [False, True])
+def test_archive_moves_old_closed_tokens(backend, tmp_path, parquet):
+    parquet_dir = str(tmp_path) if parquet else None
+    backend.set(TOKENS_COL, "OLD", closed("OLD", 60))
+    backend.set(TOKENS_COL, "NEW", closed("NEW", 1))
+    assert TokenArchiver(backend, keep_days=30, parquet_dir=parquet_dir).run(NOW) == 1
+    assert backend.get(TOKENS_COL, "OLD") is None and backend.get(TOKENS_COL, "NEW") is not None
+    reader = ArchiveReader(backend, parquet_dir=parquet_dir)
+    assert reader.months() == ["2026_04"]
+    where, tok = reader.find("OLD")
+    assert tok["token_id"] == "OLD" and where != TOKENS_COL
+
+
+def test_parquet_without_pyarrow_fails_before_moving(backend, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    backend.set(TOKENS_COL, "OLD", closed("OLD", 60))
+    with pytest.raises(RuntimeError, match="pip install pyarrow"):
+        TokenArchiver(backend, parquet_dir=str(tmp_path)).run(NOW)
+    assert backend.get(TOKENS_COL, "OLD") is not None
+
+
+def test_archive_counts_months_in_the_move_and_skips_already_moved(backend):
+    for i in range(3):
+        backend.set(TOKENS_COL, f"T{i}", closed(f"T{i}", 60))
+    archiver = TokenArchiver(backend, keep_days=30, chunk=2)
+    assert archiver.run(NOW) == 3
+    assert backend.get(ARCHIVE_MONTHS_COL, "2026_04")["count"] == 3
+    # una segunda corrida no encuentra nada ni suma de más
+    assert archiver.run(NOW) == 0
+    assert backend.get(ARCHIVE_MONTHS_COL, "2026_04")["count"] == 3
+
+
+def test_parquet_part_is_published_only_after_the_commit(backend, tmp_path, monkeypatch):
+    backend.set(TOKENS_COL, "OLD", closed("OLD", 60))
+    archiver = TokenArchiver(backend, keep_days=30, parquet_dir=str(tmp_path))
+
+    def boom(fn):
+        raise RuntimeError("commit falló")
+
+    monkeypatch.setattr(backend, "run_transaction", boom)
+    with pytest.raises(RuntimeError):
+        archiver.run(NOW)
+    monkeypatch.undo()
+    assert backend.get(TOKENS_COL, "OLD") is not None
+    assert not list(tmp_path.rglob("*.parquet*"))
+
+    assert archiver.run(NOW) == 1
+    assert len(list(tmp_path.rglob("*.parquet"))) == 1
+    assert not list(tmp_path.rglob("*" + PENDING_SUFFIX))
+
+
+def test_stale_pending_parts_are_resolved_by_the_next_run(backend, tmp_path):
+    backend.set(TOKENS_COL, "KEPT", closed("KEPT", 60))
+    # corte después de confirmar: el token ya no está en caliente -> se publica
+    write_parquet([{**closed("GONE", 60)}], str(tmp_path), "2026_04")
+    # corte antes de confirmar: el token sigue en caliente -> se descarta y se vuelve a mover
+    write_parquet([{**closed("KEPT", 60)}], str(tmp_path), "2026_04")
+    archiver = TokenArchiver(backend, keep_days=30, parquet_dir=str(tmp_path))
+    assert archiver.recover_pending(older_than=time.time() + 1) == 1
+    assert not list(tmp_path.rglob("*" + PENDING_SUFFIX))
+    ids = sorted(r["token_id"] for r in read_parquet_month(str(tmp_path), "2026_04"))
+    assert ids == ["GONE"]
+
+
+def test_parquet_read_dedupes_by_token_id(tmp_path):
+    publish_parquet(write_parquet([closed("A", 60)], str(tmp_path), "2026_04"))
+    publish_parquet(write_parquet([closed("A", 60), closed("B", 60)], str(tmp_path), "2026_04"))
+    assert sorted(r["token_id"] for r in read_parquet_month(str(tmp_path), "2026_04")) == ["A", "B"]
+
+
+def test_months_are_cached_for_the_ttl(backend):
+    backend.set(TOKENS_COL, "OLD", closed("OLD", 60))
+    reader = ArchiveReader(backend)
+    assert reader.months() == []
+    TokenArchiver(backend, keep_days=30).run(NOW)
+    assert reader.months() == []  # todavía en caché
+    assert ArchiveReader(backend, months_ttl=0).months() == ["2026_04"]
+
+
+def test_sweeper_pass_archives_old_closed_tokens(backend):
+    from drop24.sweeper import TokenSweeper
+
+    backend.set(TOKENS_COL, "OLD", closed("OLD", 60))
+    sweeper = TokenSweeper(backend, clock=lambda: NOW, sleep=lambda s: None,
+                           archiver=TokenArchiver(backend, keep_days=30))
+    assert sweeper.run_once(NOW) == {"expired": 0, "used": 0, "archived": 1}
+    assert backend.get(TOKENS_COL, "OLD") is None
@@ -0,0 +1,78 @@
+import pytest
+
+from drop24 import passwords
+from drop24.auth import AuthService
+from drop24.passwords import hash_password
+from drop24.registration import user_doc
+from drop24.repository import UserStore
+
+
+class Clock:
+    t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture(autouse=True)
+def cheap_bcrypt(monkeypatch):
+    # costo 4 en las pruebas y sin re-hash en segundo plano
+    monkeypatch.setattr(passwords, "current_rounds", lambda: 4)
+
+
+@pytest.fixture
+def users(backend):
+    store = UserStore(backend)
+    payload = {"username": "ana", "full_name": "Ana", "phone": "5511112222", "email": "ana@example.com"}
+    assert store.register("ana", user_doc(payload, hash_password("secreto-123", rounds=4), None)) is None
+    return store
+
+
+def test_login_by_username_phone_and_email(users):
+    auth = AuthService(users)
+    for ident in ("ana", "ANA ", "55 1111 2222", "Ana@Example.com"):
+        res = auth.login(ident, "secreto-123")
+        assert res.ok, (ident, res)
+        assert res.user["username"] == "ana"
+    assert auth.login("ana", "mala").code == "bad_password"
+    assert auth.login("", "x").code == "missing"
+
+
+def test_per_user_throttle_counts_every_identifier(users):
+    clock = Clock()
+    auth = AuthService(users, per_user=(3, 30.0), clock=clock)
+    codes = [auth.login(ident, "mala").code for ident in ("ana", "5511112222", "ana@example.com", "ana")]
+    assert codes == ["bad_password"] * 3 + ["throttled"]
+    res = auth.login("ana", "secreto-123")
+    assert res.code == "throttled" and res.retry_after > 0
+    clock.t += 30
+    assert auth.login("ana", "secreto-123").ok
+
+
+def test_per_client_throttle(users):
+    auth = AuthService(users, per_client=(2, 60.0), clock=Clock())
+    assert [auth.login(f"nadie{i}", "x", client="ip1").code for i in range(3)] == ["no_user", "no_user", "throttled"]
+    assert auth.login("nadie9", "x", client="ip2").code == "no_user"
+
+
+def test_negative_cache_skips_reads_until_forget(users, backend):
+    clock = Clock()
+    auth = AuthService(users, negative_ttl=60, clock=clock)
+    assert auth.login("beto", "x").code == "no_user"
+
+    reads = []
+    real_get = backend.get
+    backend.get = lambda col, doc_id: reads.append(doc_id) or real_get(col, doc_id)
+    assert auth.login("BETO", "x").code == "no_user"
+    assert reads == []  # la cache negativa contestó
+
+    payload = {"username": "beto", "full_name": "Beto", "phone": "5533334444", "email": "beto@example.com"}
+    users.register("beto", user_doc(payload, hash_password("otra-clave", rounds=4), None))
+    assert auth.login("beto", "otra-clave").code == "no_user"  # aún en cache
+    auth.forget("beto")
+    assert auth.login("beto", "otra-clave").ok
+
+
+def test_inactive_user(users):
+    users.update("ana", {"active": False})
+    assert AuthService(users).login("ana", "secreto-123").code == "inactive"
@@ -0,0 +1,38 @@
+from benchmarks import bench_hot
+from drop24 import metrics
+from drop24.repository import TokenStore, UserStore
+from drop24.storage import LocalBackend
+
+RESULT = {"p50_ms": 1.0, "p95_ms": 2.0, "reads": 1, "writes": 0}
+
+
+def test_check_absolute_thresholds():
+    assert bench_hot.check({"a": RESULT}, {"a": {"reads": 1, "p95_ms": 2}}) == []
+    fails = bench_hot.check({"a": {**RESULT, "reads": 3}}, {"a": {"reads": 1}, "otro": {"reads": 0}})
+    assert fails == ["a: reads 3 > 1"]
+
+
+def test_check_regression_against_baseline():
+    base = {"a": RESULT}
+    assert bench_hot.check({"a": {**RESULT, "p50_ms": 1.2}}, {}, base, max_regression=0.25) == []
+    fails = bench_hot.check({"a": {**RESULT, "p50_ms": 1.3, "reads": 2}}, {}, base, max_regression=0.25)
+    assert len(fails) == 2 and fails[0].startswith("a: p50 1.3 ms") and fails[1].startswith("a: lecturas 2")
+    # un caso nuevo (sin baseline) no falla
+    assert bench_hot.check({"nuevo": RESULT}, {}, base) == []
+
+
+def test_measure_counts_document_reads_per_call():
+    backend = metrics.InstrumentedBackend(LocalBackend(":memory:"))
+    bench_hot.seed_tokens(backend, "cliente", 30)
+    store = TokenStore(backend)
+    r = bench_hot.measure(lambda i: store.active_for_user("cliente", bench_hot.NOW), 20)
+    assert r["n"] == 20 and r["reads"] == 1 and r["writes"] == 0
+    assert r["p50_ms"] <= r["p95_ms"]
+
+
+def test_seeded_users_are_found_through_the_app_indexes():
+    backend = metrics.InstrumentedBackend(LocalBackend(":memory:"))
+    bench_hot.seed_users(backend, 20)
+    store = UserStore(backend, page_ttl=0)
+    assert store.find("55 00000007")[0] == "user000007"
+    assert store.find("User000012@example.com")[0] == "user000012"
@@ -0,0 +1,50 @@
+"""Emisión masiva: solo buzón, y ZIP/PDF escritos en streaming."""
+import zipfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from drop24.bulk import SHEET_COLS, SHEET_ROWS, build_sheet_pdf, build_zip, iter_render, new_bulk_tokens
+
+NOW = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+
+
+def tokens(n, access_type="BZ"):
+    return new_bulk_tokens(n, access_type, NOW, NOW + timedelta(days=30), True, "DROP24",
+                           created_by="admin:bulk", batch_id="B1", created_at=NOW, dt_to_str=str)
+
+
+@pytest.mark.parametrize("access_type", ["L1", "L2"])
+def test_lockers_are_not_bulk_issued(access_type):
+    # un sticker de varios días no aparta horario: se saltaría el cupo del LockerLedger
+    with pytest.raises(ValueError):
+        tokens(3, access_type)
+
+
+def test_zip_consumes_images_as_it_writes():
+    toks = tokens(5)
+    consumed = []
+
+    def images():
+        for img in iter_render([x["payload"] for x in toks], "png"):
+            consumed.append(1)
+            yield img
+
+    out = build_zip(toks, images())
+    assert len(consumed) == 5
+    with zipfile.ZipFile(out) as zf:
+        names = zf.namelist()
+        assert names[-1] == "tokens.csv" and len(names) == 6
+        assert zf.read(f"DROP24_QR_{toks[0]['token_id']}.png").startswith(b"\x89PNG")
+        assert len(zf.read("tokens.csv").decode().splitlines()) == 6
+
+
+def test_sheet_pdf_has_one_page_per_grid(tmp_path):
+    from PIL import PdfParser
+
+    per_page = SHEET_COLS * SHEET_ROWS
+    toks = tokens(per_page + 1)
+    path = tmp_path / "lote.pdf"
+    with open(path, "wb") as out:
+        build_sheet_pdf(toks, iter_render([x["payload"] for x in toks], "png1"), out=out)
+    assert len(PdfParser.PdfParser(str(path)).pages) == 2
@@ -0,0 +1,44 @@
+"""Cada consulta compuesta del directorio admin debe tener su índice en firestore.indexes.json."""
+import itertools
+import json
+import os
+
+import pytest
+
+from drop24.repository import USER_ORDER_FIELDS, USERS_COL, UserStore
+
+INDEXES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "firestore.indexes.json")
+
+
+def declared(collection):
+    with open(INDEXES, encoding="utf-8") as f:
+        data = json.load(f)
+    out = set()
+    for ix in data["indexes"]:
+        if ix["collectionGroup"] == collection:
+            *eq, last = ix["fields"]
+            out.add((frozenset(x["fieldPath"] for x in eq), last["fieldPath"], last["order"]))
+    return out
+
+
+class Recorder:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, col, where=(), order_by=(), limit=None, start_after=None):
+        self.queries.append((col, list(where), list(order_by)))
+        return []
+
+
+@pytest.mark.parametrize("active, borough, cp", list(itertools.product([None, True], ["", "Tlalpan"], ["", "04000"])))
+def test_admin_directory_queries_have_indexes(active, borough, cp):
+    have = declared(USERS_COL)
+    for order, desc in itertools.product(USER_ORDER_FIELDS, [True, False]):
+        rec = Recorder()
+        UserStore(rec, page_ttl=0).page(active=active, borough=borough, postal_code=cp, order=order, desc=desc)
+        (_, where, order_by), = rec.queries
+        eq = frozenset(f for f, op, _ in where if op == "==")
+        if not eq:
+            continue  # solo orden: índice automático de un campo
+        field, direction = order_by[0]
+        assert (eq, field, "DESCENDING" if direction == "desc" else "ASCENDING") in have, (sorted(eq), order_by)
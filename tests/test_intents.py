@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+from drop24.helpdesk import MATCHER
+from drop24.intents import Intent, IntentMatcher, fold
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "help_corpus.jsonl")
+
+
+def corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_fold():
+    assert fold("  ¿Cuánto   cuesta el BUZÓN? ") == "¿cuanto cuesta el buzon?"
+    assert fold("Piñata") == "pinata"
+
+
+@pytest.mark.parametrize("case", corpus(), ids=lambda c: c["q"][:30])
+def test_faq_corpus(case):
+    m = MATCHER.match(case["q"])
+    assert (m.intent.name if m.intent else None) == case["intent"]
+
+
+def test_prefix_match_at_word_start_only():
+    m = IntentMatcher([Intent("qr", {"qr": 2}, "qr"), Intent("precio", {"precio": 2}, "precio")])
+    assert m.match("mis QRs").intent.name == "qr"
+    assert m.match("precios").intent.name == "precio"
+    assert m.match("sqrt de 2").intent is None
+
+
+def test_weights_threshold_and_ties():
+    intents = [
+        Intent("a", {"lavar": 1, "cuanto": 0.5}, "A"),
+        Intent("b", {"lavar": 1}, "B"),
+    ]
+    m = IntentMatcher(intents, default="?", min_score=1.0)
+    assert m.match("cuanto").intent is None  # pista débil sola no alcanza
+    assert m.answer("cuanto") == "?"
+    assert m.match("lavar").intent.name == "a"  # empate: la declarada primero
+    assert m.match("cuanto por lavar").score == 1.5
+
+
+def test_longest_phrase_wins():
+    m = IntentMatcher([Intent("dejar", {"dejar": 1}, "d"), Intent("dejar_ropa", {"dejar ropa": 2}, "r")])
+    assert m.match("quiero dejar ropa").intent.name == "dejar_ropa"
+
+
+def test_callable_answers_get_context():
+    m = IntentMatcher([Intent("p", {"precio": 2}, lambda p: f"${p['x']}")], default=lambda p: "sin tema")
+    assert m.answer("precio", {"x": 10}) == "$10"
+    assert m.answer("hola", {"x": 10}) == "sin tema"
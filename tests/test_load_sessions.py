@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("streamlit.testing.v1")
+
+from benchmarks import load_sessions  # noqa: E402
+
+
+@pytest.fixture
+def secrets(tmp_path):
+    import streamlit as st
+
+    st.cache_resource.clear()
+    yield {"storage_backend": "sqlite", "sqlite_path": str(tmp_path / "load.db"), "token_sweeper_every": 0}
+    st.cache_resource.clear()
+
+
+def test_pct():
+    vals = list(range(100))
+    assert load_sessions._pct(vals, 0.95) == 95 and load_sessions._pct(vals, 1.0) == 99
+    assert load_sessions._pct([], 0.5) == 0.0
+
+
+def test_run_level_drives_the_whole_flow(secrets):
+    keep = []
+    r = load_sessions.run_level(2, 2, secrets, timeout=60, keep=keep)
+    assert (r["ok"], r["errors"]) == (2, 0), r["error_samples"]
+    assert len(keep) == 2
+    assert list(r["steps"]) == list(load_sessions.STEPS)
+    # list_qrs y chat corren dos veces por sesión (al abrir la pestaña y después de la acción)
+    assert r["steps"]["open"]["n"] == 2 and r["steps"]["list_qrs"]["n"] == 4 and r["steps"]["chat"]["n"] == 4
+    assert all(s["p50_ms"] >= s["service_p50_ms"] for s in r["steps"].values())
+    assert "2/2 sesiones ok" in load_sessions.format_level(r)
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from drop24 import logo
+from drop24.markup import HOW_IT_WORKS_HTML, closing_html, compact_html, logo_html
+
+
+def test_compact_html_collapses_whitespace_to_one_line():
+    html = """
+        <div class="card">
+            <b>Hola</b>\t mundo
+        </div>
+    """
+    assert compact_html(html) == '<div class="card"> <b>Hola</b> mundo </div>'
+
+
+def test_static_blocks_are_single_line():
+    # una línea en blanco cortaría el bloque HTML en Markdown
+    assert "\n" not in HOW_IT_WORKS_HTML
+    assert HOW_IT_WORKS_HTML.count('<div class="card">') == 8
+
+
+def test_logo_html_with_src_and_text_fallback():
+    assert logo_html("app/static/x.svg?v=1") == '<img class="corp-logo" src="app/static/x.svg?v=1" alt="Drop24" />'
+    fallback = logo_html("")
+    assert "<img" not in fallback and "DROP24" in fallback
+
+
+def test_closing_html_embeds_logo_and_year():
+    out = closing_html(logo_html(""), 2026, "DROP24")
+    assert "\n" not in out
+    assert out.count("DROP24</div>") == 2
+    assert "© 2026 · DROP24" in out
+
+
+@pytest.fixture
+def app_dir(tmp_path):
+    (tmp_path / logo.STATIC_DIR).mkdir()
+    logo.logo_src.cache_clear()
+    yield tmp_path
+    logo.logo_src.cache_clear()
+
+
+def test_logo_src_precedence(app_dir):
+    d = str(app_dir)
+    assert logo.logo_src(d) == ""
+    (app_dir / logo.STATIC_DIR / logo.DEFAULT).write_text("<svg/>")
+    logo.logo_src.cache_clear()
+    assert logo.logo_src(d).startswith(f"app/static/{logo.DEFAULT}?v=")
+    assert logo.logo_src(d, " https://cdn/x.png ") == "https://cdn/x.png"
+    (app_dir / logo.STATIC_DIR / logo.OPTIMIZED).write_bytes(b"webp")
+    logo.logo_src.cache_clear()
+    assert logo.logo_src(d, "https://cdn/x.png").startswith(f"app/static/{logo.OPTIMIZED}?v=")
+
+
+def test_optimize_scales_to_target_height(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    src = tmp_path / "logo.png"
+    Image.new("RGB", (400, 200), "white").save(src)
+    out = tmp_path / "static" / "logo.webp"
+    assert logo.optimize(str(src), str(out)) == os.path.getsize(out)
+    with Image.open(out) as img:
+        assert img.format == "WEBP" and img.size == (176, logo.TARGET_HEIGHT)
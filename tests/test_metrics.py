@@ -0,0 +1,45 @@
+"""Spans del backend instrumentado."""
+import pytest
+
+from drop24 import metrics
+from drop24.metrics import InstrumentedBackend
+from drop24.storage import LocalBackend
+
+
+@pytest.fixture(autouse=True)
+def _clean():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _rows():
+    return {(r["op"], r["col"]): r for r in metrics.snapshot()}
+
+
+def test_txn_writes_count_on_the_transaction_span(backend):
+    ib = InstrumentedBackend(backend)
+    backend.set("c", "a", {"n": 1})
+
+    def fn(t):
+        doc = t.get("c", "a")
+        t.set("c", "b", {"n": doc["n"] + 1})
+        t.update("c", "a", {"n": 2})
+
+    ib.run_transaction(fn)
+    rows = _rows()
+    # las escrituras encoladas no son muestras de latencia propias
+    assert not [k for k in rows if k[0].startswith("db.txn_") and k[0] != "db.txn_get"]
+    assert rows[("db.transaction", "")]["count"] == 1
+    assert rows[("db.transaction", "")]["writes"] == 2
+    assert rows[("db.txn_get", "c")]["reads"] == 1
+    assert backend.get("c", "b") == {"n": 2}
+
+
+def test_run_counts_txn_writes():
+    b = InstrumentedBackend(LocalBackend(":memory:"))
+    run = metrics.start_run("s", "p")
+    b.run_transaction(lambda t: t.create("c", "x", {"n": 1}))
+    metrics.finish_run(run)
+    assert run.writes == 1
+    assert run.ops["db.transaction"][0] == 1
@@ -0,0 +1,28 @@
+import logging
+
+from drop24 import passwords
+from drop24.passwords import DEFAULT_ROUNDS, calibrate_rounds, check_password, hash_password, hash_rounds
+
+
+def test_hash_and_check():
+    h = hash_password("secreto-123", rounds=4)
+    assert hash_rounds(h) == 4
+    assert check_password("secreto-123", h)
+    assert not check_password("otra", h)
+    assert not check_password("secreto-123", "no-es-bcrypt")
+
+
+def test_calibration_never_goes_below_default():
+    # un objetivo imposible de bajo equivale a hardware muy lento
+    assert calibrate_rounds(target_ms=0.001) >= DEFAULT_ROUNDS
+
+
+def test_rehash_failure_is_logged(caplog, monkeypatch):
+    monkeypatch.setattr(passwords, "current_rounds", lambda: 4)
+
+    def boom(new_hash):
+        raise ConnectionError("backend caído")
+
+    with caplog.at_level(logging.ERROR, logger="drop24.passwords"):
+        passwords.rehash_async("secreto-123", boom).result()
+    assert "re-hash" in caplog.text
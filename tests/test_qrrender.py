@@ -0,0 +1,55 @@
+"""Render de QRs: mismos pixeles que qrcode/Pillow, formatos compactos y cache."""
+import io
+
+import pytest
+
+from drop24.qrrender import MIME, make_qr_png_bytes, qr_matrix, render_qr
+
+PAYLOAD = "DROP24|ABC123DEF456"
+
+
+def _pixels(png: bytes):
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(png)).convert("L")
+    return img.size, img.tobytes()
+
+
+def test_png_matches_qrcode_image():
+    qrcode = pytest.importorskip("qrcode")
+    qr = qrcode.QRCode(version=None, error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=10, border=2)
+    qr.add_data(PAYLOAD)
+    qr.make(fit=True)
+    bio = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(bio, format="PNG")
+    assert _pixels(make_qr_png_bytes(PAYLOAD)) == _pixels(bio.getvalue())
+
+
+def test_png1_is_one_pixel_per_module():
+    n = len(qr_matrix(PAYLOAD))
+    size, pixels = _pixels(render_qr(PAYLOAD, "png1"))
+    assert size == (n, n)
+    assert pixels[:n] == b"\xff" * n  # el borde es blanco
+    assert len(render_qr(PAYLOAD, "png1")) < len(render_qr(PAYLOAD, "png"))
+
+
+def test_svg_is_a_single_path():
+    svg = render_qr(PAYLOAD, "svg", box_size=4).decode("utf-8")
+    n = len(qr_matrix(PAYLOAD))
+    assert svg.count("<path") == 1
+    assert f'width="{n * 4}"' in svg and f'viewBox="0 0 {n} {n}"' in svg
+    assert set(MIME) == {"png", "png1", "svg"}
+
+
+def test_renders_are_cached_per_options():
+    render_qr.cache_clear()
+    a = render_qr(PAYLOAD, "png")
+    assert render_qr(PAYLOAD, "png") is a
+    assert render_qr(PAYLOAD, "svg") is not a
+    info = render_qr.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        render_qr(PAYLOAD, "gif")
@@ -0,0 +1,100 @@
+"""Firma de payloads QR: verificación offline, manipulación y rotación de claves."""
+import base64
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from drop24.qrsign import InvalidQR, QRSigner, split_payload
+
+NOW = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+K1 = base64.b64encode(b"1" * 32).decode()
+K2 = base64.b64encode(b"2" * 32).decode()
+
+
+def sign(signer, token_id="ABC123DEF456", one_time=True):
+    return signer.sign("DROP24", token_id, "BZ", NOW, NOW + timedelta(minutes=30), one_time)
+
+
+def test_sign_and_verify_roundtrip():
+    signer = QRSigner({"k1": K1}, "k1")
+    payload = sign(signer)
+    assert payload.startswith("DROP24|ABC123DEF456|s2.k1.")
+    c = signer.verify(payload)
+    assert c.signed and c.kid == "k1"
+    assert (c.prefix, c.token_id, c.access_type, c.one_time) == ("DROP24", "ABC123DEF456", "BZ", True)
+    assert (c.start_ts, c.end_ts) == (NOW, NOW + timedelta(minutes=30))
+    assert signer.verify(sign(signer, one_time=False)).one_time is False
+
+
+def test_naive_datetimes_are_utc():
+    signer = QRSigner({"k1": K1}, "k1")
+    naive = signer.sign("DROP24", "T1", "BZ", NOW.replace(tzinfo=None), NOW.replace(tzinfo=None), True)
+    assert signer.verify(naive).start_ts == NOW
+
+
+def _swap(s: str, i: int) -> str:
+    return s[:i] + ("A" if s[i] != "A" else "B") + s[i + 1:]
+
+
+@pytest.mark.parametrize("part", ["prefix", "token", "body", "sig"])
+def test_tampered_payload_is_rejected(part):
+    signer = QRSigner({"k1": K1}, "k1")
+    prefix, token_id, sig_part = split_payload(sign(signer))
+    version, kid, body, sig = sig_part.split(".")
+    if part == "prefix":
+        prefix = "DROP25"
+    elif part == "token":
+        token_id = "ABC123DEF457"
+    elif part == "body":
+        body = _swap(body, 3)
+    else:
+        sig = _swap(sig, 0)
+    with pytest.raises(InvalidQR):
+        signer.verify(f"{prefix}|{token_id}|{version}.{kid}.{body}.{sig}")
+
+
+def test_other_key_or_unknown_kid_is_rejected():
+    payload = sign(QRSigner({"k1": K1}, "k1"))
+    with pytest.raises(InvalidQR, match="firma"):
+        QRSigner({"k1": K2}, "k1").verify(payload)
+    with pytest.raises(InvalidQR, match="kid"):
+        QRSigner({"k2": K2}, "k2").verify(payload)
+
+
+@pytest.mark.parametrize("payload", [
+    "DROP24|T1|s2.k1.abc",
+    "DROP24|T1|s3.k1.abc.def",
+    "DROP24||s2.k1.abc.def",
+])
+def test_malformed_payload_is_rejected(payload):
+    with pytest.raises(InvalidQR):
+        QRSigner({"k1": K1}, "k1").verify(payload)
+
+
+@pytest.mark.parametrize("payload, token_id", [("DROP24|abc123", "ABC123"), ("ABC123", "ABC123"), ("DROP24|T1|", "T1")])
+def test_legacy_payload_is_unsigned(payload, token_id):
+    c = QRSigner({"k1": K1}, "k1").verify(payload)
+    assert not c.signed
+    assert c.token_id == token_id
+    assert c.end_ts is None
+
+
+def test_rotation_keeps_old_qrs_valid():
+    old = sign(QRSigner({"k1": K1}, "k1"))
+    rotated = QRSigner({"k1": K1, "k2": K2}, "k2")
+    assert rotated.verify(old).kid == "k1"
+    new = sign(rotated)
+    assert ".k2." in new and rotated.verify(new).kid == "k2"
+    # ya retirada k1: los QRs viejos dejan de validar offline
+    with pytest.raises(InvalidQR):
+        QRSigner({"k2": K2}, "k2").verify(old)
+
+
+def test_from_config():
+    assert QRSigner.from_config(None) is None
+    assert QRSigner.from_config({"keys": {}}) is None
+    signer = QRSigner.from_config({"keys": {"k1": K1, "k2": K2}})
+    assert signer.active_kid == "k1"
+    assert QRSigner.from_config({"active": "k2", "keys": {"k1": K1, "k2": K2}}).active_kid == "k2"
+    with pytest.raises(ValueError):
+        QRSigner({"k1": K1}, "k9")
@@ -0,0 +1,136 @@
+"""Alta de usuarios: índices de unicidad de teléfono y email."""
+import pytest
+
+from drop24.migrate_user_index import backfill_user_index
+from drop24.registration import DEFAULTS, clean_payload, normalize_phone, validate
+from drop24.repository import (
+    EMAIL_INDEX_COL, PHONE_INDEX_COL, USERS_COL, UserStore, canonical_identifier, email_key,
+)
+from drop24.storage import AlreadyExists
+
+
+def doc(username, phone="5512345678", email=None):
+    return {"username": username, "phone": phone, "email": email or f"{username}@mail.com"}
+
+
+@pytest.fixture
+def users(backend):
+    return UserStore(backend)
+
+
+def test_register_claims_indexes(users, backend):
+    assert users.register("ana", doc("ana")) is None
+    assert backend.get(PHONE_INDEX_COL, "5512345678") == {"username": "ana", "created_at": None}
+    assert backend.get(EMAIL_INDEX_COL, "ana@mail.com")["username"] == "ana"
+
+
+@pytest.mark.parametrize("data, what", [
+    (doc("ana", phone="5599999999", email="otra@mail.com"), "username"),
+    (doc("beto", email="otra@mail.com"), "phone"),
+    (doc("beto", phone="5599999999", email="ana@mail.com"), "email"),
+])
+def test_register_reports_what_collided(users, backend, data, what):
+    users.register("ana", doc("ana"))
+    assert users.register(data["username"], data) == what
+    # nada a medias
+    assert backend.get(PHONE_INDEX_COL, "5599999999") is None
+
+
+def test_stale_index_of_same_username_is_reported(users, backend):
+    # índice que quedó de una baja a medias: apunta a "ana", pero "ana" ya no existe
+    backend.set(EMAIL_INDEX_COL, "ana@mail.com", {"username": "ana"})
+    assert users.register("ana", doc("ana")) == "email"
+    assert backend.get(USERS_COL, "ana") is None
+
+
+def test_register_retries_once_then_raises(users, backend, monkeypatch):
+    # choca pero al leer ya no hay nada (p. ej. se borró entre el commit y la lectura)
+    monkeypatch.setattr(backend, "_commit", lambda writes: (_ for _ in ()).throw(AlreadyExists("x")))
+    with pytest.raises(AlreadyExists):
+        users.register("ana", doc("ana"))
+
+
+@pytest.mark.parametrize("email, key", [
+    (" Ana@Mail.com ", "ana@mail.com"),
+    ("a/b@x.com", "a%2Fb@x.com"),
+    ("a%2fb@x.com", "a%252fb@x.com"),
+    (".", "%2E"),
+    ("..", "%2E%2E"),
+    ("__ana__", "%5F_ana__"),
+    ("", ""),
+])
+def test_email_key_is_a_valid_doc_id(email, key):
+    assert email_key(email) == key
+
+
+def test_email_key_hashes_past_1500_bytes():
+    long = "ñ" * 800 + "@mail.com"
+    key = email_key(long)
+    assert key.startswith("%H") and len(key) == 66
+    assert key != email_key("ñ" + long)
+    assert email_key("a" * 1500) == "a" * 1500
+
+
+@pytest.mark.parametrize("raw, phone", [
+    ("55 1234 5678", "5512345678"),
+    ("+52 55 1234 5678", "5512345678"),
+    ("+52 1 (55) 1234-5678", "5512345678"),
+    ("5215512345678", "5512345678"),
+    ("52 1234 5678", "5212345678"),  # 10 dígitos que empiezan con 52: se quedan
+    ("+1 555 123 4567", "15551234567"),
+])
+def test_normalize_phone_drops_country_prefix(raw, phone):
+    assert normalize_phone(raw) == phone
+
+
+def test_phone_with_prefix_registers_and_resolves_the_same(users):
+    data = clean_payload({"username": "ana", "phone": "+52 1 55 1234 5678", "email": "ana@mail.com"})
+    assert users.register("ana", data) is None
+    assert users.resolve("55-1234-5678") == "ana"
+    assert users.resolve("+525512345678") == "ana"
+    assert canonical_identifier("+52 55 1234 5678") == canonical_identifier("5512345678")
+    assert users.register("beto", doc("beto", phone="5512345678")) == "phone"
+
+
+def _payload(**over):
+    base = {
+        "username": "ana", "full_name": "Ana", "phone": "5512345678", "email": "ana@mail.com",
+        "street": "Calle", "ext_number": "1", "neighborhood": "Centro", "borough": "Tlalpan",
+        "postal_code": "14000",
+    }
+    return clean_payload({**base, **over}, DEFAULTS)
+
+
+@pytest.mark.parametrize("username, ok", [
+    ("ana", True),
+    ("ana_2026", True),
+    ("1234567", True),
+    ("ana@mail.com", False),
+    ("12345678", False),
+    ("55-1234-5678", False),
+])
+def test_validate_rejects_usernames_that_look_like_email_or_phone(username, ok):
+    problem = validate(_payload(username=username), "secreto-123")
+    assert (problem is None) == ok
+
+
+def test_user_index_migration_canonicalizes_phone_and_drops_legacy_keys(backend):
+    # guardados antes de quitar la lada: teléfono e índice con 52/521
+    backend.set(USERS_COL, "ana", doc("ana", phone="5215512345678"))
+    backend.set(PHONE_INDEX_COL, "5215512345678", {"username": "ana"})
+    backend.set(USERS_COL, "beto", doc("beto", phone="525587654321"))
+    backend.set(PHONE_INDEX_COL, "525587654321", {"username": "otro"})  # no es de beto: se queda
+    backend.set(USERS_COL, "caro", doc("caro", phone="3312345678"))
+
+    created, dups = backfill_user_index(backend, chunk=2)
+    assert dups == []
+    assert created == 6
+    assert backend.get(USERS_COL, "ana")["phone"] == "5512345678"
+    assert backend.get(USERS_COL, "beto")["phone"] == "5587654321"
+    assert backend.get(PHONE_INDEX_COL, "5215512345678") is None
+    assert backend.get(PHONE_INDEX_COL, "525587654321") == {"username": "otro"}
+    assert backend.get(PHONE_INDEX_COL, "5512345678")["username"] == "ana"
+    assert UserStore(backend).resolve("+52 1 55 1234 5678") == "ana"
+    # caro ya estaba en forma canónica: solo gana sus índices
+    assert backend.get(PHONE_INDEX_COL, "3312345678")["username"] == "caro"
+    assert backend.get(EMAIL_INDEX_COL, "caro@mail.com")["username"] == "caro"
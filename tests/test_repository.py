@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from drop24.migrate_active_qr import backfill_active_pointers
+from drop24.repository import ACTIVE_COL, TOKENS_COL, LockerLedger, SlotUnavailable, TokenStore
+
+NOW = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+
+
+def token(tid, user, minutes=30, access_type="BZ", **extra):
+    return {
+        "token_id": tid, "created_by": user, "access_type": access_type,
+        "start_ts": NOW - timedelta(minutes=5), "end_ts": NOW + timedelta(minutes=minutes),
+        "one_time": True, "used": False, "active": True, "created_at": NOW, **extra,
+    }
+
+
+def test_issue_keeps_one_active_qr(backend):
+    tokens = TokenStore(backend)
+    assert tokens.issue("A1", token("A1", "ana"), NOW) is None
+    current = tokens.issue("A2", token("A2", "ana"), NOW)
+    assert current["token_id"] == "A1"
+    assert tokens.get("A2") is None
+
+
+def test_backfill_points_legacy_tokens(backend):
+    # tokens de antes del puntero: solo el doc del token
+    backend.set(TOKENS_COL, "OLD1", token("OLD1", "ana", minutes=10))
+    backend.set(TOKENS_COL, "OLD2", token("OLD2", "ana", minutes=40))
+    backend.set(TOKENS_COL, "USED", token("USED", "beto", used=True))
+    backend.set(TOKENS_COL, "GONE", token("GONE", "caro", minutes=-10))
+
+    # bloques de 1: el puntero de ana se escribe con OLD1 y luego avanza a OLD2
+    written, multi = backfill_active_pointers(backend, NOW, chunk=1)
+    assert written == 2
+    assert multi == {"ana": 2}
+    assert backend.get(ACTIVE_COL, "ana")["token_id"] == "OLD2"
+    assert backend.get(ACTIVE_COL, "beto") is None
+    assert backend.get(ACTIVE_COL, "caro") is None
+    # con el puntero ya no se puede sacar otro QR
+    assert TokenStore(backend).issue("NEW", token("NEW", "ana"), NOW)["token_id"] == "OLD2"
+    # segunda corrida: ya quedó
+    assert backfill_active_pointers(backend, NOW) == (0, {})
+
+
+def locker_token(tid, user, day="2026-06-01", slot="19:00-20:00", **extra):
+    return token(tid, user, access_type="L1", locker_day=day, locker_slot=slot, **extra)
+
+
+def test_deactivate_frees_locker_slot(backend):
+    tokens, ledger = TokenStore(backend), LockerLedger(backend)
+    assert tokens.issue("L1A", locker_token("L1A", "ana"), NOW, ledger=ledger) is None
+    with pytest.raises(SlotUnavailable):
+        tokens.issue("L1B", locker_token("L1B", "beto"), NOW, ledger=ledger)
+    assert tokens.deactivate("L1A", NOW)
+    assert ledger.availability("L1", "2026-06-01", ["19:00-20:00"]) == {"19:00-20:00": 1}
+    assert tokens.issue("L1B", locker_token("L1B", "beto"), NOW, ledger=ledger) is None
+
+
+def test_release_only_frees_own_hold(backend):
+    ledger = LockerLedger(backend, default_capacity=2)
+    ledger.claim("L1", "2026-06-01", "19:00-20:00", "A", NOW)
+    slot_id = LockerLedger.slot_of(locker_token("A", "ana"))
+    assert not ledger.release(slot_id, "B", NOW)
+    assert ledger.release(slot_id, "A", NOW)
+    assert not ledger.release(slot_id, "A", NOW)
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+from drop24 import revocation
+from drop24.revocation import BloomFilter, RevocationFeed, RevocationSet
+
+NOW = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+
+
+def test_bloom_has_no_false_negatives():
+    bloom = BloomFilter.for_capacity(1000, 0.01)
+    ids = [f"T{i:06d}" for i in range(1000)]
+    for tid in ids:
+        bloom.add(tid)
+    again = BloomFilter.from_dict(bloom.to_dict())
+    assert all(tid in again for tid in ids)
+    false_pos = sum(f"X{i:06d}" in again for i in range(10000))
+    assert false_pos < 300
+
+
+def test_deltas_apply_in_order_and_once(backend):
+    feed = RevocationFeed(backend)
+    assert feed.revoke(["A", "B"], NOW, expires_at=NOW + timedelta(hours=1)) == 1
+    assert feed.revoke(["B", "C"], NOW, expires_at=NOW + timedelta(hours=2)) == 2
+    rs = RevocationSet()
+    assert rs.sync(feed, NOW) == ["A", "B", "C"]
+    assert rs.sync(feed, NOW) == []
+    assert rs.version == 2
+    assert rs.status("A") == "revoked" and rs.status("Z") == "ok"
+
+
+def test_exact_set_is_pruned_after_expiry(backend):
+    feed = RevocationFeed(backend)
+    feed.revoke(["A"], NOW, expires_at=NOW + timedelta(hours=1))
+    feed.revoke(["B"], NOW, expires_at=NOW + timedelta(hours=3))
+    feed.revoke(["A"], NOW, expires_at=NOW + timedelta(hours=2))  # revocado otra vez, más lejos
+    rs = RevocationSet()
+    rs.sync(feed, NOW)
+    rs.sync(feed, NOW + timedelta(minutes=90))
+    assert set(rs.exact) == {"A", "B"}
+    rs.sync(feed, NOW + timedelta(hours=2))
+    assert set(rs.exact) == {"B"}
+    assert rs.status("A") == "ok"
+
+
+def test_snapshot_covers_only_live_revocations(backend):
+    feed = RevocationFeed(backend)
+    feed.revoke(["OLD"], NOW - timedelta(days=1), expires_at=NOW - timedelta(hours=1))
+    feed.revoke(["LIVE"], NOW, expires_at=NOW + timedelta(hours=1))
+    snap = feed.publish_snapshot(NOW)
+    assert snap["count"] == 1
+    rs = RevocationSet()
+    rs.load_snapshot(feed.get_snapshot())
+    assert rs.version == 2
+    assert rs.status("LIVE") == "maybe"
+
+
+def test_snapshot_pages_through_live_deltas(backend, monkeypatch):
+    monkeypatch.setattr(revocation, "DELTA_PAGE", 2)
+    feed = RevocationFeed(backend)
+    for i in range(5):
+        feed.revoke([f"T{i}"], NOW, expires_at=NOW + timedelta(hours=i + 1))
+    snap = feed.publish_snapshot(NOW)
+    assert snap["count"] == 5 and snap["version"] == 5
+
+
+def test_deactivations_publish_the_snapshot_at_most_every_interval(backend):
+    feed = RevocationFeed(backend)
+    feed.revoke(["A"], NOW, expires_at=NOW + timedelta(hours=1))
+    assert feed.maybe_publish_snapshot(NOW)["count"] == 1
+    assert feed.maybe_publish_snapshot(NOW + timedelta(minutes=1)) is None  # sin versiones nuevas
+
+    feed.revoke(["B"], NOW, expires_at=NOW + timedelta(hours=1))
+    assert feed.maybe_publish_snapshot(NOW + timedelta(minutes=1)) is None  # muy pronto
+    later = NOW + timedelta(seconds=revocation.SNAPSHOT_EVERY_SECONDS)
+    assert feed.maybe_publish_snapshot(later)["count"] == 2
+    assert feed.get_snapshot()["version"] == 2
@@ -0,0 +1,26 @@
+import os
+
+from drop24.startup import parse_importtime, profile
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "App.py")
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        900 | drop24.storage
+import time:       200 |        600 |   drop24.metrics
+import time:       500 |       1500 | streamlit
+import time:        50 |         50 | streamlit.testing
+"""
+
+
+def test_parse_importtime_sums_top_level_imports_by_root_package():
+    assert parse_importtime(IMPORTTIME) == {"drop24": 900, "streamlit": 1550}
+
+
+def test_first_run_does_not_load_heavy_modules():
+    # los importa solo el flujo que los usa (tabla, QR, Parquet, Firestore)
+    r = profile(APP)
+    assert r["exception"] == []
+    loaded = [m for m, on in r["loaded"].items() if on and m != "bcrypt"]
+    assert loaded == []
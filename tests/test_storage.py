@@ -0,0 +1,100 @@
+"""Contrato del Backend: LocalBackend y FirestoreBackend (emulador) deben responder igual."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from drop24.storage import AlreadyExists, NotFound, cursor_after
+
+T0 = datetime(2026, 6, 1, 12, 0, tzinfo=timezone.utc)
+COL = "parity_docs"
+
+
+def _seed(b):
+    batch = b.batch()
+    for i in range(10):
+        batch.set(COL, f"d{i:02d}", {
+            "owner": "ana" if i % 2 == 0 else "beto",
+            "n": i,
+            "ts": T0 + timedelta(minutes=i),
+            "address": {"borough": "Tlalpan" if i < 5 else "Coyoacán"},
+        })
+    assert batch.commit() == 10
+
+
+def test_get_set_update_delete(any_backend):
+    b = any_backend
+    assert b.get(COL, "x") is None
+    b.set(COL, "x", {"a": 1, "nested": {"b": 2}, "ts": T0})
+    assert b.get(COL, "x") == {"a": 1, "nested": {"b": 2}, "ts": T0}
+    b.update(COL, "x", {"nested.b": 3})
+    assert b.get(COL, "x")["nested"] == {"b": 3}
+    b.set(COL, "x", {"nested": {"c": 4}}, merge=True)
+    assert b.get(COL, "x")["nested"] == {"b": 3, "c": 4}
+    b.delete(COL, "x")
+    assert b.get(COL, "x") is None
+
+
+def test_create_and_update_errors(any_backend):
+    b = any_backend
+    b.create(COL, "y", {"a": 1})
+    with pytest.raises(AlreadyExists):
+        b.create(COL, "y", {"a": 2})
+    with pytest.raises(NotFound):
+        b.update(COL, "nope", {"a": 1})
+
+
+def test_get_many_skips_missing(any_backend):
+    b = any_backend
+    _seed(b)
+    got = b.get_many(COL, ["d01", "d03", "zz", "d01"])
+    assert sorted(got) == ["d01", "d03"]
+
+
+def test_query_filters_order_limit(any_backend):
+    b = any_backend
+    _seed(b)
+    docs = b.query(COL, where=[("owner", "==", "ana"), ("n", ">", 2)], order_by=[("n", "desc")], limit=2)
+    assert [d.id for d in docs] == ["d08", "d06"]
+    docs = b.query(COL, where=[("address.borough", "==", "Tlalpan")], order_by=[("ts", "asc")])
+    assert [d.data["n"] for d in docs] == [0, 1, 2, 3, 4]
+
+
+def test_cursor_pages_cover_everything_once(any_backend):
+    b = any_backend
+    _seed(b)
+    order_by = [("owner", "asc"), ("n", "desc")]
+    seen, cursor = [], None
+    while True:
+        docs = b.query(COL, order_by=order_by, limit=3, start_after=cursor)
+        seen += [d.id for d in docs]
+        if len(docs) < 3:
+            break
+        cursor = cursor_after(docs[-1], order_by)
+    assert seen == ["d08", "d06", "d04", "d02", "d00", "d09", "d07", "d05", "d03", "d01"]
+
+
+def test_create_batch_is_all_or_nothing(any_backend):
+    b = any_backend
+    b.set(COL, "taken", {"a": 1})
+    batch = b.batch().create(COL, "new", {"a": 1}).create(COL, "taken", {"a": 2})
+    with pytest.raises(AlreadyExists):
+        batch.commit()
+    assert b.get(COL, "new") is None
+    assert b.get(COL, "taken") == {"a": 1}
+
+
+def test_transaction_reads_then_writes(any_backend):
+    b = any_backend
+    b.set(COL, "counter", {"n": 1})
+
+    def _txn(t):
+        n = t.get(COL, "counter")["n"]
+        t.update(COL, "counter", {"n": n + 1})
+        t.create(COL, "log", {"n": n})
+        return n
+
+    assert b.run_transaction(_txn) == 1
+    assert b.get(COL, "counter") == {"n": 2}
+    with pytest.raises(AlreadyExists):
+        b.run_transaction(_txn)
+    assert b.get(COL, "counter") == {"n": 2}
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from drop24.repository import LockerLedger, TokenStore
+from drop24.sweeper import LeaseLost, TokenSweeper
+
+NOW = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+
+
+def token(tid, end, **extra):
+    return {
+        "token_id": tid, "created_by": f"u{tid}", "access_type": "BZ",
+        "start_ts": end - timedelta(minutes=15), "end_ts": end,
+        "one_time": True, "used": False, "active": True, "created_at": NOW, **extra,
+    }
+
+
+def sweeper(backend, **kw):
+    return TokenSweeper(backend, max_writes_per_sec=0, clock=lambda: NOW, **kw)
+
+
+def test_expired_locker_token_frees_its_slot(backend):
+    tokens, ledger = TokenStore(backend), LockerLedger(backend)
+    data = token("L1A", NOW + timedelta(hours=1), access_type="L1", locker_day="2026-06-01", locker_slot="12:00-13:00")
+    tokens.issue("L1A", data, NOW, ledger=ledger)
+    assert ledger.availability("L1", "2026-06-01", ["12:00-13:00"]) == {"12:00-13:00": 0}
+
+    assert sweeper(backend).run_once(NOW + timedelta(hours=2)) == {"expired": 1, "used": 0}
+    assert tokens.get("L1A")["active"] is False
+    assert ledger.availability("L1", "2026-06-01", ["12:00-13:00"]) == {"12:00-13:00": 1}
+
+
+def test_completed_run_clears_cursor_so_older_tokens_are_swept(backend):
+    tokens = TokenStore(backend)
+    backend.set("drop24_qr_tokens", "A", token("A", NOW - timedelta(hours=1)))
+    backend.set("drop24_qr_tokens", "B", token("B", NOW - timedelta(minutes=30)))
+    s = sweeper(backend)
+    assert s.sweep_expired(NOW) == 2
+    assert s._checkpoint().get("cursor_id") is None
+
+    # llega un token activo con end_ts anterior a lo ya barrido (apartado de un día pasado)
+    backend.set("drop24_qr_tokens", "PAST", token("PAST", NOW - timedelta(days=2)))
+    assert s.sweep_expired(NOW + timedelta(minutes=1)) == 1
+    assert tokens.get("PAST")["active"] is False
+
+
+def test_interrupted_run_resumes_from_cursor(backend):
+    for i in range(6):
+        backend.set("drop24_qr_tokens", f"T{i}", token(f"T{i}", NOW - timedelta(minutes=60 - i)))
+    s = sweeper(backend, chunk=2)
+    calls = []
+    real_query = backend.query
+
+    def failing_query(*args, **kwargs):
+        calls.append(kwargs.get("start_after"))
+        if len(calls) == 3:
+            raise ConnectionError("se cortó")
+        return real_query(*args, **kwargs)
+
+    backend.query = failing_query
+    try:
+        s.sweep_expired(NOW)
+    except ConnectionError:
+        pass
+    ckpt = s._checkpoint()
+    assert ckpt["cursor_id"] == "T3" and ckpt["swept_total"] == 4
+
+    backend.query = real_query
+    assert s.sweep_expired(NOW) == 2
+    assert s._checkpoint()["cursor_id"] is None
+    assert all(TokenStore(backend).get(f"T{i}")["active"] is False for i in range(6))
+
+
+def test_sweep_used_one_time_tokens(backend):
+    backend.set("drop24_qr_tokens", "U", token("U", NOW + timedelta(minutes=10), used=True))
+    backend.set("drop24_qr_tokens", "N", token("N", NOW + timedelta(minutes=10)))
+    assert sweeper(backend).run_once(NOW) == {"expired": 0, "used": 1}
+    assert TokenStore(backend).get("N")["active"] is True
+
+
+def test_only_the_lease_holder_sweeps(backend):
+    backend.set("drop24_qr_tokens", "A", token("A", NOW - timedelta(minutes=5)))
+    a = sweeper(backend, owner="replica-a")
+    b = sweeper(backend, owner="replica-b")
+    assert a.acquire()
+    assert b.run_once(NOW) is None
+    assert TokenStore(backend).get("A")["active"] is True
+
+    # el dueño termina y suelta: la siguiente pasada la puede hacer cualquiera
+    assert a.run_once(NOW) == {"expired": 1, "used": 0}
+    assert b.acquire()
+
+
+def test_expired_lease_is_taken_over_and_the_old_owner_stops(backend):
+    for i in range(4):
+        backend.set("drop24_qr_tokens", f"T{i}", token(f"T{i}", NOW - timedelta(minutes=60 - i)))
+    clock = [NOW]
+    a = TokenSweeper(backend, chunk=2, max_writes_per_sec=0, clock=lambda: clock[0], owner="replica-a")
+    b = TokenSweeper(backend, chunk=2, max_writes_per_sec=0, clock=lambda: clock[0], owner="replica-b")
+    assert a.acquire()
+    clock[0] = NOW + timedelta(seconds=a.lease_seconds + 1)  # "a" se quedó pausado más que el lease
+    assert b.acquire()
+    assert a.run_once(NOW) is None
+    # "a" ya iba a medio barrido: su primer checkpoint ve que ya no es dueño y se detiene sin escribirlo
+    with pytest.raises(LeaseLost):
+        a.sweep_expired(NOW)
+    job = a._checkpoint()
+    assert job["lease_owner"] == "replica-b" and job.get("swept_total") is None
+    assert b.run_once(NOW)["expired"] == 2  # "a" alcanzó a desactivar su primer bloque
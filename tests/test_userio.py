@@ -0,0 +1,95 @@
+import io
+
+import pytest
+
+from drop24 import passwords
+from drop24.auth import AuthService
+from drop24.repository import UserStore
+from drop24.userio import UserImporter, export_users, file_digest, import_file, iter_rows
+
+HEADER = "username,full_name,phone,email,street,ext_number,neighborhood,borough,postal_code,city,state,password\n"
+
+
+@pytest.fixture(autouse=True)
+def _fast_bcrypt():
+    passwords.configure(rounds=4)
+    yield
+    passwords.configure(rounds=passwords.DEFAULT_ROUNDS)
+
+
+def row(i, **over):
+    r = {
+        "username": f"vecino{i:03d}", "full_name": f"Vecino {i}", "phone": f"55 1000 {i:04d}",
+        "email": f"vecino{i:03d}@example.com", "street": "Av. Universidad", "ext_number": str(i),
+        "neighborhood": "Xoco", "borough": "Benito Juárez", "postal_code": "03330",
+        "city": "CDMX", "state": "Ciudad de México", "password": f"clave-{i:03d}",
+    }
+    r.update(over)
+    return r
+
+
+def csv_file(rows) -> io.BytesIO:
+    lines = [",".join(r[k] for k in HEADER.strip().split(",")) for r in rows]
+    return io.BytesIO((HEADER + "\n".join(lines) + "\n").encode("utf-8"))
+
+
+def test_import_reports_bad_and_duplicate_rows(backend):
+    rows = [row(1), row(2), row(3, postal_code="333"), row(4, phone="55 1000 0001"), row(5, password="")]
+    result = import_file(backend, csv_file(rows), "vecinos.csv")
+    assert result["created"] == 2
+    errors = dict(result["errors"])
+    assert sorted(errors) == [4, 5, 6]
+    assert "contraseña" in errors[6]
+    users = UserStore(backend)
+    assert users.find("5510000002")[0] == "vecino002"
+    assert users.find("VECINO001@example.com")[0] == "vecino001"
+
+
+@pytest.mark.parametrize("fmt", ["csv", "xlsx"])
+def test_export_import_round_trip(backend, tmp_path, fmt):
+    from drop24.storage import LocalBackend
+
+    import_file(backend, csv_file([row(i) for i in range(1, 8)]), "vecinos.csv")
+    path = str(tmp_path / f"usuarios.{fmt}")
+    assert export_users(backend, path, page_size=3) == 7
+
+    other = LocalBackend(":memory:")
+    with open(path, "rb") as f:
+        # sin contraseñas (la exportación no trae el hash) no se crea ninguna cuenta
+        assert import_file(other, f, path)["failed"] == 7
+        f.seek(0)
+        rows = [{**r, "password": "nueva-clave"} for r in iter_rows(f, path)]
+    result = UserImporter(other).run(rows, "relleno")
+    assert result["created"] == 7 and result["failed"] == 0
+    a, b = UserStore(backend).get("vecino005"), UserStore(other).get("vecino005")
+    assert (a["phone"], a["email"], a["address"]) == (b["phone"], b["email"], b["address"])
+
+
+def test_interrupted_import_resumes_from_checkpoint(backend):
+    f = csv_file([row(i) for i in range(1, 11)])
+    digest = file_digest(f)
+
+    def broken(rows, stop):
+        for n, r in enumerate(rows, 1):
+            if n > stop:
+                raise ConnectionError("se cortó")
+            yield r
+
+    importer = UserImporter(backend, chunk=2)
+    with pytest.raises(ConnectionError):
+        importer.run(broken(iter_rows(f, "v.csv"), 5), digest)
+    f.seek(0)
+    result = importer.run(iter_rows(f, "v.csv"), digest)
+    assert result["resumed_from"] == 4
+    assert result["created"] == 10 and result["failed"] == 0
+
+
+def test_imported_users_leave_the_login_negative_cache(backend):
+    auth = AuthService(UserStore(backend))
+    assert auth.login("vecino001", "x").code == "no_user"
+    assert auth.login("55 1000 0002", "x").code == "no_user"
+
+    import_file(backend, csv_file([row(1), row(2)]), "vecinos.csv",
+                on_created=lambda ps: auth.forget(*(p[k] for p in ps for k in ("username", "phone", "email"))))
+    assert auth.login("vecino001", "clave-001").ok
+    assert auth.login("55 1000 0002", "x").code == "bad_password"
@@ -0,0 +1,168 @@
+import base64
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from drop24.qrsign import QRSigner
+from drop24.repository import TokenStore
+from drop24.revocation import BloomFilter, RevocationFeed
+from drop24.validator import FAIL_CLOSED, FAIL_OPEN, TokenValidator
+
+NOW = datetime(2026, 6, 1, 18, 0, tzinfo=timezone.utc)
+SIGNER = QRSigner({"k1": base64.b64encode(b"k" * 32).decode()}, "k1")
+
+
+class Outage:
+    """Interruptor compartido: con ``down`` las lecturas/escrituras del backend fallan como la red."""
+    down = False
+
+    def check(self):
+        if self.down:
+            raise ConnectionError("backend caído")
+
+
+class FlakyTokens(TokenStore):
+    def __init__(self, backend, outage):
+        super().__init__(backend)
+        self.outage = outage
+
+    def get(self, token_id):
+        self.outage.check()
+        return super().get(token_id)
+
+    def list_open(self, now):
+        self.outage.check()
+        return super().list_open(now)
+
+    def mark_used(self, token_id, now):
+        self.outage.check()
+        return super().mark_used(token_id, now)
+
+
+class FlakyFeed(RevocationFeed):
+    def __init__(self, backend, outage):
+        super().__init__(backend)
+        self.outage = outage
+
+    def deltas_since(self, version, limit=500):
+        self.outage.check()
+        return super().deltas_since(version, limit)
+
+    def get_snapshot(self):
+        self.outage.check()
+        return super().get_snapshot()
+
+
+def signed(tid="ABC123"):
+    return SIGNER.sign("DROP24", tid, "BZ", NOW - timedelta(minutes=5), NOW + timedelta(minutes=10), True)
+
+
+def seed(backend, tid="ABC123", **extra):
+    TokenStore(backend).issue(tid, {
+        "token_id": tid, "created_by": "ana", "access_type": "BZ",
+        "start_ts": NOW - timedelta(minutes=5), "end_ts": NOW + timedelta(minutes=10),
+        "one_time": True, "used": False, "active": True, "created_at": NOW, **extra,
+    }, NOW)
+
+
+def test_one_time_qr_opens_once(backend):
+    seed(backend)
+    v = TokenValidator(TokenStore(backend), write_behind=False)
+    assert v.validate("DROP24|ABC123", door="BZ", now=NOW)["ok"]
+    assert v.validate("DROP24|ABC123", door="BZ", now=NOW)["reason"] == "used"
+    assert TokenStore(backend).get("ABC123")["used"] is True
+
+
+def test_confirm_use_across_replicas(backend):
+    seed(backend)
+    a = TokenValidator(TokenStore(backend), write_behind=False)
+    b = TokenValidator(TokenStore(backend), write_behind=False)
+    a.refresh(NOW)
+    b.refresh(NOW)  # las dos réplicas ven el token sin usar
+    results = [a.validate("DROP24|ABC123", now=NOW), b.validate("DROP24|ABC123", now=NOW)]
+    assert [r["ok"] for r in results] == [True, False]
+    assert results[1]["reason"] == "used"
+
+
+def test_refresh_is_single_flight(backend):
+    seed(backend)
+    store = TokenStore(backend)
+    calls, gate = [], threading.Event()
+    real = store.list_open
+
+    def slow_list_open(now):
+        calls.append(now)
+        gate.wait(1)
+        return real(now)
+
+    store.list_open = slow_list_open
+    v = TokenValidator(store, write_behind=False)
+    threads = [threading.Thread(target=v.validate, args=("DROP24|ABC123",), kwargs={"now": NOW}) for _ in range(8)]
+    for th in threads:
+        th.start()
+    time.sleep(0.1)
+    gate.set()
+    for th in threads:
+        th.join()
+    assert len(calls) == 1
+
+
+def _flaky_validator(backend, **kw):
+    outage = Outage()
+    v = TokenValidator(FlakyTokens(backend, outage), signer=SIGNER, feed=FlakyFeed(backend, outage), **kw)
+    v.refresh(NOW)
+    v.sync_revocations()
+    return v, outage
+
+
+def _expire_cache(v):
+    v.loaded_at = 0.0
+    v.revocations_at = 0.0
+
+
+def test_outage_keeps_serving_signed_qrs(backend):
+    seed(backend)
+    v, outage = _flaky_validator(backend, write_behind=False)
+    outage.down = True
+    _expire_cache(v)  # el refresh toca justo con el backend caído
+    res = v.validate(signed(), door="BZ", now=NOW)
+    assert res["ok"], res
+    # fail-open en la confirmación: queda pendiente y se concilia al volver
+    outage.down = False
+    v.flush()
+    assert TokenStore(backend).get("ABC123")["used"] is True
+
+
+def test_outage_rejects_unknown_unsigned_qr(backend):
+    v, outage = _flaky_validator(backend)
+    outage.down = True
+    assert v.validate("DROP24|NOPE00", now=NOW)["reason"] == "backend_unavailable"
+
+
+@pytest.mark.parametrize("policy, ok", [(FAIL_OPEN, True), (FAIL_CLOSED, False)])
+def test_bloom_maybe_follows_policy_when_backend_down(backend, policy, ok):
+    seed(backend)
+    v, outage = _flaky_validator(backend, on_backend_error=policy)
+    v.revoked.bloom = BloomFilter.for_capacity(1)
+    v.revoked.bloom.add("ABC123")  # solo en el Bloom: "maybe"
+    outage.down = True
+    res = v.validate(signed(), now=NOW)
+    assert res["ok"] is ok
+    if not ok:
+        assert res["reason"] == "backend_unavailable"
+
+
+def test_fail_closed_confirm_use_can_retry(backend):
+    seed(backend)
+    v, outage = _flaky_validator(backend, write_behind=False, on_backend_error=FAIL_CLOSED)
+    outage.down = True
+    assert v.validate(signed(), now=NOW)["reason"] == "backend_unavailable"
+    outage.down = False
+    assert v.validate(signed(), now=NOW)["ok"]
+
+
+def test_unknown_policy_is_rejected(backend):
+    with pytest.raises(ValueError):
+        TokenValidator(TokenStore(backend), on_backend_error="maybe")